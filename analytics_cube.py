@@ -0,0 +1,262 @@
+# analytics_cube.py - League leaderboards, percentiles and team averages precomputed into in-memory arrays
+import os
+import time
+import numpy as np
+from sqlalchemy import func, select
+from db import db, Player, PlayerStats, current_season
+from recheck_cache import RecheckCache
+from team_registry import get_team_registry
+
+# Category name -> player_stats column
+CATEGORIES = {
+    'pts': 'pts_pg',
+    'reb': 'reb_pg',
+    'ast': 'ast_pg',
+    'stl': 'stl_pg',
+    'blk': 'blk_pg',
+    'ast_to': 'ast_to',
+}
+POSITIONS = ('G', 'F', 'C')
+CONFERENCES = ('East', 'West')
+# Leaderboards and percentiles only rank players with at least this share of the most games played
+QUALIFY_FRACTION = float(os.getenv('ANALYTICS_QUALIFY_FRACTION', '0.5'))
+# Percentile cut points reported for each group
+DISTRIBUTION_POINTS = (10, 25, 50, 75, 90)
+# How often a process compares player_stats' row count and latest write with the cube it holds
+RECHECK_SECONDS = int(os.getenv('ANALYTICS_RECHECK_SECONDS', '60'))
+
+def primary_position(position):
+    """'G', 'F' or 'C' from roster positions like 'G-F', 'F-C' or 'Center'; None if unknown"""
+    letter = (position or '').strip()[:1].upper()
+    return letter if letter in POSITIONS else None
+
+def group_key(position=None, conference=None):
+    """Name of a precomputed player group: 'all', 'G', 'East', ..."""
+    return position or conference or 'all'
+
+
+class AnalyticsCube:
+    """One season's player stats as columns, with every sorted index built up front.
+
+    Players traded mid-season have one player_stats row per team; leaderboards
+    combine them into games-weighted season averages, team averages use each
+    team's own rows.
+    """
+
+    def __init__(self, season, rows, last_updated, registry):
+        self.season = season
+        self.last_updated = last_updated
+        self.categories = tuple(CATEGORIES)
+        rows = [row for row in rows if row.gp]
+        n_categories = len(self.categories)
+
+        # Row-level columns (one per player and team)
+        row_players = np.array([row.player_id for row in rows], dtype=np.int64)
+        row_teams = np.array([row.team_id for row in rows], dtype=np.int64)
+        row_gp = np.array([row.gp for row in rows], dtype=float)
+        row_stats = np.array([[getattr(row, column) or 0.0 for column in CATEGORIES.values()] for row in rows],
+                             dtype=float).reshape(len(rows), n_categories)
+
+        # Player-level columns: games-weighted averages over a player's teams
+        self.player_ids, player_of_row = np.unique(row_players, return_inverse=True)
+        n_players = len(self.player_ids)
+        self.gp = np.bincount(player_of_row, weights=row_gp, minlength=n_players)
+        weighted = np.zeros((n_players, n_categories))
+        np.add.at(weighted, player_of_row, row_stats * row_gp[:, None])
+        self.stats = np.divide(weighted, self.gp[:, None], out=np.zeros_like(weighted), where=self.gp[:, None] > 0)
+        self.slot_by_player = {int(player_id): slot for slot, player_id in enumerate(self.player_ids)}
+
+        info = {row.player_id: row for row in rows}
+        self.names = [info[player_id].full_name for player_id in self.player_ids]
+        self.team_ids = np.array([info[player_id].current_team_id or 0 for player_id in self.player_ids], dtype=np.int64)
+        self.positions = [primary_position(info[player_id].position) for player_id in self.player_ids]
+        self.conferences = [registry.conference(int(team_id)) for team_id in self.team_ids]
+        self.qualified = self.gp >= QUALIFY_FRACTION * self.gp.max() if n_players else np.zeros(0, dtype=bool)
+
+        # Per group: qualified player slots, each category's slots best first, and its sorted values
+        groups = {'all': self.qualified}
+        for position in POSITIONS:
+            groups[position] = self.qualified & np.array([p == position for p in self.positions], dtype=bool)
+        for conference in CONFERENCES:
+            groups[conference] = self.qualified & np.array([c == conference for c in self.conferences], dtype=bool)
+        self.leaders = {}
+        self.sorted_values = {}
+        self.percentiles = {}  # group -> (n_players, n_categories) percentile of each member, NaN otherwise
+        for group, mask in groups.items():
+            members = np.flatnonzero(mask)
+            values = self.stats[members]
+            order = np.argsort(-values, axis=0, kind='stable')
+            self.leaders[group] = members[order]
+            ascending = np.sort(values, axis=0)
+            self.sorted_values[group] = ascending
+            ranks = np.full((n_players, n_categories), np.nan)
+            for c in range(n_categories):
+                # Share of the group at or below each member's value
+                ranks[members, c] = np.searchsorted(ascending[:, c], values[:, c], side='right') * 100.0 / len(members)
+            self.percentiles[group] = ranks
+
+        # Team averages: games-weighted mean of each team's rows, teams ordered per category
+        self.team_list, team_of_row = np.unique(row_teams, return_inverse=True)
+        team_gp = np.bincount(team_of_row, weights=row_gp, minlength=len(self.team_list))
+        team_weighted = np.zeros((len(self.team_list), n_categories))
+        np.add.at(team_weighted, team_of_row, row_stats * row_gp[:, None])
+        self.team_stats = np.divide(team_weighted, team_gp[:, None], out=np.zeros_like(team_weighted),
+                                    where=team_gp[:, None] > 0)
+        self.team_players = np.bincount(team_of_row, minlength=len(self.team_list))
+        self.team_order = np.argsort(-self.team_stats, axis=0, kind='stable')
+        self.registry = registry
+
+    def category_index(self, category):
+        """Column of `category`; ValueError if it is not one of CATEGORIES"""
+        try:
+            return self.categories.index(category)
+        except ValueError:
+            raise ValueError(f"Unknown category: {category}") from None
+
+    def _group(self, group):
+        if group not in self.leaders:
+            raise ValueError(f"Unknown group: {group}")
+        return group
+
+    def _player(self, slot):
+        team = self.registry.get(int(self.team_ids[slot]))
+        return {
+            'player_id': int(self.player_ids[slot]),
+            'name': self.names[slot],
+            'team_id': int(self.team_ids[slot]) or None,
+            'team': team.abbreviation if team else None,
+            'position': self.positions[slot],
+            'gp': int(self.gp[slot])
+        }
+
+    def top(self, category, n=10, group='all'):
+        """Best `n` qualified players of a group in one category"""
+        c = self.category_index(category)
+        slots = self.leaders[self._group(group)][:max(n, 0), c]
+        return [
+            dict(self._player(slot), rank=rank, value=round(float(self.stats[slot, c]), 2))
+            for rank, slot in enumerate(slots, 1)
+        ]
+
+    def distribution(self, category, group='all'):
+        """Percentile cut points of one category within a group"""
+        c = self.category_index(category)
+        values = self.sorted_values[self._group(group)][:, c]
+        if not len(values):
+            return {'players': 0, 'percentiles': {}}
+        cut_points = np.percentile(values, DISTRIBUTION_POINTS)
+        return {
+            'players': len(values),
+            'percentiles': {str(point): round(float(value), 2) for point, value in zip(DISTRIBUTION_POINTS, cut_points)}
+        }
+
+    def player_percentiles(self, player_id):
+        """A player's averages with their percentile in the league, their position and their conference"""
+        slot = self.slot_by_player.get(player_id)
+        if slot is None:
+            return None
+        groups = ['all', self.positions[slot], self.conferences[slot]]
+        categories = {}
+        for c, category in enumerate(self.categories):
+            categories[category] = {'value': round(float(self.stats[slot, c]), 2)}
+            for label, group in zip(('league', 'position', 'conference'), groups):
+                rank = self.percentiles[group][slot, c] if group in self.percentiles else np.nan
+                categories[category][label] = None if np.isnan(rank) else round(float(rank), 1)
+        return dict(self._player(slot), qualified=bool(self.qualified[slot]), categories=categories)
+
+    def team_averages(self, category=None):
+        """Per-team player averages, ordered by `category` (default: by team name)"""
+        if category is None:
+            order = sorted(range(len(self.team_list)), key=lambda i: self._team_name(i))
+        else:
+            order = self.team_order[:, self.category_index(category)]
+        teams = []
+        for i in order:
+            team = self.registry.get(int(self.team_list[i]))
+            teams.append({
+                'team_id': int(self.team_list[i]),
+                'team': team.abbreviation if team else None,
+                'full_name': team.full_name if team else None,
+                'conference': team.conference if team else None,
+                'players': int(self.team_players[i]),
+                **{name: round(float(self.team_stats[i, c]), 2) for c, name in enumerate(self.categories)}
+            })
+        return teams
+
+    def _team_name(self, i):
+        team = self.registry.get(int(self.team_list[i]))
+        return team.full_name if team else ''
+
+
+def cube_select(season):
+    """Every player_stats row of `season` with the player's name, position and current team"""
+    return select(
+        PlayerStats.player_id,
+        PlayerStats.team_id,
+        PlayerStats.gp,
+        *[getattr(PlayerStats, column) for column in CATEGORIES.values()],
+        Player.full_name,
+        Player.position,
+        Player.team_id.label('current_team_id')
+    ).join(Player, Player.id == PlayerStats.player_id).where(PlayerStats.season == season)
+
+def _stats_version(season):
+    """(rows, latest write) of a season's player_stats; changes whenever a refresh writes"""
+    return tuple(db.session.execute(
+        select(func.count(), func.max(PlayerStats.last_updated)).where(PlayerStats.season == season)
+    ).one())
+
+def build_analytics_cube(season=None):
+    """Run the stats join once and precompute everything served from the cube"""
+    season = season or current_season()
+    started = time.perf_counter()
+    version = _stats_version(season)
+    rows = db.session.execute(cube_select(season)).all()
+    cube = AnalyticsCube(season, rows, version, get_team_registry())
+    print(f"✓ Built analytics for {len(cube.player_ids)} players in {time.perf_counter() - started:.3f}s")
+    return cube
+
+
+# Keyed by season; only the current season's cube is held
+_cubes = RecheckCache('analytics', build_analytics_cube, _stats_version, RECHECK_SECONDS)
+
+def rebuild_analytics_cube():
+    """Rebuild after player stats are written (needs an app context)"""
+    return _cubes.rebuild(current_season())
+
+def get_analytics_cube():
+    """The current season's cube, built on first use (see RecheckCache)"""
+    return _cubes.get(current_season())
+
+
+def benchmark(n_players=550, repeats=2000):
+    """Time building a cube from synthetic rows and answering top-N/percentile lookups"""
+    from collections import namedtuple
+    from team_registry import TeamInfo, TeamRegistry
+    rng = np.random.default_rng(0)
+    team_ids = list(range(1610612737, 1610612767))
+    registry = TeamRegistry([
+        TeamInfo(id=team_id, abbreviation=f"T{i:02d}", full_name=f"Team {i:02d}", city='', name='',
+                 conference=CONFERENCES[i % 2])
+        for i, team_id in enumerate(team_ids)
+    ])
+    Row = namedtuple('Row', ['player_id', 'team_id', 'gp'] + list(CATEGORIES.values())
+                     + ['full_name', 'position', 'current_team_id'])
+    rows = []
+    for player_id in range(n_players):
+        team_id = int(rng.choice(team_ids))
+        stats = rng.gamma(2.0, [4.0, 2.0, 1.2, 0.4, 0.3, 0.8])
+        rows.append(Row(player_id, team_id, int(rng.integers(1, 82)), *stats, f"Player {player_id}",
+                        str(rng.choice(['G', 'F', 'C', 'G-F', 'F-C'])), team_id))
+    started = time.perf_counter()
+    cube = AnalyticsCube('2024-25', rows, None, registry)
+    built = time.perf_counter() - started
+    started = time.perf_counter()
+    for i in range(repeats):
+        cube.top('pts', 10, 'G')
+        cube.player_percentiles(i % n_players)
+    per_lookup = (time.perf_counter() - started) / (2 * repeats)
+    print(f"Built cube for {n_players} players in {built * 1000:.1f}ms; {per_lookup * 1e6:.1f}µs per lookup")
+
+if __name__ == "__main__":
+    benchmark()
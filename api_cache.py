@@ -0,0 +1,166 @@
+# api_cache.py - On-disk, content-addressed cache of raw stats.nba.com responses
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+CACHE_DIR = os.getenv('NBA_API_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'nba_api'))
+CACHE_MAX_BYTES = int(float(os.getenv('NBA_API_CACHE_MAX_MB', '512')) * 1024 * 1024)
+
+HOUR = 3600
+DEFAULT_TTL = HOUR
+
+# Seconds a response stays fresh, per nba_api endpoint name
+ENDPOINT_TTLS = {
+    'leaguestandings': 6 * HOUR,
+    'commonteamroster': 12 * HOUR,
+    'teamdashboardbygeneralsplits': 6 * HOUR,
+    'playergamelog': 3 * HOUR,
+    'leaguegamelog': 3 * HOUR,
+    'leagueleaders': 6 * HOUR,
+    'scheduleleaguev2': 6 * HOUR,
+    'scoreboardv2': 60,
+}
+
+def _result_sets(body):
+    payload = json.loads(body)
+    result_sets = payload.get('resultSets') or payload.get('resultSet') or []
+    if isinstance(result_sets, dict):
+        result_sets = [result_sets]
+    return {rs['name']: rs for rs in result_sets if isinstance(rs, dict) and 'name' in rs}
+
+def _scoreboard_is_final(parameters, body):
+    """A scoreboard never changes once every game on it is final (or the date is long past)"""
+    try:
+        header = _result_sets(body).get('GameHeader')
+        if header and header['rowSet']:
+            status_idx = header['headers'].index('GAME_STATUS_ID')
+            return all(row[status_idx] == 3 for row in header['rowSet'])
+        game_date = datetime.strptime(parameters.get('GameDate', ''), '%m/%d/%Y').date()
+        return game_date < datetime.now().date() - timedelta(days=1)
+    except (ValueError, KeyError, TypeError):
+        return False
+
+def ttl_for(endpoint, parameters, body):
+    """Return the TTL in seconds for a response, or None if it is immutable"""
+    if endpoint == 'scoreboardv2' and _scoreboard_is_final(parameters, body):
+        return None
+    return ENDPOINT_TTLS.get(endpoint, DEFAULT_TTL)
+
+
+class ResponseCache:
+    """Gzipped JSON entries under CACHE_DIR, evicted least-recently-used past max_bytes"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    @staticmethod
+    def make_key(endpoint, parameters):
+        canonical = json.dumps({'endpoint': endpoint, 'parameters': parameters},
+                               sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def get(self, key):
+        """Return the stored entry dict (fresh or stale) or None"""
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # mtime doubles as the LRU recency stamp
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            if self.is_fresh(entry):
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry
+
+    @staticmethod
+    def is_fresh(entry):
+        return entry['expires_at'] is None or entry['expires_at'] > time.time()
+
+    def put(self, key, endpoint, parameters, body, ttl, validators=None):
+        entry = {
+            'endpoint': endpoint,
+            'parameters': parameters,
+            'stored_at': time.time(),
+            'expires_at': None if ttl is None else time.time() + ttl,
+            'validators': validators or {},
+            'body': body
+        }
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, default=str)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        self._account(os.path.getsize(path) - old_size)
+        return entry
+
+    def revalidated(self, key, entry, ttl):
+        """Upstream confirmed the entry is unchanged (304); extend its lifetime"""
+        return self.put(key, entry['endpoint'], entry['parameters'], entry['body'], ttl,
+                        entry.get('validators'))
+
+    def _scan(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.json.gz'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _account(self, delta):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._total_bytes += delta
+            if self._total_bytes <= self.max_bytes:
+                return
+            # Evict oldest-used entries down to 90% of the budget
+            files = sorted(self._scan())
+            total = sum(size for _, size, _ in files)
+            target = self.max_bytes * 0.9
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._total_bytes = total
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'bytes': self._total_bytes
+            }
+
+
+response_cache = ResponseCache()
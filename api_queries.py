@@ -0,0 +1,66 @@
+# api_queries.py - Statements and payloads behind the /api routes, shared by the Flask app and asgi.py
+from datetime import date, datetime
+from sqlalchemy import select
+from db import Player, PlayerStats, Game, games_with_teams_select, player_stats_join, current_season
+from serializers import serialize_game, serialize_team_game, PLAYER_STATS_FIELDS, ROSTER_API_FIELDS
+from team_registry import get_team_registry
+
+# Each route builds its select() here, runs it on its own session (db.session or
+# an async session) and turns the rows into the response payload here as well.
+
+def teams_payload():
+    """/api/teams from the in-memory team registry"""
+    return [
+        {
+            "id": team.id,
+            "full_name": team.full_name,
+            "abbreviation": team.abbreviation,
+            "city": team.city,
+            "name": team.name,
+            "conference": team.conference
+        }
+        for team in get_team_registry().all()
+    ]
+
+def parse_games_date(value=None):
+    """(date string as given, date) from ?date= in MM/DD/YYYY or YYYY-MM-DD; default today"""
+    value = value or datetime.now().strftime('%m/%d/%Y')
+    try:
+        return value, datetime.strptime(value, '%m/%d/%Y').date()
+    except ValueError:
+        return value, datetime.strptime(value, '%Y-%m-%d').date()
+
+def games_select(game_date):
+    """One day's games with both teams joined in (one query for the whole slate)"""
+    return games_with_teams_select().where(Game.game_date == game_date)
+
+def games_payload(rows, date_str):
+    return {
+        'games': [serialize_game(game, home_team, visitor_team) for game, home_team, visitor_team in rows],
+        'date': date_str
+    }
+
+def team_games_select(team_id, count=10):
+    """A team's last `count` games; the stored schedule also holds future games, which are left out"""
+    return games_with_teams_select(outer=True).where(
+        (Game.home_team_id == team_id) | (Game.visitor_team_id == team_id),
+        Game.game_date <= date.today()
+    ).order_by(Game.game_date.desc()).limit(count)
+
+def team_games_payload(rows, team_id):
+    return [serialize_team_game(game, home_team, visitor_team, team_id) for game, home_team, visitor_team in rows]
+
+def roster_select(team_id):
+    return select(*ROSTER_API_FIELDS.columns).where(Player.team_id == team_id)
+
+def roster_payload(rows):
+    return ROSTER_API_FIELDS.serialize(rows)
+
+def player_stats_select(team_id, season=None):
+    """A team's current players with their averages for `season` (default current)"""
+    return select(*PLAYER_STATS_FIELDS.columns).outerjoin(
+        PlayerStats, player_stats_join(season or current_season())
+    ).where(Player.team_id == team_id)
+
+def player_stats_payload(rows):
+    return PLAYER_STATS_FIELDS.serialize(rows)
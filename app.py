@@ -1,31 +1,96 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Blueprint, Response, current_app, render_template, request, jsonify, redirect, url_for, stream_with_context
 from datetime import datetime, timedelta
 import json
 import os
 import traceback
 import time
 from sqlalchemy import func
-from db import app, db, Team, TeamStats, Player, PlayerStats, Game, RefreshTracker
-from data_fetcher import (
-    fetch_and_store_teams, 
-    fetch_and_store_standings, 
-    fetch_and_store_team_stats,
-    fetch_and_store_team_roster,
-    fetch_and_store_games,
-    initialize_database
+from db import (
+    db, Team, TeamStats, Player, PlayerStats, Game, RefreshTracker, BacktestResult,
+    games_with_teams_query, player_stats_join, current_season
 )
+import db as database
+from serializers import serialize_game, json_response, ROSTER_FIELDS
+from team_registry import get_team_registry, refresh_team_registry
+from standings_view import get_standings_snapshot
+from scheduler import RefreshScheduler, handed_off
+from live_scores import GameEventBroker, LiveScorePoller, ScoreRelay, stream_events, LIVE_SCORES_ENABLED
+from http_cache import cached_json
+from db_pool import pool_metrics
+from leaders import get_leaders
+import api_queries
+import metrics
 
-# Initialize database on startup
-with app.app_context():
-    db.create_all()
+# Fetches and live score polling run once, in `python scheduler.py`; web processes hand refreshes to it.
+# REFRESH_SCHEDULER=1 runs them in this process instead (single-process dev server only: every
+# worker that enables it fetches on its own)
+SCHEDULER_ENABLED = os.getenv('REFRESH_SCHEDULER', '0') == '1'
+# Schema creation and seeding are opt-in for the web process (INIT_DB=1 or `python app.py`)
+INIT_DB = os.getenv('INIT_DB', '0') == '1'
+
+bp = Blueprint('main', __name__)
+
+def create_app(init_db=None):
+    """Application factory for the web process.
+
+    Building the app does no database or network work. With `init_db` (default
+    INIT_DB) the schema is created and an empty database is seeded in the
+    background; otherwise that is left to db_populate.py.
+    """
+    app = database.create_app(role='web')
+    app.register_blueprint(bp)
+    metrics.init_app(app)
+    app.extensions['refresh_scheduler'] = RefreshScheduler(app, run_jobs=SCHEDULER_ENABLED)
+    app.extensions['live_scores'] = LiveScorePoller(app)
+    app.extensions['score_relay'] = ScoreRelay(app, GameEventBroker())
+
+    if INIT_DB if init_db is None else init_db:
+        initialize_schema(app)
+    return app
+
+def initialize_schema(app):
+    """Create tables and queue the initial seed if the database is empty"""
+    # Imported here: only processes that own the schema need the migration steps
+    from schema_migrations import run_migrations
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+        try:
+            # Seed in the background if the database is empty; never block startup on the API
+            if Team.query.count() == 0:
+                app.extensions['refresh_scheduler'].submit('initialize')
+        except Exception as e:
+            print(f"Error initializing database: {str(e)}")
+
+def slate_win_percentages(matchups):
+    """[(home_pct, visitor_pct)] per (home_team_id, visitor_team_id); 50/50 if ratings are unavailable"""
     try:
-        # Initialize with basic data if database is empty
-        if Team.query.count() == 0:
-            initialize_database()
+        # predictions and analytics_cube load numpy, so both are imported on first use
+        from predictions import home_win_percentages
+        return home_win_percentages(matchups)
     except Exception as e:
-        print(f"Error initializing database: {str(e)}")
+        print(f"Error scoring games: {str(e)}")
+        return [(50, 50)] * len(matchups)
+
+_registry_loaded = False
+
+@bp.before_app_request
+def start_refresh_scheduler():
+    """Start background work in the process that actually serves requests"""
+    global _registry_loaded
+    if SCHEDULER_ENABLED:
+        current_app.extensions['refresh_scheduler'].start()
+        if LIVE_SCORES_ENABLED:
+            current_app.extensions['live_scores'].start()
+    if not _registry_loaded:
+        _registry_loaded = True
+        try:
+            # Pick up conferences/names as stored in the teams table
+            refresh_team_registry()
+        except Exception as e:
+            print(f"Error loading teams: {str(e)}")
 
-@app.route('/')
+@bp.route('/')
 def index():
     """Render the main page with games data from database."""
     try:
@@ -45,45 +110,25 @@ def index():
                 game_date_str = game_date_obj.strftime('%Y-%m-%d')
         
         # Get all teams for the filter dropdown
-        teams = Team.query.order_by(Team.full_name).all()
+        teams = get_team_registry().all()
         
-        # Query games from database
-        games_query = db.session.query(Game).filter(Game.game_date == game_date_obj).all()
+        # Query games with both teams joined in (one query for the whole slate)
+        games_query = games_with_teams_query().filter(Game.game_date == game_date_obj).all()
         
+        # Score the whole slate in one vectorized call against the precomputed ratings
+        percentages = slate_win_percentages([
+            (game.home_team_id, game.visitor_team_id) for game, _, _ in games_query
+        ])
         games_data = []
-        for game in games_query:
-            # Get team info
-            home_team = Team.query.get(game.home_team_id)
-            visitor_team = Team.query.get(game.visitor_team_id)
-            
-            if not home_team or not visitor_team:
-                continue
-            
-            games_data.append({
-                'game_id': game.id,
-                'home_team': {
-                    'id': home_team.id,
-                    'name': home_team.full_name,
-                    'abbreviation': home_team.abbreviation,
-                    'score': game.home_team_score
-                },
-                'visitor_team': {
-                    'id': visitor_team.id,
-                    'name': visitor_team.full_name,
-                    'abbreviation': visitor_team.abbreviation,
-                    'score': game.visitor_team_score
-                },
-                'status': {
-                    'id': game.status_id,
-                    'text': game.status_text
-                },
-                'game_time': game.game_time,
-                'home_win_probability': 50,  # Default values - you can implement actual ML predictions
-                'visitor_win_probability': 50
-            })
+        for (game, home_team, visitor_team), (home_pct, visitor_pct) in zip(games_query, percentages):
+            game_data = serialize_game(game, home_team, visitor_team)
+            game_data['home_win_probability'] = home_pct
+            game_data['visitor_win_probability'] = visitor_pct
+            games_data.append(game_data)
         
         return render_template('index.html', 
                              current_date=game_date_str,
+                             is_today=game_date_obj == datetime.now().date(),
                              games=games_data,
                              teams=teams)
                              
@@ -95,24 +140,12 @@ def index():
                              games=[],
                              teams=[])
 
-@app.route('/api/teams')
+@bp.route('/api/teams')
+@cached_json('teams')
 def get_nba_teams():
     """Get all NBA teams from database."""
     try:
-        teams = Team.query.all()
-        team_list = [
-            {
-                "id": team.id,
-                "full_name": team.full_name,
-                "abbreviation": team.abbreviation,
-                "city": team.city,
-                "name": team.name,
-                "conference": team.conference
-            }
-            for team in teams
-        ]
-        
-        return jsonify(team_list)
+        return jsonify(api_queries.teams_payload())
     except Exception as e:
         print(f"Error fetching teams: {str(e)}")
         return jsonify({
@@ -120,58 +153,15 @@ def get_nba_teams():
             'message': f'Failed to load teams: {str(e)}'
         }), 500
 
-@app.route('/api/games', methods=['GET'])
+@bp.route('/api/games', methods=['GET'])
+@cached_json('games', 'teams')
 def get_games():
     """Get NBA games for a specific date from database."""
     try:
-        # Get date from query parameters, default to today
-        game_date_str = request.args.get('date', datetime.now().strftime('%m/%d/%Y'))
+        game_date_str, game_date_obj = api_queries.parse_games_date(request.args.get('date'))
+        games = db.session.execute(api_queries.games_select(game_date_obj)).all()
         
-        # Convert to proper date format for database query
-        try:
-            game_date_obj = datetime.strptime(game_date_str, '%m/%d/%Y').date()
-        except ValueError:
-            # Try other format
-            game_date_obj = datetime.strptime(game_date_str, '%Y-%m-%d').date()
-        
-        # Query games from database
-        games = db.session.query(Game).filter(Game.game_date == game_date_obj).all()
-        
-        games_data = []
-        
-        for game in games:
-            # Get team info
-            home_team = Team.query.get(game.home_team_id)
-            visitor_team = Team.query.get(game.visitor_team_id)
-            
-            if not home_team or not visitor_team:
-                continue
-            
-            games_data.append({
-                'game_id': game.id,
-                'home_team': {
-                    'id': home_team.id,
-                    'name': home_team.full_name,
-                    'abbreviation': home_team.abbreviation,
-                    'score': game.home_team_score
-                },
-                'visitor_team': {
-                    'id': visitor_team.id,
-                    'name': visitor_team.full_name,
-                    'abbreviation': visitor_team.abbreviation,
-                    'score': game.visitor_team_score
-                },
-                'status': {
-                    'id': game.status_id,
-                    'text': game.status_text
-                },
-                'game_time': game.game_time
-            })
-        
-        return jsonify({
-            'games': games_data,
-            'date': game_date_str
-        })
+        return jsonify(api_queries.games_payload(games, game_date_str))
         
     except Exception as e:
         print(f"Error fetching games: {str(e)}")
@@ -181,43 +171,31 @@ def get_games():
             'games': []
         }), 500
 
-@app.route('/api/standings')
+@bp.route('/api/games/stream')
+def games_stream():
+    """Server-Sent Events stream of live score changes (event: scores, data: list of games).
+
+    Each open stream holds one server thread here; `uvicorn asgi:app` serves
+    it from the event loop instead. Streams past LIVE_MAX_SUBSCRIBERS get a 503.
+    """
+    relay = current_app.extensions['score_relay']
+    subscriber = relay.broker.subscribe()
+    if subscriber is None:
+        return jsonify({'error': 'Too many live score streams open'}), 503, {'Retry-After': '60'}
+    relay.start()
+    response = Response(stream_with_context(stream_events(relay.broker, subscriber)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/api/standings')
 def get_standings():
-    """Get current NBA standings from database"""
+    """Get current NBA standings from the in-memory standings snapshot"""
     try:
-        # Query teams with their stats, ordered by conference and rank
-        standings_query = db.session.query(
-            Team.id,
-            Team.full_name,
-            Team.abbreviation,
-            Team.conference,
-            TeamStats.wins,
-            TeamStats.losses,
-            TeamStats.win_pct,
-            TeamStats.conference_rank,
-            TeamStats.points_per_game,
-            TeamStats.rebounds_per_game,
-            TeamStats.assists_per_game
-        ).join(TeamStats, Team.id == TeamStats.team_id).order_by(
-            Team.conference,
-            TeamStats.conference_rank
-        )
-        
-        standings = []
-        for row in standings_query.all():
-            standings.append({
-                'id': row.id,
-                'TeamName': row.full_name,
-                'abbreviation': row.abbreviation,
-                'Conference': row.conference,
-                'ConferenceRank': row.conference_rank,
-                'WINS': row.wins,
-                'LOSSES': row.losses,
-                'WinPercentage': row.win_pct,
-                'full_name': row.full_name
-            })
-        
-        return jsonify(standings)
+        snapshot = get_standings_snapshot()
+        response = current_app.response_class(snapshot.json_body, mimetype='application/json')
+        response.set_etag(snapshot.etag)
+        return response.make_conditional(request)
         
     except Exception as e:
         error_details = traceback.format_exc()
@@ -228,68 +206,21 @@ def get_standings():
             'message': f'Failed to load standings data: {str(e)}'
         }), 500
 
-@app.route('/teams')
+@bp.route('/teams')
 def teams_page():
-    """Render the teams page with standings data from database."""
+    """Render the teams page from the in-memory standings snapshot."""
     try:
-        # Query teams with their stats for Eastern Conference
-        eastern_teams_query = db.session.query(
-            Team.id,
-            Team.full_name,
-            Team.abbreviation,
-            TeamStats.wins,
-            TeamStats.losses,
-            TeamStats.win_pct,
-            TeamStats.conference_rank
-        ).join(TeamStats, Team.id == TeamStats.team_id).filter(
-            Team.conference == 'East'
-        ).order_by(TeamStats.conference_rank)
-        
-        # Query teams with their stats for Western Conference
-        western_teams_query = db.session.query(
-            Team.id,
-            Team.full_name,
-            Team.abbreviation,
-            TeamStats.wins,
-            TeamStats.losses,
-            TeamStats.win_pct,
-            TeamStats.conference_rank
-        ).join(TeamStats, Team.id == TeamStats.team_id).filter(
-            Team.conference == 'West'
-        ).order_by(TeamStats.conference_rank)
-        
-        eastern_teams = []
-        for row in eastern_teams_query.all():
-            eastern_teams.append({
-                'id': row.id,
-                'full_name': row.full_name,
-                'abbreviation': row.abbreviation,
-                'wins': row.wins,
-                'losses': row.losses,
-                'win_pct': row.win_pct,
-                'conference_rank': row.conference_rank
-            })
-        
-        western_teams = []
-        for row in western_teams_query.all():
-            western_teams.append({
-                'id': row.id,
-                'full_name': row.full_name,
-                'abbreviation': row.abbreviation,
-                'wins': row.wins,
-                'losses': row.losses,
-                'win_pct': row.win_pct,
-                'conference_rank': row.conference_rank
-            })
-        
-        # Get last updated time
-        refresh_tracker = RefreshTracker.query.filter_by(entity='standings').first()
-        last_updated = refresh_tracker.last_refresh if refresh_tracker else None
-        
-        return render_template('teams.html', 
-                             eastern_teams=eastern_teams,
-                             western_teams=western_teams,
-                             last_updated=last_updated)
+        snapshot = get_standings_snapshot()
+        etag = f"teams-{snapshot.etag}"
+        if etag in request.if_none_match:
+            return current_app.response_class(status=304, headers={'ETag': f'"{etag}"'})
+        
+        response = current_app.make_response(render_template('teams.html', 
+                                                     eastern_teams=snapshot.eastern_teams,
+                                                     western_teams=snapshot.western_teams,
+                                                     last_updated=snapshot.last_updated))
+        response.set_etag(etag)
+        return response
         
     except Exception as e:
         error_details = traceback.format_exc()
@@ -300,14 +231,14 @@ def teams_page():
                              western_teams=[],
                              last_updated=None)
 
-@app.route('/team/<int:team_id>')
+@bp.route('/team/<int:team_id>')
 def team_page(team_id):
     """Render the team page with detailed information."""
     try:
         print(f"Debug: Accessing team page for team_id: {team_id}")
         
         # Get team info from database
-        team = Team.query.get(team_id)
+        team = get_team_registry().get(team_id)
         if not team:
             print(f"Debug: No team found for team_id: {team_id}")
             return render_template('404.html', message=f"Team with ID {team_id} not found"), 404
@@ -315,7 +246,7 @@ def team_page(team_id):
         print(f"Debug: Team found: {team.full_name}")
         
         # Get team stats
-        team_stats_db = TeamStats.query.filter_by(team_id=team_id).first()
+        team_stats_db = TeamStats.query.filter_by(team_id=team_id, season=current_season()).first()
         
         team_data = {
             'id': team.id,
@@ -345,73 +276,35 @@ def team_page(team_id):
             }
         
         # Get roster with stats
-        roster_query = db.session.query(
-            Player.id,
-            Player.full_name,
-            Player.jersey,
-            Player.position,
-            Player.height,
-            Player.weight,
-            PlayerStats.gp,
-            PlayerStats.min_pg,
-            PlayerStats.pts_pg,
-            PlayerStats.oreb_pg,
-            PlayerStats.dreb_pg,
-            PlayerStats.reb_pg,
-            PlayerStats.ast_pg,
-            PlayerStats.stl_pg,
-            PlayerStats.blk_pg,
-            PlayerStats.to_pg,
-            PlayerStats.pf_pg,
-            PlayerStats.ast_to
-        ).outerjoin(PlayerStats, Player.id == PlayerStats.player_id).filter(
-            Player.team_id == team_id
-        )
-        
-        roster = []
-        for row in roster_query.all():
-            roster.append({
-                'name': row.full_name,
-                'position': row.position or 'N/A',
-                'jersey': row.jersey or 'N/A',
-                'height': row.height or 'N/A',
-                'weight': row.weight or 'N/A',
-                'age': 'N/A',  # Age not stored in current schema
-                'gp': row.gp or 0,
-                'min': row.min_pg or 0.0,
-                'ppg': row.pts_pg or 0.0,
-                'oreb': row.oreb_pg or 0.0,
-                'dreb': row.dreb_pg or 0.0,
-                'rpg': row.reb_pg or 0.0,
-                'apg': row.ast_pg or 0.0,
-                'spg': row.stl_pg or 0.0,
-                'bpg': row.blk_pg or 0.0,
-                'to': row.to_pg or 0.0,
-                'pf': row.pf_pg or 0.0,
-                'ast_to': row.ast_to or 0.0
-            })
+        roster_query = db.session.query(*ROSTER_FIELDS.columns).outerjoin(
+            PlayerStats, player_stats_join()
+        ).filter(Player.team_id == team_id)
+        roster = ROSTER_FIELDS.serialize(roster_query.all())
         
         print(f"Debug: Found {len(roster)} players in roster")
         
         # Get upcoming games from database
         today = datetime.now().date()
-        upcoming_games_query = db.session.query(Game).filter(
+        upcoming_games_query = games_with_teams_query(outer=True).filter(
             ((Game.home_team_id == team_id) | (Game.visitor_team_id == team_id)) &
             (Game.game_date > today)
         ).order_by(Game.game_date).limit(5)
         
+        upcoming_rows = upcoming_games_query.all()
+        percentages = slate_win_percentages([
+            (game.home_team_id, game.visitor_team_id) for game, _, _ in upcoming_rows
+        ])
         upcoming_games = []
-        for game in upcoming_games_query.all():
+        for (game, home_team, visitor_team), (home_pct, visitor_pct) in zip(upcoming_rows, percentages):
             is_home = game.home_team_id == team_id
-            opponent_id = game.visitor_team_id if is_home else game.home_team_id
-            opponent = Team.query.get(opponent_id)
+            opponent = visitor_team if is_home else home_team
             
             if opponent:
                 upcoming_games.append({
                     'date': game.game_date.strftime('%b %d, %Y'),
                     'opponent': opponent.full_name,
                     'is_home': is_home,
-                    'win_probability': 50  # Default - you can implement ML predictions
+                    'win_probability': home_pct if is_home else visitor_pct
                 })
         
         print(f"Debug: Rendering team template with data")
@@ -431,24 +324,14 @@ def team_page(team_id):
                               message=f"Error loading team page: {str(e)}",
                               details=error_details), 500
 
-@app.route('/api/team/<int:team_id>/roster')
+@bp.route('/api/team/<int:team_id>/roster')
+@cached_json('players')
 def team_roster_api(team_id):
     """API endpoint to get team roster from database"""
     try:
-        players = Player.query.filter_by(team_id=team_id).all()
+        players = db.session.execute(api_queries.roster_select(team_id)).all()
         
-        roster_data = []
-        for player in players:
-            roster_data.append({
-                'PLAYER_ID': player.id,
-                'PLAYER': player.full_name,
-                'NUM': player.jersey,
-                'POSITION': player.position,
-                'HEIGHT': player.height,
-                'WEIGHT': player.weight
-            })
-        
-        return jsonify(roster_data)
+        return json_response(api_queries.roster_payload(players))
         
     except Exception as e:
         return jsonify({
@@ -456,35 +339,15 @@ def team_roster_api(team_id):
             'message': str(e)
         }), 500
 
-@app.route('/api/team/<int:team_id>/games')
+@bp.route('/api/team/<int:team_id>/games')
+@cached_json('games', 'teams')
 def team_games_api(team_id):
     """API endpoint to get team games from database"""
     try:
         count = int(request.args.get('count', 10))
+        games = db.session.execute(api_queries.team_games_select(team_id, count)).all()
         
-        # Get recent games for the team (last 'count' games)
-        games = db.session.query(Game).filter(
-            (Game.home_team_id == team_id) | (Game.visitor_team_id == team_id)
-        ).order_by(Game.game_date.desc()).limit(count).all()
-        
-        games_data = []
-        for game in games:
-            # Determine if team was home or away
-            is_home = game.home_team_id == team_id
-            opponent_id = game.visitor_team_id if is_home else game.home_team_id
-            opponent = Team.query.get(opponent_id)
-            
-            games_data.append({
-                'GAME_ID': game.id,
-                'GAME_DATE': game.game_date.strftime('%Y-%m-%d'),
-                'MATCHUP': f"{'vs' if is_home else '@'} {opponent.abbreviation if opponent else 'UNK'}",
-                'WL': 'W' if (is_home and game.home_team_score > game.visitor_team_score) or 
-                           (not is_home and game.visitor_team_score > game.home_team_score) else 'L'
-                      if game.home_team_score is not None and game.visitor_team_score is not None else '',
-                'PTS': game.home_team_score if is_home else game.visitor_team_score
-            })
-        
-        return jsonify(games_data)
+        return jsonify(api_queries.team_games_payload(games, team_id))
         
     except Exception as e:
         return jsonify({
@@ -492,58 +355,14 @@ def team_games_api(team_id):
             'message': str(e)
         }), 500
 
-@app.route('/api/team/<int:team_id>/player-stats')
+@bp.route('/api/team/<int:team_id>/player-stats')
+@cached_json('players', 'player_stats')
 def player_stats_api(team_id):
-    """API endpoint to get player stats for a team from database"""
+    """API endpoint to get player stats for a team from database (?season= for past seasons)"""
     try:
-        # Query players with their stats
-        player_stats_query = db.session.query(
-            Player.id,
-            Player.full_name,
-            Player.jersey,
-            Player.position,
-            Player.height,
-            Player.weight,
-            PlayerStats.gp,
-            PlayerStats.min_pg,
-            PlayerStats.pts_pg,
-            PlayerStats.oreb_pg,
-            PlayerStats.dreb_pg,
-            PlayerStats.reb_pg,
-            PlayerStats.ast_pg,
-            PlayerStats.stl_pg,
-            PlayerStats.blk_pg,
-            PlayerStats.to_pg,
-            PlayerStats.pf_pg,
-            PlayerStats.ast_to
-        ).outerjoin(PlayerStats, Player.id == PlayerStats.player_id).filter(
-            Player.team_id == team_id
-        )
+        rows = db.session.execute(api_queries.player_stats_select(team_id, request.args.get('season'))).all()
         
-        player_stats = []
-        for row in player_stats_query.all():
-            player_stats.append({
-                'PLAYER': row.full_name,
-                'PLAYER_ID': row.id,
-                'NUM': row.jersey,
-                'POSITION': row.position,
-                'HEIGHT': row.height,
-                'WEIGHT': row.weight,
-                'GP': row.gp or 0,
-                'MIN': row.min_pg or 0.0,
-                'PTS': row.pts_pg or 0.0,
-                'OREB': row.oreb_pg or 0.0,
-                'DREB': row.dreb_pg or 0.0,
-                'REB': row.reb_pg or 0.0,
-                'AST': row.ast_pg or 0.0,
-                'STL': row.stl_pg or 0.0,
-                'BLK': row.blk_pg or 0.0,
-                'TO': row.to_pg or 0.0,
-                'PF': row.pf_pg or 0.0,
-                'AST_TO': row.ast_to or 0.0
-            })
-        
-        return jsonify(player_stats)
+        return json_response(api_queries.player_stats_payload(rows))
         
     except Exception as e:
         error_details = traceback.format_exc()
@@ -554,32 +373,126 @@ def player_stats_api(team_id):
             'message': f'Failed to load player stats: {str(e)}'
         }), 500
 
-@app.route('/analytics')
+def get_analytics():
+    from analytics_cube import get_analytics_cube
+    return get_analytics_cube()
+
+def analytics_group():
+    """Player group from ?position= (G/F/C) or ?conference= (East/West); default the whole league"""
+    return request.args.get('position') or request.args.get('conference') or 'all'
+
+@bp.route('/analytics')
 def analytics():
-    """Render the analytics page."""
-    return render_template('analytics.html')
+    """Render the analytics page from the precomputed cube."""
+    from analytics_cube import CATEGORIES, POSITIONS, CONFERENCES
+    cube = get_analytics()
+    leaderboards = {category: cube.top(category, 5) for category in CATEGORIES}
+    return render_template('analytics.html',
+                           season=cube.season,
+                           leaderboards=leaderboards,
+                           distributions={category: cube.distribution(category) for category in CATEGORIES},
+                           team_averages=cube.team_averages('pts'),
+                           positions=POSITIONS,
+                           conferences=CONFERENCES)
 
-@app.route('/about')
+@bp.route('/api/leaders')
+def leaders_api():
+    """Stored stats.nba.com league leaders (?category=PTS&n=10&season=), served from memory"""
+    try:
+        season = request.args.get('season') or current_season()
+        category = request.args.get('category', 'PTS').upper()
+        n = int(request.args.get('n', 10))
+        return json_response({'season': season, 'category': category, 'leaders': get_leaders(category, n, season)})
+    except ValueError as e:
+        return jsonify({'error': True, 'message': str(e)}), 400
+
+@bp.route('/api/analytics/leaders/<category>')
+def analytics_leaders_api(category):
+    """Top ?n= qualified players in a category, served from memory"""
+    try:
+        cube = get_analytics()
+        n = min(int(request.args.get('n', 10)), 100)
+        group = analytics_group()
+        return json_response({
+            'season': cube.season,
+            'category': category,
+            'group': group,
+            'players': cube.top(category, n, group)
+        })
+    except ValueError as e:
+        return jsonify({'error': True, 'message': str(e)}), 400
+
+@bp.route('/api/analytics/percentiles/<category>')
+def analytics_percentiles_api(category):
+    """Percentile cut points of a category among qualified players, served from memory"""
+    try:
+        cube = get_analytics()
+        group = analytics_group()
+        return json_response(dict(cube.distribution(category, group), season=cube.season,
+                                  category=category, group=group))
+    except ValueError as e:
+        return jsonify({'error': True, 'message': str(e)}), 400
+
+@bp.route('/api/analytics/player/<int:player_id>')
+def analytics_player_api(player_id):
+    """A player's percentiles in every category within the league, their position and conference"""
+    cube = get_analytics()
+    player = cube.player_percentiles(player_id)
+    if player is None:
+        return jsonify({'error': True, 'message': f'No {cube.season} stats for player {player_id}'}), 404
+    return json_response(dict(player, season=cube.season))
+
+@bp.route('/api/analytics/teams')
+def analytics_teams_api():
+    """Per-team player averages, ordered by ?category= when given"""
+    try:
+        cube = get_analytics()
+        return json_response({'season': cube.season, 'teams': cube.team_averages(request.args.get('category'))})
+    except ValueError as e:
+        return jsonify({'error': True, 'message': str(e)}), 400
+
+@bp.route('/about')
 def about():
     """Render the about page."""
     return render_template('about.html')
 
-@app.route('/how-it-works')
+@bp.route('/how-it-works')
 def how_it_works():
     """Render the how it works page."""
     return render_template('howItWorks.html')
 
-@app.route('/algorithm')
+@bp.route('/algorithm')
 def algorithm():
-    """Render the algorithm page."""
-    return render_template('algorithm.html')
+    """Render the algorithm page with the model parameters and current ratings."""
+    from predictions import get_rating_state
+    state = get_rating_state()
+    registry = get_team_registry()
+    ratings = [
+        {
+            'rank': rank,
+            'team': registry.get(team_id),
+            'rating': rating,
+            'games': games_played
+        }
+        for rank, (team_id, rating, games_played) in enumerate(state.table(), 1)
+    ]
+    return render_template('algorithm.html', params=state.params, ratings=ratings,
+                           games_applied=state.games_applied, last_date=state.last_date)
 
-@app.route('/historical-accuracy')
+@bp.route('/historical-accuracy')
 def historical_accuracy():
-    """Render the historical accuracy page."""
-    return render_template('historicalAccuracy.html')
+    """Render the stored backtest (written by backtest.py) without recomputing it."""
+    default_rows = BacktestResult.query.filter_by(is_default=True).order_by(BacktestResult.season).all()
+    # backtest.py stores the scores over every backtested season under 'all'
+    overall = next((row for row in default_rows if row.season == 'all'), None)
+    best = BacktestResult.query.filter_by(season='all').order_by(BacktestResult.brier).limit(10).all()
+    return render_template('historicalAccuracy.html',
+                           overall=overall,
+                           seasons=[row for row in default_rows if row.season != 'all'],
+                           calibration=json.loads(overall.calibration) if overall else [],
+                           best=best if len(best) > 1 else [])
 
-@app.template_filter('date_format')
+@bp.app_template_filter('date_format')
 def date_format_filter(date_str):
     """Format date strings for display"""
     try:
@@ -588,37 +501,56 @@ def date_format_filter(date_str):
     except:
         return date_str
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def page_not_found(e):
     """Handle 404 errors"""
     return render_template('404.html'), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def server_error(e):
     """Handle 500 errors"""
     return render_template('500.html'), 500
 
 # Background refresh endpoint (optional - for manual refresh)
-@app.route('/api/refresh/<entity>')
+@bp.route('/api/refresh/<entity>')
 def refresh_data(entity):
-    """Manually refresh specific data"""
+    """Queue a refresh of specific data and return its job id without waiting (or hand it to the refresh process)"""
     try:
-        if entity == 'teams':
-            fetch_and_store_teams()
-        elif entity == 'standings':
-            fetch_and_store_standings()
-        elif entity == 'games':
-            fetch_and_store_games()
-        elif entity.startswith('team_'):
-            team_id = int(entity.split('_')[1])
-            fetch_and_store_team_stats(team_id)
-            fetch_and_store_team_roster(team_id)
-        else:
-            return jsonify({'error': 'Unknown entity'}), 400
-        
-        return jsonify({'success': True, 'message': f'Refreshed {entity}'})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        job = current_app.extensions['refresh_scheduler'].submit(entity)
+    except ValueError:
+        return jsonify({'error': 'Unknown entity'}), 400
+    if job is None:
+        return jsonify(handed_off(entity)), 202
+    
+    return jsonify({
+        'success': True,
+        'message': f'Refresh of {entity} queued',
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('main.refresh_status', job_id=job.id)
+    }), 202
+
+@bp.route('/api/refresh/status/<job_id>')
+def refresh_status(job_id):
+    """Report the state of a queued refresh job"""
+    job = current_app.extensions['refresh_scheduler'].get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@bp.route('/api/metrics/pool')
+def pool_metrics_api():
+    """Connection pool gauges (checked out, overflow) and checkout wait/age counters"""
+    return jsonify(pool_metrics(db.engine))
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape target: route latency, SQL per request, nba_api latency, caches, pool"""
+    return Response(metrics.render_metrics([db.engine]), content_type=metrics.CONTENT_TYPE)
+
+# WSGI entry point (gunicorn app:app / flask run)
+app = create_app()
 
 if __name__ == '__main__':
+    app = create_app(init_db=True)
     app.run(debug=True)
\ No newline at end of file
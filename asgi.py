@@ -0,0 +1,324 @@
+# asgi.py - Async serving mode: the JSON API on an async DB driver, pages via the Flask app
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
+from functools import wraps
+import os
+import re
+import time
+import traceback
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from werkzeug.http import parse_accept_header, parse_date, parse_etags
+from app import app as flask_app, SCHEDULER_ENABLED
+from db import db, Team
+from db_pool import engine_options, pool_metrics
+from http_cache import CACHE_ENABLED, http_cache, response_parts, cache_key
+from live_scores import GameEventBroker, ScoreRelay, stream_events_async, todays_games_select, LIVE_SCORES_ENABLED
+from serializers import dumps
+from scheduler import handed_off
+import api_queries
+import metrics
+from standings_view import standings_select, snapshot_from_rows
+from team_registry import refresh_team_registry, team_info_from_row
+
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # needs greenlet
+    from starlette.applications import Starlette
+    from starlette.responses import Response, StreamingResponse
+    from starlette.middleware import Middleware
+    from starlette.routing import Match, Mount, Route
+except ImportError:  # optional: only needed for `uvicorn asgi:app`
+    Starlette = None
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:  # Starlette's own adapter is deprecated but still works
+    try:
+        from starlette.middleware.wsgi import WSGIMiddleware
+    except ImportError:
+        WSGIMiddleware = None
+
+# SQLAlchemy async driver per backend; ASYNC_DATABASE_URL overrides the derived URL
+ASYNC_DRIVERS = {
+    'mysql': 'aiomysql',
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+}
+
+def async_database_url(url=None):
+    """The Flask app's database URL with its driver swapped for an async one"""
+    if os.getenv('ASYNC_DATABASE_URL'):
+        return os.getenv('ASYNC_DATABASE_URL')
+    url = make_url(url or flask_app.config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = async_database_url()
+engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options('web', ASYNC_DATABASE_URL, use_async=True)
+) if Starlette is not None else None
+Session = async_sessionmaker(engine, expire_on_commit=False) if engine is not None else None
+# SSE clients of this process wait on asyncio queues, fed by relay_scores() on the event loop
+score_relay = ScoreRelay(flask_app, GameEventBroker(queue_class=asyncio.Queue))
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status_code=status, media_type='application/json')
+
+def error_response(message):
+    return json_response({'error': True, 'message': message}, status=500)
+
+def cached(*tables):
+    """Async twin of http_cache.cached_json; shares its entries and invalidation"""
+    def decorator(endpoint):
+        @wraps(endpoint)
+        async def wrapper(request):
+            if not CACHE_ENABLED:
+                return await endpoint(request)
+            key = cache_key(request.url.path, request.query_params.multi_items())
+            entry = http_cache.get(key)
+            if entry is None:
+                response = await endpoint(request)
+                if response.status_code != 200:
+                    return response
+                entry = http_cache.put(key, response.body, response.media_type, tables)
+            status, headers, body = response_parts(
+                entry,
+                parse_accept_header(request.headers.get('accept-encoding')),
+                parse_etags(request.headers.get('if-none-match')),
+                parse_date(request.headers.get('if-modified-since'))
+            )
+            return Response(body, status_code=status, headers=headers,
+                            media_type=None if status == 304 else entry.mimetype)
+        return wrapper
+    return decorator
+
+def flask_rule(path):
+    """'/api/team/{team_id:int}/games' -> '/api/team/<int:team_id>/games', the label Flask reports"""
+    return re.sub(r'\{(\w+)(?::(\w+))?\}', lambda m: f"<{m[2]}:{m[1]}>" if m[2] else f"<{m[1]}>", path)
+
+class MetricsMiddleware:
+    """Times requests served by the async routes into the same metrics as metrics.init_app.
+
+    Latency, SQL count/time per request and the Server-Timing header match the
+    Flask hooks; requests falling through to the mounted Flask app are left to
+    those hooks so nothing is counted twice.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        route = self._route(scope) if scope['type'] == 'http' else None
+        if route is None:
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        sql, token = metrics.start_request_sql()
+        responded = []
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                responded.append(message['status'])
+                timing = metrics.observe_request(route, scope['method'], message['status'],
+                                                 time.perf_counter() - started, *sql)
+                message['headers'] = list(message.get('headers', [])) + [
+                    (b'server-timing', timing.encode('latin-1'))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception:
+            if not responded:
+                metrics.observe_request(route, scope['method'], 500, time.perf_counter() - started, *sql)
+            raise
+        finally:
+            metrics.stop_request_sql(token)
+
+    @staticmethod
+    def _route(scope):
+        """Flask-style rule of the async route this request matches; None if Flask serves it"""
+        for route in scope['app'].routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return None if isinstance(route, Mount) else flask_rule(route.path)
+        return None
+
+
+@cached('teams')
+async def get_nba_teams(request):
+    """Get all NBA teams from the in-memory registry"""
+    return json_response(api_queries.teams_payload())
+
+@cached('games', 'teams')
+async def get_games(request):
+    """Get NBA games for a specific date"""
+    try:
+        game_date_str, game_date_obj = api_queries.parse_games_date(request.query_params.get('date'))
+        async with Session() as session:
+            games = (await session.execute(api_queries.games_select(game_date_obj))).all()
+        return json_response(api_queries.games_payload(games, game_date_str))
+    except Exception as e:
+        print(f"Error fetching games: {str(e)}")
+        traceback.print_exc()
+        return json_response({'error': str(e), 'games': []}, status=500)
+
+@cached('teams', 'team_stats')
+async def get_standings(request):
+    """Get current NBA standings"""
+    try:
+        async with Session() as session:
+            rows = (await session.execute(standings_select())).all()
+        return Response(snapshot_from_rows(rows, None).json_body, media_type='application/json')
+    except Exception as e:
+        print(f"Error in standings API: {str(e)}")
+        return error_response(f'Failed to load standings data: {str(e)}')
+
+@cached('players')
+async def team_roster_api(request):
+    """Get a team's roster"""
+    try:
+        async with Session() as session:
+            players = (await session.execute(api_queries.roster_select(request.path_params['team_id']))).all()
+        return json_response(api_queries.roster_payload(players))
+    except Exception as e:
+        return error_response(str(e))
+
+@cached('games', 'teams')
+async def team_games_api(request):
+    """Get a team's most recent games"""
+    try:
+        team_id = request.path_params['team_id']
+        count = int(request.query_params.get('count', 10))
+        async with Session() as session:
+            games = (await session.execute(api_queries.team_games_select(team_id, count))).all()
+        return json_response(api_queries.team_games_payload(games, team_id))
+    except Exception as e:
+        return error_response(str(e))
+
+@cached('players', 'player_stats')
+async def player_stats_api(request):
+    """Get player stats for a team (?season= for past seasons)"""
+    try:
+        async with Session() as session:
+            rows = (await session.execute(api_queries.player_stats_select(
+                request.path_params['team_id'], request.query_params.get('season')
+            ))).all()
+        return json_response(api_queries.player_stats_payload(rows))
+    except Exception as e:
+        print(f"Error in player stats API: {str(e)}")
+        return error_response(f'Failed to load player stats: {str(e)}')
+
+async def games_stream(request):
+    """Server-Sent Events stream of live score changes; waits on the event loop, not a thread"""
+    subscriber = score_relay.broker.subscribe()
+    if subscriber is None:
+        response = json_response({'error': 'Too many live score streams open'}, status=503)
+        response.headers['Retry-After'] = '60'
+        return response
+    return StreamingResponse(stream_events_async(score_relay.broker, subscriber), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+async def relay_scores():
+    """ScoreRelay's loop on the async engine: push changes to today's games while anyone listens"""
+    while True:
+        try:
+            if len(score_relay.broker):
+                today = date.today()
+                async with Session() as session:
+                    rows = (await session.execute(todays_games_select(today))).mappings().all()
+                score_relay.publish_changes(rows, today)
+            else:
+                score_relay.reset()
+        except Exception as e:
+            print(f"Live score relay failed: {str(e)}")
+        await asyncio.sleep(score_relay.seconds)
+
+async def refresh_data(request):
+    """Queue a refresh on the Flask app's scheduler (or hand it to the refresh process) without waiting"""
+    entity = request.path_params['entity']
+    try:
+        job = flask_app.extensions['refresh_scheduler'].submit(entity)
+    except ValueError:
+        return json_response({'error': 'Unknown entity'}, status=400)
+    if job is None:
+        return json_response(handed_off(entity), status=202)
+    return json_response({
+        'success': True,
+        'message': f'Refresh of {entity} queued',
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': str(request.app.url_path_for('refresh_status', job_id=job.id))
+    }, status=202)
+
+async def refresh_status(request):
+    """Report the state of a queued refresh job"""
+    job = flask_app.extensions['refresh_scheduler'].get_job(request.path_params['job_id'])
+    if job is None:
+        return json_response({'error': 'Unknown job'}, status=404)
+    return json_response(job.to_dict())
+
+
+async def pool_metrics_api(request):
+    """Pool gauges for the async engine and the Flask app's engine (used by fetch threads)"""
+    with flask_app.app_context():
+        return json_response(pool_metrics(engine.sync_engine, db.engine))
+
+async def metrics_endpoint(request):
+    """Prometheus scrape target, reporting the async engine's pool next to the Flask app's"""
+    with flask_app.app_context():
+        body = metrics.render_metrics([db.engine, engine.sync_engine])
+    return Response(body, media_type=metrics.CONTENT_TYPE)
+
+
+async def load_team_registry():
+    """Pick up conferences/names as stored in the teams table"""
+    try:
+        async with Session() as session:
+            teams = (await session.execute(select(Team))).scalars().all()
+        if teams:
+            refresh_team_registry([team_info_from_row(team) for team in teams])
+    except Exception as e:
+        print(f"Error loading teams: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app):
+    # Fetchers stay on the Flask app's worker threads; nothing here blocks the event loop
+    if SCHEDULER_ENABLED:
+        flask_app.extensions['refresh_scheduler'].start()
+        if LIVE_SCORES_ENABLED:
+            flask_app.extensions['live_scores'].start()
+    await load_team_registry()
+    relay = asyncio.create_task(relay_scores())
+    yield
+    relay.cancel()
+    await engine.dispose()
+
+def create_asgi_app():
+    """JSON API routes and the live score stream served async; pages mounted from the Flask app"""
+    if Starlette is None or WSGIMiddleware is None:
+        raise RuntimeError("ASGI mode needs starlette, uvicorn, sqlalchemy[asyncio] and an async driver (aiomysql)")
+    return Starlette(routes=[
+        Route('/api/teams', get_nba_teams),
+        Route('/api/games', get_games),
+        Route('/api/games/stream', games_stream),
+        Route('/api/standings', get_standings),
+        Route('/api/team/{team_id:int}/roster', team_roster_api),
+        Route('/api/team/{team_id:int}/games', team_games_api),
+        Route('/api/team/{team_id:int}/player-stats', player_stats_api),
+        Route('/api/metrics/pool', pool_metrics_api),
+        Route('/metrics', metrics_endpoint),
+        Route('/api/refresh/status/{job_id}', refresh_status, name='refresh_status'),
+        Route('/api/refresh/{entity}', refresh_data),
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ], middleware=[Middleware(MetricsMiddleware)], lifespan=lifespan)
+
+# ASGI entry point (uvicorn asgi:app)
+app = create_asgi_app() if Starlette is not None else None
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run('asgi:app', host='127.0.0.1', port=int(os.getenv('PORT', '8000')))
@@ -0,0 +1,262 @@
+# backtest.py - Chronological replay of stored games scoring the Elo model, with vectorized parameter sweeps
+import argparse
+from datetime import datetime
+import itertools
+import json
+import time
+import numpy as np
+from db import db, BacktestResult, season_for_date
+from predictions import (DEFAULT_PARAMS, EloParams, GameArrays, load_final_games, previous_season,
+                         rating_from_win_pct, season_win_pcts, win_probability)
+from team_ratings import params_key
+
+CALIBRATION_BUCKETS = 10
+ALL_SEASONS = 'all'
+# Default sweep; every combination is replayed in the same pass
+SWEEP_GRID = {
+    'k': (10.0, 15.0, 20.0, 25.0, 30.0, 40.0),
+    'home_advantage': (0.0, 50.0, 75.0, 100.0, 125.0),
+    'season_regression': (0.0, 0.25, 0.5),
+    'margin': (True, False),
+}
+
+def param_grid(grid=SWEEP_GRID, initial=DEFAULT_PARAMS.initial):
+    """Every EloParams combination of `grid`, DEFAULT_PARAMS first"""
+    combos = [
+        EloParams(k=k, home_advantage=home_advantage, season_regression=regression, initial=initial, margin=margin)
+        for k, home_advantage, regression, margin in itertools.product(
+            grid['k'], grid['home_advantage'], grid['season_regression'], grid['margin'])
+    ]
+    return [DEFAULT_PARAMS] + [params for params in combos if params != DEFAULT_PARAMS]
+
+def pregame_probabilities(games, params_list, prior_win_pcts=None):
+    """Home win probability of every game under every parameter set, shape (sets, games).
+
+    Each game is scored from the ratings before its date, so nothing from that
+    night or later leaks in. Parameter sets are rows of one rating matrix: a
+    date costs the same few array operations however many sets are swept.
+    Follows RatingState.apply_games exactly for a single set.
+    """
+    prior_win_pcts = prior_win_pcts or {}
+    k = np.array([params.k for params in params_list])[:, None]
+    home_advantage = np.array([params.home_advantage for params in params_list])[:, None]
+    keep = 1.0 - np.array([params.season_regression for params in params_list])[:, None]
+    initial = np.array([params.initial for params in params_list])[:, None]
+    margin = np.array([params.margin for params in params_list])[:, None]
+
+    # Same slot order as RatingState: seeded teams first, then teams as they appear
+    team_ids = list(dict.fromkeys(itertools.chain(
+        prior_win_pcts, (int(t) for pair in zip(games.home_ids, games.away_ids) for t in pair))))
+    slot_by_team = {team_id: slot for slot, team_id in enumerate(team_ids)}
+    home_slots = np.array([slot_by_team[int(t)] for t in games.home_ids], dtype=np.int64)
+    away_slots = np.array([slot_by_team[int(t)] for t in games.away_ids], dtype=np.int64)
+
+    ratings = np.repeat(initial, len(team_ids), axis=1)
+    if prior_win_pcts:
+        prior_slots = [slot_by_team[team_id] for team_id in prior_win_pcts]
+        offsets = rating_from_win_pct(list(prior_win_pcts.values()), 0.0)
+        ratings[:, prior_slots] = initial + keep * offsets[None, :]
+
+    expected = np.empty((len(params_list), len(games.ids)))
+    if not len(games.ids):
+        return expected
+    home_won = (games.home_scores > games.away_scores).astype(float)
+    log_margin = np.log(np.abs(games.home_scores - games.away_scores) + 1.0)
+    starts = np.flatnonzero(np.r_[True, games.dates[1:] != games.dates[:-1]])
+    ends = np.r_[starts[1:], len(games.ids)]
+    season = season_for_date(games.dates[0].astype(object))
+    for start, end in zip(starts, ends):
+        date_season = season_for_date(games.dates[start].astype(object))
+        if date_season != season:
+            mean = ratings.mean(axis=1, keepdims=True)
+            ratings = mean + keep * (ratings - mean)
+            season = date_season
+        home, away = home_slots[start:end], away_slots[start:end]
+        diff = ratings[:, home] + home_advantage - ratings[:, away]
+        date_expected = expected[:, start:end] = win_probability(diff)
+        won = home_won[start:end]
+        winner_diff = np.where(won == 1.0, diff, -diff)
+        multiplier = np.where(margin, log_margin[start:end] * 2.2 / (winner_diff * 0.001 + 2.2), 1.0)
+        delta = k * multiplier * (won - date_expected)
+        # No team plays twice on one date, so plain fancy-index updates are safe here
+        ratings[:, home] += delta
+        ratings[:, away] -= delta
+    return expected
+
+def score(probabilities, home_won):
+    """Accuracy, Brier score, log loss and calibration buckets for each row of `probabilities`"""
+    n_sets, n_games = probabilities.shape
+    outcome = home_won.astype(float)[None, :]
+    correct = ((probabilities >= 0.5) == home_won[None, :]).sum(axis=1)
+    brier = ((probabilities - outcome) ** 2).mean(axis=1)
+    clipped = np.clip(probabilities, 1e-12, 1.0 - 1e-12)
+    log_loss = -(outcome * np.log(clipped) + (1.0 - outcome) * np.log(1.0 - clipped)).mean(axis=1)
+
+    # One bincount per statistic over (set, bucket) pairs
+    buckets = np.minimum((probabilities * CALIBRATION_BUCKETS).astype(np.int64), CALIBRATION_BUCKETS - 1)
+    flat = (buckets + CALIBRATION_BUCKETS * np.arange(n_sets)[:, None]).ravel()
+    size = n_sets * CALIBRATION_BUCKETS
+    counts = np.bincount(flat, minlength=size).reshape(n_sets, -1)
+    predicted = np.bincount(flat, weights=probabilities.ravel(), minlength=size).reshape(n_sets, -1)
+    wins = np.bincount(flat, weights=np.broadcast_to(outcome, probabilities.shape).ravel(),
+                       minlength=size).reshape(n_sets, -1)
+    return {
+        'games': n_games,
+        'correct': correct,
+        'accuracy': correct / n_games,
+        'brier': brier,
+        'log_loss': log_loss,
+        'bucket_games': counts,
+        'bucket_predicted': np.divide(predicted, counts, out=np.zeros_like(predicted), where=counts > 0),
+        'bucket_wins': np.divide(wins, counts, out=np.zeros_like(wins), where=counts > 0),
+    }
+
+def result_rows(params_list, season, scores):
+    """BacktestResult rows (dicts) for one scope's scores"""
+    now = datetime.utcnow()
+    rows = []
+    for i, params in enumerate(params_list):
+        calibration = [
+            [round(bucket / CALIBRATION_BUCKETS, 2), int(scores['bucket_games'][i, bucket]),
+             round(float(scores['bucket_predicted'][i, bucket]), 4), round(float(scores['bucket_wins'][i, bucket]), 4)]
+            for bucket in range(CALIBRATION_BUCKETS) if scores['bucket_games'][i, bucket]
+        ]
+        rows.append({
+            'season': season,
+            'params': params_key(params),
+            'k': params.k,
+            'home_advantage': params.home_advantage,
+            'season_regression': params.season_regression,
+            'margin': bool(params.margin),
+            'is_default': params == DEFAULT_PARAMS,
+            'games': scores['games'],
+            'correct': int(scores['correct'][i]),
+            'accuracy': float(scores['accuracy'][i]),
+            'brier': float(scores['brier'][i]),
+            'log_loss': float(scores['log_loss'][i]),
+            'calibration': json.dumps(calibration),
+            'created_at': now
+        })
+    return rows
+
+def game_seasons(games):
+    """Season string of every game (computed once per distinct date)"""
+    dates, inverse = np.unique(games.dates, return_inverse=True)
+    seasons = np.array([season_for_date(day.astype(object)) for day in dates])
+    return seasons[inverse]
+
+def run_backtest(params_list=None, seasons=None, games=None, prior_win_pcts=None):
+    """Replay every stored final game and score `seasons` (default: all) under each parameter set.
+
+    Earlier seasons are still replayed as warm-up. Returns result rows: one per
+    parameter set and season, plus ALL_SEASONS over the scored games.
+    """
+    params_list = params_list or [DEFAULT_PARAMS]
+    if games is None:
+        games = load_final_games()
+    if not len(games.ids):
+        return []
+    season_of_game = game_seasons(games)
+    if prior_win_pcts is None:
+        prior_win_pcts = season_win_pcts(previous_season(season_of_game[0]))
+    probabilities = pregame_probabilities(games, params_list, prior_win_pcts)
+    home_won = games.home_scores > games.away_scores
+
+    seasons = seasons or list(dict.fromkeys(season_of_game))
+    scored = np.isin(season_of_game, seasons)
+    rows = []
+    for season in seasons:
+        mask = season_of_game == season
+        if mask.any():
+            rows += result_rows(params_list, season, score(probabilities[:, mask], home_won[mask]))
+    if scored.any():
+        rows += result_rows(params_list, ALL_SEASONS, score(probabilities[:, scored], home_won[scored]))
+    return rows
+
+def save_results(rows):
+    """Replace the stored backtest with `rows`"""
+    try:
+        db.session.query(BacktestResult).delete()
+        if rows:
+            db.session.execute(BacktestResult.__table__.insert(), rows)
+        db.session.commit()
+        print(f"✓ Saved {len(rows)} backtest results")
+        return True
+    except Exception as e:
+        print(f"❌ Error saving backtest results: {e}")
+        db.session.rollback()
+        return False
+
+def print_results(rows, top=10):
+    overall = sorted((row for row in rows if row['season'] == ALL_SEASONS), key=lambda row: row['brier'])
+    default = [row for row in rows if row['is_default']]
+    print(f"{'season':<8} {'games':>6} {'accuracy':>9} {'brier':>7} {'log loss':>9}   (default parameters)")
+    for row in default:
+        print(f"{row['season']:<8} {row['games']:>6} {row['accuracy']:>9.3f} {row['brier']:>7.4f} {row['log_loss']:>9.4f}")
+    if len(overall) > 1:
+        print(f"\nBest {min(top, len(overall))} of {len(overall)} parameter sets by Brier score:")
+        for row in overall[:top]:
+            print(f"  k={row['k']:<5g} home={row['home_advantage']:<5g} regression={row['season_regression']:<5g} "
+                  f"margin={'on ' if row['margin'] else 'off'}  accuracy {row['accuracy']:.3f}  brier {row['brier']:.4f}")
+
+
+def synthetic_games(n_seasons=5, n_teams=30, games_per_date=8, dates_per_season=165, seed=0):
+    """Random schedule of teams with fixed hidden strengths, for timing without a database"""
+    rng = np.random.default_rng(seed)
+    strength = rng.normal(0, 6, n_teams)
+    team_ids = np.arange(1610612737, 1610612737 + n_teams)
+    dates, home_ids, away_ids = [], [], []
+    for season in range(n_seasons):
+        first = np.datetime64(f'{2020 + season}-10-20')
+        for day in range(dates_per_season):
+            teams = rng.permutation(n_teams)[:games_per_date * 2]
+            dates += [first + day] * games_per_date
+            home_ids += list(teams[:games_per_date])
+            away_ids += list(teams[games_per_date:])
+    home_ids, away_ids = np.array(home_ids), np.array(away_ids)
+    margin = strength[home_ids] + 3.0 - strength[away_ids] + rng.normal(0, 12, len(home_ids))
+    margin = np.where(np.rint(margin) == 0, 1.0, np.rint(margin))
+    return GameArrays(
+        ids=[f'{i:010d}' for i in range(len(home_ids))],
+        dates=np.array(dates, dtype='datetime64[D]'),
+        home_ids=team_ids[home_ids],
+        away_ids=team_ids[away_ids],
+        home_scores=110.0 + np.maximum(margin, 0),
+        away_scores=110.0 - np.minimum(margin, 0)
+    )
+
+def benchmark():
+    """Time a full sweep over five synthetic seasons"""
+    games = synthetic_games()
+    params_list = param_grid()
+    started = time.perf_counter()
+    rows = run_backtest(params_list, games=games, prior_win_pcts={})
+    elapsed = time.perf_counter() - started
+    print(f"{len(params_list)} parameter sets x {len(games.ids)} games: {elapsed:.2f}s")
+    print_results(rows, top=5)
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the Elo model against stored games")
+    parser.add_argument('--season', action='append', dest='seasons', help="season to score, e.g. 2024-25 (repeatable)")
+    parser.add_argument('--sweep', action='store_true', help="also score every SWEEP_GRID combination")
+    parser.add_argument('--no-save', action='store_true', help="print without replacing the stored results")
+    parser.add_argument('--benchmark', action='store_true', help="time a sweep over synthetic seasons instead")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark()
+        return
+
+    from db import create_app
+    app = create_app(role='fetcher')
+    with app.app_context():
+        db.create_all()
+        params_list = param_grid() if args.sweep else [DEFAULT_PARAMS]
+        started = time.perf_counter()
+        rows = run_backtest(params_list, args.seasons)
+        print(f"Backtested {len(params_list)} parameter sets in {time.perf_counter() - started:.2f}s")
+        print_results(rows)
+        if not args.no_save:
+            save_results(rows)
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from nba_api.stats.endpoints import (
     leaguestandings, 
     commonteamroster, 
     playergamelog,
+    leaguegamelog,
     teamgamelog,
     scoreboardv2,
     teamdashboardbygeneralsplits
@@ -13,37 +14,26 @@ from datetime import datetime, timedelta
 import pandas as pd
 import time
 import traceback
-from db import db, Team, TeamStats, Player, PlayerStats, Game, RefreshTracker, should_refresh, update_refresh_time
+from db import (
+    db, Team, TeamStats, Player, PlayerStats, Game, RefreshTracker,
+    should_refresh, update_refresh_time, bulk_upsert, update_game_watermarks, current_season
+)
+from nba_client import nba_client
+from player_aggregation import (
+    EMPTY_PLAYER_STATS,
+    aggregate_player_game_logs,
+    averages_to_lookup
+)
+from team_registry import TEAM_CONFERENCES, get_team_registry, refresh_team_registry
+from standings_view import rebuild_standings_snapshot
 
 def safe_api_call(api_func, *args, **kwargs):
-    """Safely make API calls with retry logic and rate limiting"""
-    max_retries = 3
-    retry_delay = 1.0
-    
-    for attempt in range(max_retries):
-        try:
-            time.sleep(0.6)  # Rate limiting
-            result = api_func(*args, **kwargs)
-            return result
-        except Exception as e:
-            print(f"API call attempt {attempt + 1} failed: {str(e)}")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
-            else:
-                raise e
+    """Make an nba_api call through the shared pooled, rate-limited client"""
+    return nba_client.call(api_func, *args, **kwargs)
 
-def convert_min_to_float(min_str):
-    """Convert MM:SS format to float minutes"""
-    if isinstance(min_str, str) and ':' in min_str:
-        try:
-            minutes, seconds = min_str.split(':')
-            return int(minutes) + int(seconds) / 60
-        except ValueError:
-            return 0.0
-    try:
-        return float(min_str)
-    except (ValueError, TypeError):
-        return 0.0
+def frame_records(df):
+    """DataFrame -> list of dicts with plain Python values and NaN as None (DB-ready)"""
+    return df.astype(object).where(pd.notna(df), None).to_dict('records')
 
 def fetch_and_store_teams():
     """Fetch all NBA teams and store in database"""
@@ -55,30 +45,26 @@ def fetch_and_store_teams():
         print("Fetching NBA teams...")
         nba_teams = teams.get_teams()
         
-        for team_data in nba_teams:
-            team = Team.query.get(team_data['id'])
-            if team:
-                # Update existing team
-                team.abbreviation = team_data['abbreviation']
-                team.full_name = team_data['full_name']
-                team.city = team_data['city']
-                team.name = team_data['nickname']
-                team.last_updated = datetime.utcnow()
-            else:
-                # Create new team - conference will be set by update_team_conferences()
-                conference_mapping = get_team_conference_mapping()
-                team = Team(
-                    id=team_data['id'],
-                    abbreviation=team_data['abbreviation'],
-                    full_name=team_data['full_name'],
-                    city=team_data['city'],
-                    name=team_data['nickname'],
-                    conference=conference_mapping.get(team_data['id'], 'Unknown')
-                )
-                db.session.add(team)
+        now = datetime.utcnow()
+        conference_mapping = TEAM_CONFERENCES
+        rows = [{
+            'id': team_data['id'],
+            'abbreviation': team_data['abbreviation'],
+            'full_name': team_data['full_name'],
+            'city': team_data['city'],
+            'name': team_data['nickname'],
+            'conference': conference_mapping.get(team_data['id'], 'Unknown'),
+            'last_updated': now
+        } for team_data in nba_teams]
+        
+        # Conference is only set on insert; update_team_conferences() owns it afterwards
+        bulk_upsert(Team, rows, update_columns=['abbreviation', 'full_name', 'city', 'name', 'last_updated'])
         
         db.session.commit()
         update_refresh_time('teams')
+        if refresh_team_registry():
+            print("Team registry refreshed with changed team data")
+            rebuild_standings_snapshot()
         print(f"Successfully stored {len(nba_teams)} teams")
         return True
         
@@ -87,6 +73,21 @@ def fetch_and_store_teams():
         db.session.rollback()
         return False
 
+def standings_rows(standings_df, season, now=None):
+    """LeagueStandings frame -> team_stats rows (record and conference rank) for `season`"""
+    rows = frame_records(standings_df[['TeamID', 'WINS', 'LOSSES', 'WinPCT', 'PlayoffRank']].rename(columns={
+        'TeamID': 'team_id',
+        'WINS': 'wins',
+        'LOSSES': 'losses',
+        'WinPCT': 'win_pct',
+        'PlayoffRank': 'conference_rank'
+    }))
+    now = now or datetime.utcnow()
+    for row in rows:
+        row['season'] = season
+        row['last_updated'] = now
+    return rows
+
 def fetch_and_store_standings():
     """Fetch current NBA standings and store team stats"""
     try:
@@ -94,42 +95,29 @@ def fetch_and_store_standings():
             print("Standings data is fresh, skipping refresh")
             return True
             
-        print("Fetching NBA standings...")
-        standings_api = safe_api_call(leaguestandings.LeagueStandings)
+        season = current_season()
+        print(f"Fetching NBA standings for {season}...")
+        standings_api = safe_api_call(leaguestandings.LeagueStandings, season=season)
         standings_df = standings_api.get_data_frames()[0]
         
-        for _, row in standings_df.iterrows():
-            team_id = row['TeamID']
-            
-            # Ensure team exists
-            team = Team.query.get(team_id)
-            if not team:
-                continue
-                
-            # Update team conference if not set
-            if not team.conference:
-                team.conference = row['Conference']
-            
-            # Update or create team stats
-            team_stats = TeamStats.query.get(team_id)
-            if team_stats:
-                team_stats.wins = row['WINS']
-                team_stats.losses = row['LOSSES']
-                team_stats.win_pct = row['WinPCT']
-                team_stats.conference_rank = row['PlayoffRank']
-                team_stats.last_updated = datetime.utcnow()
-            else:
-                team_stats = TeamStats(
-                    team_id=team_id,
-                    wins=row['WINS'],
-                    losses=row['LOSSES'],
-                    win_pct=row['WinPCT'],
-                    conference_rank=row['PlayoffRank']
-                )
-                db.session.add(team_stats)
+        # Only keep teams we know about
+        registry = get_team_registry()
+        standings_df = standings_df[standings_df['TeamID'].isin(list(registry.by_id))]
+        
+        # Update team conference if not set
+        conferences_changed = False
+        for team_id, conference in zip(standings_df['TeamID'], standings_df['Conference']):
+            if registry.conference(team_id) in (None, '', 'Unknown'):
+                Team.query.filter_by(id=int(team_id)).update({'conference': conference})
+                conferences_changed = True
+        
+        bulk_upsert(TeamStats, standings_rows(standings_df, season))
         
         db.session.commit()
+        if conferences_changed:
+            refresh_team_registry()
         update_refresh_time('standings')
+        rebuild_standings_snapshot()
         print("Successfully updated standings")
         return True
         
@@ -139,8 +127,9 @@ def fetch_and_store_standings():
         db.session.rollback()
         return False
 
-def fetch_and_store_team_stats(team_id, season='2024-25'):
+def fetch_and_store_team_stats(team_id, season=None):
     """Fetch detailed team stats and update database - FIXED to get per-game averages"""
+    season = season or current_season()
     try:
         print(f"Fetching team stats for team ID: {team_id}")
         
@@ -157,21 +146,14 @@ def fetch_and_store_team_stats(team_id, season='2024-25'):
         
         if not team_stats_df.empty:
             stats_row = team_stats_df.iloc[0]
-            
-            team_stats = TeamStats.query.get(team_id)
-            if team_stats:
-                team_stats.points_per_game = float(stats_row.get('PTS', 0.0))
-                team_stats.rebounds_per_game = float(stats_row.get('REB', 0.0))
-                team_stats.assists_per_game = float(stats_row.get('AST', 0.0))
-                team_stats.last_updated = datetime.utcnow()
-            else:
-                team_stats = TeamStats(
-                    team_id=team_id,
-                    points_per_game=float(stats_row.get('PTS', 0.0)),
-                    rebounds_per_game=float(stats_row.get('REB', 0.0)),
-                    assists_per_game=float(stats_row.get('AST', 0.0))
-                )
-                db.session.add(team_stats)
+            bulk_upsert(TeamStats, [{
+                'team_id': team_id,
+                'season': season,
+                'points_per_game': float(stats_row.get('PTS', 0.0)),
+                'rebounds_per_game': float(stats_row.get('REB', 0.0)),
+                'assists_per_game': float(stats_row.get('AST', 0.0)),
+                'last_updated': datetime.utcnow()
+            }])
         
         db.session.commit()
         print(f"Successfully updated team stats for team {team_id}")
@@ -182,8 +164,13 @@ def fetch_and_store_team_stats(team_id, season='2024-25'):
         db.session.rollback()
         return False
     
-def fetch_and_store_team_roster(team_id, season='2024-25'):
-    """Fetch team roster and player stats"""
+def fetch_and_store_team_roster(team_id, season=None, season_stats=None):
+    """Fetch team roster and player stats
+
+    If `season_stats` (from fetch_season_player_stats) is given, player averages
+    are looked up from it instead of one PlayerGameLog call per player.
+    """
+    season = season or current_season()
     try:
         print(f"Fetching roster for team ID: {team_id}")
         
@@ -192,72 +179,37 @@ def fetch_and_store_team_roster(team_id, season='2024-25'):
         roster_df = roster_api.get_data_frames()[0]
         
         # Get team info for filtering player stats
-        team = Team.query.get(team_id)
+        team = get_team_registry().get(team_id)
         if not team:
             print(f"Team {team_id} not found in database")
             return False
         
-        for _, player_row in roster_df.iterrows():
+        now = datetime.utcnow()
+        player_rows = []
+        stats_rows = []
+        for player_row in frame_records(roster_df):
             player_id = player_row['PLAYER_ID']
+            player_rows.append({
+                'id': player_id,
+                'full_name': player_row['PLAYER'],
+                'jersey': str(player_row['NUM']) if player_row['NUM'] is not None else None,
+                'position': player_row['POSITION'],
+                'height': player_row['HEIGHT'],
+                'weight': str(player_row['WEIGHT']) if player_row['WEIGHT'] is not None else None,
+                'team_id': team_id,
+                'last_updated': now
+            })
             
-            # Update or create player
-            player = Player.query.get(player_id)
-            if player:
-                player.full_name = player_row['PLAYER']
-                player.jersey = str(player_row['NUM']) if pd.notna(player_row['NUM']) else None
-                player.position = player_row['POSITION']
-                player.height = player_row['HEIGHT']
-                player.weight = str(player_row['WEIGHT']) if pd.notna(player_row['WEIGHT']) else None
-                player.team_id = team_id
-                player.last_updated = datetime.utcnow()
+            # Get player season stats from the bulk lookup, or per player as a fallback
+            if season_stats is not None:
+                player_stats = season_stats.get((player_id, team_id), EMPTY_PLAYER_STATS)
             else:
-                player = Player(
-                    id=player_id,
-                    full_name=player_row['PLAYER'],
-                    jersey=str(player_row['NUM']) if pd.notna(player_row['NUM']) else None,
-                    position=player_row['POSITION'],
-                    height=player_row['HEIGHT'],
-                    weight=str(player_row['WEIGHT']) if pd.notna(player_row['WEIGHT']) else None,
-                    team_id=team_id
-                )
-                db.session.add(player)
-            
-            # Get player season stats using the corrected function
-            player_stats = get_player_season_stats(player_id, team_id, season)
-            
-            # Update or create player stats
-            existing_stats = PlayerStats.query.get(player_id)
-            if existing_stats:
-                existing_stats.gp = player_stats['GP']
-                existing_stats.min_pg = player_stats['MIN']
-                existing_stats.pts_pg = player_stats['PTS']
-                existing_stats.oreb_pg = player_stats['OREB']
-                existing_stats.dreb_pg = player_stats['DREB']
-                existing_stats.reb_pg = player_stats['REB']
-                existing_stats.ast_pg = player_stats['AST']
-                existing_stats.stl_pg = player_stats['STL']
-                existing_stats.blk_pg = player_stats['BLK']
-                existing_stats.to_pg = player_stats['TO']
-                existing_stats.pf_pg = player_stats['PF']
-                existing_stats.ast_to = player_stats['AST_TO']
-                existing_stats.last_updated = datetime.utcnow()
-            else:
-                stats_record = PlayerStats(
-                    player_id=player_id,
-                    gp=player_stats['GP'],
-                    min_pg=player_stats['MIN'],
-                    pts_pg=player_stats['PTS'],
-                    oreb_pg=player_stats['OREB'],
-                    dreb_pg=player_stats['DREB'],
-                    reb_pg=player_stats['REB'],
-                    ast_pg=player_stats['AST'],
-                    stl_pg=player_stats['STL'],
-                    blk_pg=player_stats['BLK'],
-                    to_pg=player_stats['TO'],
-                    pf_pg=player_stats['PF'],
-                    ast_to=player_stats['AST_TO']
-                )
-                db.session.add(stats_record)
+                player_stats = get_player_season_stats(player_id, team_id, season)
+            stats_rows.append(player_stats_row(player_id, team_id, season, player_stats, now))
+        
+        # Players first so the player_stats foreign keys resolve
+        bulk_upsert(Player, player_rows)
+        bulk_upsert(PlayerStats, stats_rows)
         
         db.session.commit()
         print(f"Successfully updated roster for team {team_id}")
@@ -269,8 +221,90 @@ def fetch_and_store_team_roster(team_id, season='2024-25'):
         db.session.rollback()
         return False
 
-def get_player_season_stats(player_id, team_id, season='2024-25'):
+def fetch_season_player_game_logs(season=None):
+    """Fetch every player's regular season game logs in a single league-level call"""
+    season = season or current_season()
+    logs_api = safe_api_call(
+        leaguegamelog.LeagueGameLog,
+        player_or_team_abbreviation='P',
+        season=season,
+        season_type_all_star=SeasonType.regular
+    )
+    return logs_api.get_data_frames()[0]
+
+def compute_player_season_averages(logs_df):
+    """Average a multi-player game log frame into one row per (PLAYER_ID, TEAM_ID)
+
+    Players traded mid-season get one row per team they played for.
+    """
+    return aggregate_player_game_logs(logs_df, get_team_registry().id_by_abbr)
+
+def fetch_season_player_stats(season=None):
+    """Return {(player_id, team_id): stats dict} for every player in the season"""
+    return averages_to_lookup(compute_player_season_averages(fetch_season_player_game_logs(season)))
+
+def fetch_and_store_all_player_stats(season=None):
+    """Update stats for every player in the database from one bulk game log fetch"""
+    season = season or current_season()
+    try:
+        print(f"Fetching league-wide player game logs for {season}...")
+        season_stats = fetch_season_player_stats(season)
+        
+        now = datetime.utcnow()
+        player_teams = db.session.query(Player.id, Player.team_id).filter(Player.team_id.isnot(None)).all()
+        rows = [
+            player_stats_row(player_id, team_id, season, season_stats.get((player_id, team_id), EMPTY_PLAYER_STATS), now)
+            for player_id, team_id in player_teams
+        ]
+        updated = bulk_upsert(PlayerStats, rows)
+        
+        db.session.commit()
+        rebuild_analytics()
+        print(f"Successfully updated stats for {updated} players")
+        return True
+        
+    except Exception as e:
+        print(f"Error fetching league player stats: {str(e)}")
+        traceback.print_exc()
+        db.session.rollback()
+        return False
+
+def rebuild_analytics():
+    """Recompute the in-memory analytics cube after player stats were written"""
+    try:
+        from analytics_cube import rebuild_analytics_cube
+        rebuild_analytics_cube()
+    except Exception as e:
+        print(f"✗ Failed to rebuild analytics: {str(e)}")
+
+def player_stats_row(player_id, team_id, season, player_stats, now=None):
+    """Map a stats dict (GP/MIN/PTS/... keys) onto player_stats table columns"""
+    return {
+        'player_id': player_id,
+        'season': season,
+        'team_id': team_id,
+        'gp': player_stats['GP'],
+        'min_pg': player_stats['MIN'],
+        'pts_pg': player_stats['PTS'],
+        'oreb_pg': player_stats['OREB'],
+        'dreb_pg': player_stats['DREB'],
+        'reb_pg': player_stats['REB'],
+        'ast_pg': player_stats['AST'],
+        'stl_pg': player_stats['STL'],
+        'blk_pg': player_stats['BLK'],
+        'to_pg': player_stats['TO'],
+        'pf_pg': player_stats['PF'],
+        'ast_to': player_stats['AST_TO'],
+        'last_updated': now or datetime.utcnow()
+    }
+
+def store_player_stats(player_id, team_id, season, player_stats):
+    """Update or create a player's PlayerStats row for one team and season (caller commits)"""
+    bulk_upsert(PlayerStats, [player_stats_row(player_id, team_id, season, player_stats)])
+
+def get_player_season_stats(player_id, team_id, season=None):
     """Get player season averages - FIXED VERSION following test.py pattern"""
+    season = season or current_season()
     try:
         # Get player game logs
         logs_api = safe_api_call(
@@ -281,57 +315,48 @@ def get_player_season_stats(player_id, team_id, season='2024-25'):
         )
         logs_df = logs_api.get_data_frames()[0]
         
-        if logs_df.empty:
-            return {k: 0 for k in ['GP','MIN','PTS','OREB','DREB','REB','AST','STL','BLK','TO','PF','AST_TO']}
-        
-        # Get team abbreviation for filtering - FIXED: Use team_id instead of team_abbr parameter
-        nba_teams = teams.get_teams()
-        team_abbr = next((team['abbreviation'] for team in nba_teams if team['id'] == team_id), None)
-        
-        if team_abbr is None:
-            return {k: 0 for k in ['GP','MIN','PTS','OREB','DREB','REB','AST','STL','BLK','TO','PF','AST_TO']}
-        
-        # Filter logs for current team - FIXED: Use the exact same logic as test.py
-        team_logs = logs_df[logs_df['MATCHUP'].str.startswith(team_abbr)].copy()
-        
-        if team_logs.empty:
-            return {k: 0 for k in ['GP','MIN','PTS','OREB','DREB','REB','AST','STL','BLK','TO','PF','AST_TO']}
-        
-        # Calculate averages - FIXED: Use the exact same logic as test.py
-        gp = team_logs.shape[0]  # Use shape[0] like in test.py
-        team_logs.loc[:, 'MIN_float'] = team_logs['MIN'].apply(convert_min_to_float)
-        
-        avg_min = team_logs['MIN_float'].mean()
-        avg_pts = team_logs['PTS'].mean()
-        avg_oreb = team_logs['OREB'].mean()
-        avg_dreb = team_logs['DREB'].mean()
-        avg_reb = team_logs['REB'].mean()
-        avg_ast = team_logs['AST'].mean()
-        avg_stl = team_logs['STL'].mean()
-        avg_blk = team_logs['BLK'].mean()
-        avg_to = team_logs['TOV'].mean()  # Note: TOV in API response
-        avg_pf = team_logs['PF'].mean()
-        
-        ast_to = avg_ast / avg_to if avg_to > 0 else 0
-        
-        return {
-            'GP': gp,
-            'MIN': round(avg_min, 1),
-            'PTS': round(avg_pts, 1),
-            'OREB': round(avg_oreb, 1),
-            'DREB': round(avg_dreb, 1),
-            'REB': round(avg_reb, 1),
-            'AST': round(avg_ast, 1),
-            'STL': round(avg_stl, 1),
-            'BLK': round(avg_blk, 1),
-            'TO': round(avg_to, 1),
-            'PF': round(avg_pf, 1),
-            'AST_TO': round(ast_to, 2)
-        }
+        # Split by team from MATCHUP and average in one vectorized pass
+        averages = averages_to_lookup(compute_player_season_averages(logs_df.assign(PLAYER_ID=player_id)))
+        return averages.get((player_id, team_id), dict(EMPTY_PLAYER_STATS))
         
     except Exception as e:
         print(f"Error getting stats for player {player_id}: {str(e)}")
-        return {k: 0 for k in ['GP','MIN','PTS','OREB','DREB','REB','AST','STL','BLK','TO','PF','AST_TO']}
+        return dict(EMPTY_PLAYER_STATS)
+
+def fetch_scoreboard_rows(game_date, use_cache=True):
+    """Game rows (as stored in `games`) for one date from ScoreboardV2"""
+    scoreboard = safe_api_call(
+        scoreboardv2.ScoreboardV2, game_date=game_date.strftime('%m/%d/%Y'), use_cache=use_cache
+    )
+    games_df = scoreboard.get_data_frames()[0]  # GameHeader
+    line_score_df = scoreboard.get_data_frames()[1]  # LineScore
+    
+    # Attach home/visitor points with two merges instead of filtering per game
+    points = line_score_df[['GAME_ID', 'TEAM_ID', 'PTS']]
+    games_df = games_df.merge(
+        points.rename(columns={'TEAM_ID': 'HOME_TEAM_ID', 'PTS': 'HOME_PTS'}),
+        on=['GAME_ID', 'HOME_TEAM_ID'], how='left'
+    ).merge(
+        points.rename(columns={'TEAM_ID': 'VISITOR_TEAM_ID', 'PTS': 'VISITOR_PTS'}),
+        on=['GAME_ID', 'VISITOR_TEAM_ID'], how='left'
+    )
+    
+    now = datetime.utcnow()
+    return [{
+        'id': game_row['GAME_ID'],
+        'home_team_id': game_row['HOME_TEAM_ID'],
+        'visitor_team_id': game_row['VISITOR_TEAM_ID'],
+        'game_date': game_date,
+        'game_time': game_row.get('GAME_STATUS_TEXT') or '',
+        'status_id': game_row['GAME_STATUS_ID'],
+        'status_text': game_row['GAME_STATUS_TEXT'],
+        'home_team_score': game_row['HOME_PTS'],
+        'visitor_team_score': game_row['VISITOR_PTS'],
+        'last_updated': now
+    } for game_row in frame_records(games_df)]
+
+# Teams, date and tip-off text are fixed once a game exists; scores and status move
+GAME_SCORE_COLUMNS = ['home_team_score', 'visitor_team_score', 'status_id', 'status_text', 'last_updated']
 
 def fetch_and_store_games(date_str=None):
     """Fetch games for a specific date"""
@@ -346,53 +371,12 @@ def fetch_and_store_games(date_str=None):
             date_obj = datetime.strptime(date_str, '%m/%d/%Y')
         except ValueError:
             date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            
-        api_date_str = date_obj.strftime('%m/%d/%Y')
+        
         db_date = date_obj.date()
+        rows = fetch_scoreboard_rows(db_date)
         
-        # Get scoreboard for the date
-        scoreboard = safe_api_call(scoreboardv2.ScoreboardV2, game_date=api_date_str)
-        games_df = scoreboard.get_data_frames()[0]  # GameHeader
-        line_score_df = scoreboard.get_data_frames()[1]  # LineScore
-        
-        for _, game_row in games_df.iterrows():
-            game_id = game_row['GAME_ID']
-            
-            # Get scores from line score data
-            game_line_scores = line_score_df[line_score_df['GAME_ID'] == game_id]
-            home_score = None
-            visitor_score = None
-            
-            if not game_line_scores.empty:
-                home_team_row = game_line_scores[game_line_scores['TEAM_ID'] == game_row['HOME_TEAM_ID']]
-                visitor_team_row = game_line_scores[game_line_scores['TEAM_ID'] == game_row['VISITOR_TEAM_ID']]
-                
-                if not home_team_row.empty:
-                    home_score = home_team_row['PTS'].iloc[0]
-                if not visitor_team_row.empty:
-                    visitor_score = visitor_team_row['PTS'].iloc[0]
-            
-            # Update or create game
-            game = Game.query.get(game_id)
-            if game:
-                game.home_team_score = home_score
-                game.visitor_team_score = visitor_score
-                game.status_id = game_row['GAME_STATUS_ID']
-                game.status_text = game_row['GAME_STATUS_TEXT']
-                game.last_updated = datetime.utcnow()
-            else:
-                game = Game(
-                    id=game_id,
-                    home_team_id=game_row['HOME_TEAM_ID'],
-                    visitor_team_id=game_row['VISITOR_TEAM_ID'],
-                    game_date=db_date,
-                    game_time=game_row.get('GAME_STATUS_TEXT', ''),
-                    status_id=game_row['GAME_STATUS_ID'],
-                    status_text=game_row['GAME_STATUS_TEXT'],
-                    home_team_score=home_score,
-                    visitor_team_score=visitor_score
-                )
-                db.session.add(game)
+        bulk_upsert(Game, rows, update_columns=GAME_SCORE_COLUMNS)
+        update_game_watermarks([db_date])
         
         db.session.commit()
         print(f"Successfully updated games for {date_str}")
@@ -428,6 +412,13 @@ def initialize_database():
         else:
             print("✗ Failed to load today's games")
         
+        # Whole season schedule and results in one call
+        from game_ingest import backfill_season
+        if backfill_season():
+            print("✓ Season games loaded")
+        else:
+            print("✗ Failed to load season games")
+        
         print("Database initialization completed!")
         return True
         
@@ -435,26 +426,14 @@ def initialize_database():
         print(f"Error initializing database: {str(e)}")
         return False
 
-def refresh_all_team_data():
-    """Refresh roster and stats for all teams"""
+def refresh_all_team_data(max_workers=None):
+    """Refresh roster and stats for all teams using the concurrent refresh engine"""
     try:
-        teams_list = Team.query.all()
-        print(f"Refreshing data for {len(teams_list)} teams...")
-        
-        for i, team in enumerate(teams_list, 1):
-            print(f"Processing team {i}/{len(teams_list)}: {team.full_name}")
-            
-            # Fetch team stats
-            fetch_and_store_team_stats(team.id)
-            
-            # Fetch roster (this is time-consuming due to player stats)
-            fetch_and_store_team_roster(team.id)
-            
-            # Add delay to avoid rate limiting
-            time.sleep(2)
+        from refresh_engine import refresh_league, DEFAULT_WORKERS
+        results = refresh_league(max_workers=max_workers or DEFAULT_WORKERS)
         
         print("All team data refreshed!")
-        return True
+        return all(r['stats_ok'] and r['roster_ok'] for r in results)
         
     except Exception as e:
         print(f"Error refreshing team data: {str(e)}")
@@ -463,39 +442,7 @@ def refresh_all_team_data():
 # Utility functions for maintenance
 def get_team_conference_mapping():
     """Return proper conference mapping for teams"""
-    eastern_teams = {
-        1610612737: 'East',  # Atlanta Hawks
-        1610612738: 'East',  # Boston Celtics
-        1610612751: 'East',  # Brooklyn Nets
-        1610612766: 'East',  # Charlotte Hornets
-        1610612741: 'East',  # Chicago Bulls
-        1610612739: 'East',  # Cleveland Cavaliers
-        1610612743: 'West',  # Denver Nuggets
-        1610612765: 'East',  # Detroit Pistons
-        1610612744: 'West',  # Golden State Warriors
-        1610612745: 'West',  # Houston Rockets
-        1610612754: 'East',  # Indiana Pacers
-        1610612746: 'West',  # LA Clippers
-        1610612747: 'West',  # Los Angeles Lakers
-        1610612763: 'West',  # Memphis Grizzlies
-        1610612748: 'East',  # Miami Heat
-        1610612749: 'East',  # Milwaukee Bucks
-        1610612750: 'West',  # Minnesota Timberwolves
-        1610612740: 'West',  # New Orleans Pelicans
-        1610612752: 'East',  # New York Knicks
-        1610612760: 'West',  # Oklahoma City Thunder
-        1610612753: 'East',  # Orlando Magic
-        1610612755: 'East',  # Philadelphia 76ers
-        1610612756: 'West',  # Phoenix Suns
-        1610612757: 'West',  # Portland Trail Blazers
-        1610612758: 'West',  # Sacramento Kings
-        1610612759: 'West',  # San Antonio Spurs
-        1610612761: 'East',  # Toronto Raptors
-        1610612762: 'West',  # Utah Jazz
-        1610612764: 'East',  # Washington Wizards
-        1610612742: 'West',  # Dallas Mavericks
-    }
-    return eastern_teams
+    return dict(TEAM_CONFERENCES)
 
 def update_team_conferences():
     """Update team conferences in database"""
@@ -508,6 +455,8 @@ def update_team_conferences():
                 team.conference = conference
                 
         db.session.commit()
+        if refresh_team_registry():
+            rebuild_standings_snapshot()
         print("Team conferences updated successfully")
         return True
         
@@ -517,8 +466,9 @@ def update_team_conferences():
         return False
 
 # FIXED: Updated helper functions to use team_id instead of team_abbr
-def update_player_stats_only(player_id, team_id=None, season='2024-25'):
+def update_player_stats_only(player_id, team_id=None, season=None, season_stats=None):
     """Update stats for a single player without touching roster info"""
+    season = season or current_season()
     try:
         # Get player info
         player = Player.query.get(player_id)
@@ -531,49 +481,21 @@ def update_player_stats_only(player_id, team_id=None, season='2024-25'):
             team_id = player.team_id
         
         # Get team info
-        team = Team.query.get(team_id)
+        team = get_team_registry().get(team_id)
         if not team:
             print(f"Team {team_id} not found")
             return False
         
         print(f"Updating stats for {player.full_name} ({team.abbreviation})...")
         
-        # Get updated stats using the corrected function
-        player_stats = get_player_season_stats(player_id, team_id, season)
+        # Get updated stats from the bulk lookup if the caller already fetched it
+        if season_stats is not None:
+            player_stats = season_stats.get((player_id, team_id), EMPTY_PLAYER_STATS)
+        else:
+            player_stats = get_player_season_stats(player_id, team_id, season)
         
         # Update or create player stats
-        existing_stats = PlayerStats.query.get(player_id)
-        if existing_stats:
-            existing_stats.gp = player_stats['GP']
-            existing_stats.min_pg = player_stats['MIN']
-            existing_stats.pts_pg = player_stats['PTS']
-            existing_stats.oreb_pg = player_stats['OREB']
-            existing_stats.dreb_pg = player_stats['DREB']
-            existing_stats.reb_pg = player_stats['REB']
-            existing_stats.ast_pg = player_stats['AST']
-            existing_stats.stl_pg = player_stats['STL']
-            existing_stats.blk_pg = player_stats['BLK']
-            existing_stats.to_pg = player_stats['TO']
-            existing_stats.pf_pg = player_stats['PF']
-            existing_stats.ast_to = player_stats['AST_TO']
-            existing_stats.last_updated = datetime.utcnow()
-        else:
-            stats_record = PlayerStats(
-                player_id=player_id,
-                gp=player_stats['GP'],
-                min_pg=player_stats['MIN'],
-                pts_pg=player_stats['PTS'],
-                oreb_pg=player_stats['OREB'],
-                dreb_pg=player_stats['DREB'],
-                reb_pg=player_stats['REB'],
-                ast_pg=player_stats['AST'],
-                stl_pg=player_stats['STL'],
-                blk_pg=player_stats['BLK'],
-                to_pg=player_stats['TO'],
-                pf_pg=player_stats['PF'],
-                ast_to=player_stats['AST_TO']
-            )
-            db.session.add(stats_record)
+        store_player_stats(player_id, team_id, season, player_stats)
         
         db.session.commit()
         print(f"✓ Updated stats for {player.full_name}: {player_stats['PTS']} PPG, {player_stats['REB']} RPG, {player_stats['AST']} APG")
@@ -584,11 +506,12 @@ def update_player_stats_only(player_id, team_id=None, season='2024-25'):
         db.session.rollback()
         return False
 
-def update_team_player_stats_only(team_id, season='2024-25'):
+def update_team_player_stats_only(team_id, season=None):
     """Update stats for all players on a specific team (stats only, no roster changes)"""
+    season = season or current_season()
     try:
         # Get team info
-        team = Team.query.get(team_id)
+        team = get_team_registry().get(team_id)
         if not team:
             print(f"Team {team_id} not found")
             return False
@@ -601,16 +524,17 @@ def update_team_player_stats_only(team_id, season='2024-25'):
         
         print(f"Updating stats for {len(players)} players on {team.full_name}...")
         
+        # One league game log call covers every player on the team
+        season_stats = fetch_season_player_stats(season)
+        
         success_count = 0
         for i, player in enumerate(players, 1):
             print(f"Progress: {i}/{len(players)} - {player.full_name}")
             
-            if update_player_stats_only(player.id, team_id, season):
+            if update_player_stats_only(player.id, team_id, season, season_stats=season_stats):
                 success_count += 1
-            
-            # Rate limiting
-            time.sleep(0.6)
         
+        rebuild_analytics()
         print(f"✓ Successfully updated stats for {success_count}/{len(players)} players on {team.full_name}")
         return success_count == len(players)
         
@@ -623,7 +547,8 @@ if __name__ == "__main__":
     print("Testing NBA Data Fetcher...")
     
     # Initialize database
-    from db import app
+    from db import create_app
+    app = create_app(role='fetcher')
     with app.app_context():
         db.create_all()
         
@@ -1,23 +1,50 @@
 # db.py - Database connection and schema setup using SQLAlchemy
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
 from flask import Flask
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import aliased
 from dotenv import load_dotenv
+from db_pool import engine_options
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app and database
-app = Flask(__name__)
+# Database handle; bound to a Flask app by create_app()
+db = SQLAlchemy()
 
-# Configure for MySQL instead of SQLite
-app.config.update({
-    'SQLALCHEMY_DATABASE_URI': f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}",
-    'SQLALCHEMY_TRACK_MODIFICATIONS': False
-})
+def create_app(role='fetcher'):
+    """Build a Flask app bound to the database.
 
-db = SQLAlchemy(app)
+    `role` is 'web' for request-serving processes and 'fetcher' for scripts
+    and refresh workers. Building the app never touches the database; schema
+    and seed work is left to the caller.
+    """
+    app = Flask(__name__)
+    
+    # Configure for MySQL instead of SQLite (DATABASE_URL overrides, e.g. sqlite:// for tests)
+    database_uri = os.getenv('DATABASE_URL') or f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
+    app.config.update({
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        # Pool sizing, pre-ping and recycle per role; see db_pool.POOL_DEFAULTS
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(role, database_uri),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'PROCESS_ROLE': role
+    })
+    
+    db.init_app(app)
+    return app
+
+def season_for_date(day):
+    """'2024-25' for any date from October 2024 through September 2025"""
+    start_year = day.year if day.month >= 10 else day.year - 1
+    return f"{start_year}-{str(start_year + 1)[2:]}"
+
+def current_season():
+    """Season served and refreshed by default: NBA_SEASON, else the latest one to start"""
+    return os.getenv('NBA_SEASON') or season_for_date(date.today())
 
 # Models
 class Team(db.Model):
@@ -33,6 +60,7 @@ class Team(db.Model):
 class TeamStats(db.Model):
     __tablename__ = 'team_stats'
     team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), primary_key=True)
+    season = db.Column(db.String(10), primary_key=True)
     wins = db.Column(db.Integer, default=0, nullable=False)
     losses = db.Column(db.Integer, default=0, nullable=False)
     win_pct = db.Column(db.Float, default=0, nullable=False)
@@ -41,6 +69,11 @@ class TeamStats(db.Model):
     rebounds_per_game = db.Column(db.Float, default=0, nullable=False)
     assists_per_game = db.Column(db.Float, default=0, nullable=False)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Standings and history read one season at a time
+    __table_args__ = (
+        db.Index('ix_team_stats_season', 'season'),
+    )
 
 class Player(db.Model):
     __tablename__ = 'players'
@@ -52,10 +85,18 @@ class Player(db.Model):
     weight = db.Column(db.String(10))
     team_id = db.Column(db.Integer, db.ForeignKey('teams.id'))
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Every roster query filters on team_id
+    __table_args__ = (
+        db.Index('ix_players_team_id', 'team_id'),
+    )
 
 class PlayerStats(db.Model):
     __tablename__ = 'player_stats'
     player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+    season = db.Column(db.String(10), primary_key=True)
+    # Team the averages were played for; traded players have one row per team
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), primary_key=True)
     gp = db.Column(db.Integer, default=0, nullable=False)
     min_pg = db.Column(db.Float, default=0, nullable=False)
     pts_pg = db.Column(db.Float, default=0, nullable=False)
@@ -69,6 +110,11 @@ class PlayerStats(db.Model):
     pf_pg = db.Column(db.Float, default=0, nullable=False)
     ast_to = db.Column(db.Float, default=0, nullable=False)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Season-wide leaderboards and per-team splits of one season
+    __table_args__ = (
+        db.Index('ix_player_stats_season_team', 'season', 'team_id'),
+    )
 
 class Game(db.Model):
     __tablename__ = 'games'
@@ -82,18 +128,141 @@ class Game(db.Model):
     home_team_score = db.Column(db.Integer)
     visitor_team_score = db.Column(db.Integer)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Slates are read by date; team schedules OR the two team columns and order by date;
+    # the ratings update reads only games written since it last ran
+    __table_args__ = (
+        db.Index('ix_games_game_date', 'game_date'),
+        db.Index('ix_games_home_team_date', 'home_team_id', 'game_date'),
+        db.Index('ix_games_visitor_team_date', 'visitor_team_id', 'game_date'),
+        db.Index('ix_games_last_updated', 'last_updated'),
+    )
 
 class RefreshTracker(db.Model):
     __tablename__ = 'refresh_tracker'
     entity = db.Column(db.String(100), primary_key=True)
     last_refresh = db.Column(db.DateTime, default=datetime.utcnow)
 
+class SchemaMigration(db.Model):
+    """Versions from schema_migrations.MIGRATIONS already applied to this database"""
+    __tablename__ = 'schema_migrations'
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class GameDateWatermark(db.Model):
+    """Per-date ingestion state; complete dates (past, every game final) are never re-fetched"""
+    __tablename__ = 'game_date_watermarks'
+    game_date = db.Column(db.Date, primary_key=True)
+    games = db.Column(db.Integer, default=0, nullable=False)
+    final_games = db.Column(db.Integer, default=0, nullable=False)
+    complete = db.Column(db.Boolean, default=False, nullable=False)
+    last_checked = db.Column(db.DateTime, default=datetime.utcnow)
+
+class LeagueLeader(db.Model):
+    """One row of a stats.nba.com league leaderboard; rank is the 1-based position within the category"""
+    __tablename__ = 'league_leaders'
+    season = db.Column(db.String(10), primary_key=True)
+    category = db.Column(db.String(20), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, nullable=False)
+    player_name = db.Column(db.String(100), nullable=False)
+    team_id = db.Column(db.Integer)
+    team_abbreviation = db.Column(db.String(10))
+    gp = db.Column(db.Integer, default=0)
+    value = db.Column(db.Float)
+    last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TeamRating(db.Model):
+    """Current rating of each team under the model tracked in RatingWatermark"""
+    __tablename__ = 'team_ratings'
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), primary_key=True)
+    rating = db.Column(db.Float, nullable=False)
+    games_played = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class RatingWatermark(db.Model):
+    """How far team_ratings has been advanced: the last applied game and the last settled date"""
+    __tablename__ = 'rating_watermarks'
+    model = db.Column(db.String(20), primary_key=True)
+    params = db.Column(db.String(200), nullable=False)  # ratings are rebuilt when these change
+    season = db.Column(db.String(10))
+    last_game_date = db.Column(db.Date)
+    last_game_id = db.Column(db.String(50))
+    settled_through = db.Column(db.Date)
+    games_applied = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class BacktestResult(db.Model):
+    """One parameter set's replayed accuracy over one season ('all' = every season); written by backtest.py"""
+    __tablename__ = 'backtest_results'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    season = db.Column(db.String(10), nullable=False, index=True)
+    params = db.Column(db.String(200), nullable=False)
+    k = db.Column(db.Float)
+    home_advantage = db.Column(db.Float)
+    season_regression = db.Column(db.Float)
+    margin = db.Column(db.Boolean)
+    is_default = db.Column(db.Boolean, default=False)
+    games = db.Column(db.Integer, default=0)
+    correct = db.Column(db.Integer, default=0)
+    accuracy = db.Column(db.Float)
+    brier = db.Column(db.Float)
+    log_loss = db.Column(db.Float)
+    calibration = db.Column(db.Text)  # JSON [[bucket_low, games, mean_predicted, home_win_rate], ...]
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def _join_game_teams(make_query, outer):
+    home_team = aliased(Team, name='home_team')
+    visitor_team = aliased(Team, name='visitor_team')
+    join = 'outerjoin' if outer else 'join'
+    query = make_query(Game, home_team, visitor_team)
+    query = getattr(query, join)(home_team, Game.home_team_id == home_team.id)
+    return getattr(query, join)(visitor_team, Game.visitor_team_id == visitor_team.id)
+
+def games_with_teams_query(outer=False):
+    """Query yielding (Game, home Team, visitor Team) tuples in a single SELECT.
+
+    With outer=True games whose teams are missing come back with None teams.
+    """
+    return _join_game_teams(db.session.query, outer)
+
+def games_with_teams_select(outer=False):
+    """The same SELECT as a select() statement, for sessions outside Flask (asgi.py)"""
+    return _join_game_teams(select, outer)
+
+def player_stats_join(season=None):
+    """Join condition for players' stats with their current team in `season` (default current)"""
+    return and_(
+        PlayerStats.player_id == Player.id,
+        PlayerStats.team_id == Player.team_id,
+        PlayerStats.season == (season or current_season())
+    )
+
 def should_refresh(entity, hours=6):
     tracker = RefreshTracker.query.filter_by(entity=entity).first()
     if not tracker:
         return True
     return datetime.utcnow() - tracker.last_refresh > timedelta(hours=hours)
 
+# last_refresh of an entity another process asked to refresh; due under any interval
+REFRESH_REQUESTED = datetime(1970, 1, 1)
+
+def request_refresh(entity):
+    """Mark `entity` due so the refresh process's ticker runs it"""
+    tracker = RefreshTracker.query.get(entity)
+    if tracker:
+        tracker.last_refresh = REFRESH_REQUESTED
+    else:
+        db.session.add(RefreshTracker(entity=entity, last_refresh=REFRESH_REQUESTED))
+    db.session.commit()
+
+def requested_refreshes():
+    """Entities marked by request_refresh() and not refreshed since"""
+    return [tracker.entity for tracker in RefreshTracker.query.filter(
+        RefreshTracker.last_refresh <= REFRESH_REQUESTED
+    )]
+
 def update_refresh_time(entity):
     now = datetime.utcnow()
     tracker = RefreshTracker.query.get(entity)
@@ -104,6 +273,45 @@ def update_refresh_time(entity):
         db.session.add(tracker)
     db.session.commit()
 
+def completed_game_dates(start_date, end_date):
+    """Dates in [start_date, end_date] whose games are all final"""
+    rows = db.session.query(GameDateWatermark.game_date).filter(
+        GameDateWatermark.game_date.between(start_date, end_date),
+        GameDateWatermark.complete.is_(True)
+    ).all()
+    return {row.game_date for row in rows}
+
+def update_game_watermarks(dates):
+    """Recount stored games for `dates` after they were fetched; the caller commits.
+
+    A date is complete once it is in the past and every game on it is final
+    (status_id 3). Fetched dates with no games count as complete too.
+    """
+    dates = set(dates)
+    if not dates:
+        return 0
+    counts = {row.game_date: row for row in db.session.query(
+        Game.game_date,
+        func.count(Game.id).label('games'),
+        func.sum(case((Game.status_id == 3, 1), else_=0)).label('final_games')
+    ).filter(Game.game_date.in_(dates)).group_by(Game.game_date)}
+
+    today = date.today()
+    now = datetime.utcnow()
+    rows = []
+    for game_date in sorted(dates):
+        row = counts.get(game_date)
+        games = row.games if row else 0
+        final_games = int(row.final_games or 0) if row else 0
+        rows.append({
+            'game_date': game_date,
+            'games': games,
+            'final_games': final_games,
+            'complete': game_date < today and final_games == games,
+            'last_checked': now
+        })
+    return bulk_upsert(GameDateWatermark, rows)
+
 def is_data_stale(table_cls, id_column=None, id_value=None, hours=6):
     query = table_cls.query
     if id_column and id_value:
@@ -111,4 +319,44 @@ def is_data_stale(table_cls, id_column=None, id_value=None, hours=6):
     record = query.first()
     if not record:
         return True
-    return datetime.utcnow() - record.last_updated > timedelta(hours=hours)
\ No newline at end of file
+    return datetime.utcnow() - record.last_updated > timedelta(hours=hours)
+
+def bulk_upsert(model, rows, update_columns=None, batch_size=500):
+    """Insert or update `rows` (list of column dicts) in batches; the caller commits.
+
+    MySQL gets one INSERT ... ON DUPLICATE KEY UPDATE per batch and SQLite one
+    INSERT ... ON CONFLICT DO UPDATE. Only `update_columns` (default: every
+    non-key column present in the rows) are overwritten on existing rows.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    key_columns = [column.name for column in table.primary_key.columns]
+    if update_columns is None:
+        update_columns = [name for name in rows[0] if name not in key_columns]
+    dialect = db.session.get_bind(mapper=model.__mapper__).dialect.name
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if dialect == 'mysql':
+            stmt = mysql.insert(table).values(batch)
+            if update_columns:
+                stmt = stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in update_columns})
+            else:
+                stmt = stmt.prefix_with('IGNORE')
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(table).values(batch)
+            if update_columns:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=key_columns,
+                    set_={name: stmt.excluded[name] for name in update_columns}
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=key_columns)
+        else:
+            # Portable fallback: one merge per row, still inside a single flush
+            for row in batch:
+                db.session.merge(model(**row))
+            continue
+        db.session.execute(stmt)
+    return len(rows)
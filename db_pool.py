@@ -0,0 +1,174 @@
+# db_pool.py - Engine/pool settings per process role and connection pool instrumentation
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Per-role defaults; any key can be overridden with e.g. WEB_DB_POOL_SIZE or DB_POOL_SIZE
+POOL_DEFAULTS = {
+    # Request threads (plus the scheduler and live poller); fail fast rather than queue requests
+    'web': {'pool_size': 10, 'max_overflow': 10, 'pool_timeout': 5},
+    # Scripts and refresh_engine's worker threads, one connection each
+    'fetcher': {'pool_size': int(os.getenv('REFRESH_WORKERS', '4')) + 1, 'max_overflow': 5, 'pool_timeout': 30},
+}
+# Below MySQL's wait_timeout (often lowered to minutes on hosted servers)
+POOL_RECYCLE_SECONDS = 1800
+# A checkout waiting longer than this means every pooled connection was busy
+SLOW_CHECKOUT_SECONDS = float(os.getenv('DB_SLOW_CHECKOUT_SECONDS', '0.25'))
+SLOW_WARNING_INTERVAL = 10
+# Upper bounds (seconds) of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.25, 1.0, 5.0)
+
+def _setting(role, name, default, cast=int):
+    value = os.getenv(f"{role.upper()}_DB_{name.upper()}") or os.getenv(f"DB_{name.upper()}")
+    return cast(value) if value is not None else default
+
+def engine_options(role, uri, use_async=False):
+    """SQLALCHEMY_ENGINE_OPTIONS for a process role ('web' or 'fetcher')"""
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}  # in-memory SQLite keeps its single shared connection
+    defaults = POOL_DEFAULTS.get(role, POOL_DEFAULTS['fetcher'])
+    return {
+        'poolclass': InstrumentedAsyncPool if use_async else InstrumentedQueuePool,
+        'pool_size': _setting(role, 'pool_size', defaults['pool_size']),
+        'max_overflow': _setting(role, 'max_overflow', defaults['max_overflow']),
+        'pool_timeout': _setting(role, 'pool_timeout', defaults['pool_timeout'], float),
+        'pool_recycle': _setting(role, 'pool_recycle', POOL_RECYCLE_SECONDS),
+        # Test connections on checkout so "MySQL server has gone away" costs a reconnect, not a 500
+        'pool_pre_ping': _setting(role, 'pool_pre_ping', True, lambda v: v != '0'),
+    }
+
+
+class PoolStats:
+    """Counters shared by every instrumented pool in this process"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.invalidations = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        self.age_total = 0.0
+        self.age_max = 0.0
+        self._last_warning = 0.0
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait, age):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if wait <= bound:
+                    self.wait_buckets[i] += 1
+            self.age_total += age
+            self.age_max = max(self.age_max, age)
+            if wait >= SLOW_CHECKOUT_SECONDS:
+                self.slow_checkouts += 1
+
+    def should_warn(self):
+        """Rate-limit slow-checkout warnings; returns how many were suppressed, or None"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_warning < SLOW_WARNING_INTERVAL:
+                self._suppressed += 1
+                return None
+            suppressed, self._suppressed, self._last_warning = self._suppressed, 0, now
+            return suppressed
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'slow_checkouts': self.slow_checkouts,
+                'invalidations': self.invalidations,
+                'wait_total': round(self.wait_total, 6),
+                'wait_max': round(self.wait_max, 6),
+                'avg_wait': round(self.wait_total / self.checkouts, 6) if self.checkouts else 0.0,
+                'wait_buckets': dict(zip(map(str, WAIT_BUCKETS), self.wait_buckets)),
+                'avg_connection_age': round(self.age_total / self.checkouts, 1) if self.checkouts else 0.0,
+                'max_connection_age': round(self.age_max, 1)
+            }
+
+
+pool_stats = PoolStats()
+
+def pool_status(pool):
+    """Point-in-time gauges for one pool"""
+    if not hasattr(pool, 'checkedout'):
+        return {'class': type(pool).__name__}
+    return {
+        'class': type(pool).__name__,
+        'size': pool.size(),
+        'max_overflow': pool._max_overflow,
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'timeout': pool.timeout()
+    }
+
+def warn_slow_checkout(pool, wait, timed_out=False):
+    suppressed = pool_stats.should_warn()
+    if suppressed is None:
+        return
+    status = pool_status(pool)
+    what = "timed out" if timed_out else "was slow"
+    print(f"✗ DB connection checkout {what} after {wait:.2f}s: {status['checked_out']} in use "
+          f"(pool {status['size']} + overflow {status['overflow']}/{status['max_overflow']})"
+          + (f", {suppressed} similar warnings suppressed" if suppressed else ""))
+
+
+def _count_invalidation(dbapi_connection, connection_record, exception):
+    with pool_stats._lock:
+        pool_stats.invalidations += 1
+
+
+class _InstrumentedPoolMixin:
+    """Times every checkout and records the age of the connection handed out"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Failed pre-pings and disconnect errors invalidate the connection (recreate() copies listeners)
+        if not event.contains(self, 'invalidate', _count_invalidation):
+            event.listen(self, 'invalidate', _count_invalidation)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            wait = time.perf_counter() - started
+            with pool_stats._lock:
+                pool_stats.timeouts += 1
+            warn_slow_checkout(self, wait, timed_out=True)
+            raise
+        wait = time.perf_counter() - started
+        age = time.time() - record.starttime if record.starttime else 0.0
+        pool_stats.record_checkout(wait, age)
+        if wait >= SLOW_CHECKOUT_SECONDS:
+            warn_slow_checkout(self, wait)
+        return record
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncPool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_metrics(*engines):
+    """Pool gauges per engine plus the process-wide counters"""
+    return {
+        'pools': [dict(pool_status(engine.pool), url=engine.url.render_as_string()) for engine in engines],
+        'stats': pool_stats.get_stats()
+    }
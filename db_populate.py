@@ -6,7 +6,8 @@ from datetime import datetime
 # Make sure we can import our modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from db import app, db, Team, TeamStats, Player, PlayerStats, Game
+from db import create_app, db, Team, TeamStats, Player, PlayerStats, Game, games_with_teams_query, player_stats_join
+from team_registry import get_team_registry
 from data_fetcher import (
     initialize_database, 
     fetch_and_store_teams,
@@ -14,20 +15,29 @@ from data_fetcher import (
     fetch_and_store_games,
     fetch_and_store_team_roster,
     fetch_and_store_team_stats,
+    fetch_and_store_all_player_stats,
+    fetch_season_player_stats,
     update_team_conferences,
     refresh_all_team_data,
     update_player_stats_only,
     update_team_player_stats_only
 )
+from game_ingest import backfill_season
+from schema_migrations import run_migrations
+from season_backfill import backfill_seasons, previous_seasons
+
+app = create_app(role='fetcher')
 
 def show_player_stats_sample(team_id=None, limit=5):
     """Show a sample of player stats to verify updates"""
     try:
-        query = db.session.query(Player, PlayerStats).join(PlayerStats, Player.id == PlayerStats.player_id)
+        query = db.session.query(Player, PlayerStats, Team).join(
+            PlayerStats, player_stats_join()
+        ).outerjoin(Team, Player.team_id == Team.id)
         
         if team_id:
             query = query.filter(Player.team_id == team_id)
-            team = Team.query.get(team_id)
+            team = get_team_registry().get(team_id)
             print(f"\n📊 Sample Player Stats for {team.full_name if team else 'Team ' + str(team_id)}:")
         else:
             print(f"\n📊 Sample Player Stats (Top {limit}):")
@@ -42,15 +52,14 @@ def show_player_stats_sample(team_id=None, limit=5):
         print(f"{'Player':<25} {'Team':<5} {'GP':<3} {'MIN':<5} {'PTS':<5} {'REB':<5} {'AST':<5}")
         print("-" * 80)
         
-        for player, stats in players_with_stats:
-            team = Team.query.get(player.team_id)
+        for player, stats, team in players_with_stats:
             team_abbr = team.abbreviation if team else 'N/A'
             print(f"{player.full_name:<25} {team_abbr:<5} {stats.gp:<3} {stats.min_pg:<5.1f} {stats.pts_pg:<5.1f} {stats.reb_pg:<5.1f} {stats.ast_pg:<5.1f}")
         
     except Exception as e:
         print(f"❌ Error showing player stats: {str(e)}")
 
-def update_players_by_team_name(team_name, season='2024-25'):
+def update_players_by_team_name(team_name, season=None):
     """Update player stats for a team by team name (e.g., 'Los Angeles Lakers')"""
     try:
         team = Team.query.filter(Team.full_name.ilike(f'%{team_name}%')).first()
@@ -80,6 +89,7 @@ def main():
         # Create all tables
         print("Creating database tables...")
         db.create_all()
+        run_migrations()
         print("✓ Tables created/verified")
         
         # Check if database is empty
@@ -99,13 +109,16 @@ def main():
             print("2. Update standings")  
             print("3. Update today's games")
             print("4. Update specific team roster (Lakers)")
-            print("5. Update all team data (WARNING: This takes a long time!)")
+            print("5. Update all team data (runs teams in parallel, still takes a while)")
             print("6. Fix team conferences")
             print("7. Update player stats only (Lakers)")
             print("8. Update player stats by team name")
             print("9. Show sample player stats")
+            print("10. Backfill season games (skips dates that are already final)")
+            print("11. Backfill past seasons (standings, team and player averages, games)")
+            print("12. Update player stats for every team (one league-wide fetch)")
             
-            choice = input("\nEnter your choice (1-9): ").strip()
+            choice = input("\nEnter your choice (1-12): ").strip()
             
             if choice == "1":
                 print("\n📥 Updating teams...")
@@ -131,13 +144,13 @@ def main():
             elif choice == "4":
                 lakers_id = 1610612747
                 print(f"\n📥 Updating Lakers roster (ID: {lakers_id})...")
-                if fetch_and_store_team_roster(lakers_id):
+                if fetch_and_store_team_roster(lakers_id, season_stats=fetch_season_player_stats()):
                     print("✓ Lakers roster updated!")
                 else:
                     print("❌ Failed to update Lakers roster")
                     
             elif choice == "5":
-                confirm = input("⚠️  This will update ALL team data and may take 30+ minutes. Continue? (y/N): ")
+                confirm = input("⚠️  This will update ALL team data and may take several minutes. Continue? (y/N): ")
                 if confirm.lower() == 'y':
                     print("\n📥 Updating all team data...")
                     if refresh_all_team_data():
@@ -193,6 +206,32 @@ def main():
                     else:
                         print(f"Team matching '{team_name}' not found")
                         
+            elif choice == "10":
+                season = input("Enter season (e.g. '2024-25', or press Enter for current): ").strip()
+                print("\n📥 Backfilling season games...")
+                if backfill_season(season or None):
+                    print("✓ Season games updated!")
+                else:
+                    print("❌ Failed to backfill season games")
+                    
+            elif choice == "11":
+                count = input("How many past seasons? (default 3): ").strip()
+                seasons = previous_seasons(int(count) if count.isdigit() else 3)
+                print(f"\n📥 Backfilling {', '.join(seasons)}...")
+                failed = backfill_seasons(seasons)
+                if failed:
+                    print(f"❌ Failed seasons: {', '.join(failed)}")
+                else:
+                    print("✓ Past seasons loaded!")
+                    
+            elif choice == "12":
+                print("\n📊 Updating player stats for every team...")
+                if fetch_and_store_all_player_stats():
+                    print("✓ Player stats updated!")
+                    show_player_stats_sample(limit=10)
+                else:
+                    print("❌ Failed to update player stats")
+                        
             else:
                 print("Invalid choice!")
         
@@ -221,10 +260,8 @@ def main():
         
         if game_count > 0:
             print("\n🏀 Recent Games:")
-            recent_games = Game.query.order_by(Game.game_date.desc()).limit(3).all()
-            for game in recent_games:
-                home_team = Team.query.get(game.home_team_id)
-                visitor_team = Team.query.get(game.visitor_team_id)
+            recent_games = games_with_teams_query().order_by(Game.game_date.desc()).limit(3).all()
+            for game, home_team, visitor_team in recent_games:
                 if home_team and visitor_team:
                     score_info = ""
                     if game.home_team_score is not None and game.visitor_team_score is not None:
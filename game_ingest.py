@@ -0,0 +1,136 @@
+# game_ingest.py - Season backfill and incremental game ingestion with per-date watermarks
+from datetime import date, datetime, timedelta
+import os
+import traceback
+import pandas as pd
+from nba_api.stats.endpoints import scheduleleaguev2
+from db import db, Game, bulk_upsert, completed_game_dates, update_game_watermarks, season_for_date, current_season
+from data_fetcher import safe_api_call, frame_records, fetch_and_store_games
+from team_registry import get_team_registry
+
+# Above this many dates to (re)fetch, one season schedule call beats per-date scoreboards
+SCOREBOARD_CALL_LIMIT = int(os.getenv('SCOREBOARD_CALL_LIMIT', '5'))
+# Game id prefixes: 001 preseason, 002 regular season, 003 All-Star, 004 playoffs, 005 play-in
+SKIPPED_GAME_TYPES = ('001', '003')
+
+def season_date_range(season):
+    """First and last possible game dates of a season string like '2024-25'"""
+    start_year = int(season[:4])
+    return date(start_year, 10, 1), date(start_year + 1, 6, 30)
+
+def date_range(start_date, end_date):
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+def fetch_season_schedule(season):
+    """Every game of a season (played and scheduled) from one ScheduleLeagueV2 call"""
+    schedule = safe_api_call(scheduleleaguev2.ScheduleLeagueV2, season=season)
+    return schedule.get_data_frames()[0]
+
+def schedule_game_rows(schedule_df, dates=None):
+    """ScheduleLeagueV2 frame -> Game rows, optionally limited to `dates`"""
+    if schedule_df.empty:
+        return []
+    registry = get_team_registry()
+    games = schedule_df.assign(
+        game_date=pd.to_datetime(schedule_df['gameDateEst'].str[:10]).dt.date,
+        game_type=schedule_df['gameId'].str[:3]
+    )
+    games = games[
+        ~games['game_type'].isin(SKIPPED_GAME_TYPES)
+        & games['homeTeam_teamId'].isin(list(registry.by_id))
+        & games['awayTeam_teamId'].isin(list(registry.by_id))
+    ]
+    if dates is not None:
+        games = games[games['game_date'].isin(dates)]
+
+    now = datetime.utcnow()
+    rows = []
+    for game in frame_records(games):
+        started = game['gameStatus'] != 1
+        rows.append({
+            'id': game['gameId'],
+            'home_team_id': game['homeTeam_teamId'],
+            'visitor_team_id': game['awayTeam_teamId'],
+            'game_date': game['game_date'],
+            'game_time': game['gameStatusText'] or '',
+            'status_id': game['gameStatus'],
+            'status_text': game['gameStatusText'],
+            # Unplayed games report 0-0
+            'home_team_score': game['homeTeam_score'] if started else None,
+            'visitor_team_score': game['awayTeam_score'] if started else None,
+            'last_updated': now
+        })
+    return rows
+
+def store_season_schedule(season, dates=None):
+    """Upsert a season's games (only those on `dates` if given) and update their watermarks"""
+    try:
+        print(f"Fetching {season} schedule...")
+        rows = schedule_game_rows(fetch_season_schedule(season), dates)
+        # Schedule dates/tip-off times can move (postponements), so they are updated too
+        bulk_upsert(Game, rows, update_columns=[
+            'game_date', 'game_time', 'home_team_score', 'visitor_team_score',
+            'status_id', 'status_text', 'last_updated'
+        ])
+        if dates is None:
+            start_date, end_date = season_date_range(season)
+            dates = date_range(start_date, end_date)
+        update_game_watermarks(dates)
+        db.session.commit()
+        print(f"✓ Stored {len(rows)} games for {season}")
+        return True
+    except Exception as e:
+        print(f"❌ Error storing {season} schedule: {str(e)}")
+        traceback.print_exc()
+        db.session.rollback()
+        return False
+
+def ingest_games(start_date, end_date, max_scoreboard_calls=SCOREBOARD_CALL_LIMIT):
+    """Bring games for every date in [start_date, end_date] up to date.
+
+    Dates already watermarked as complete are skipped. A handful of pending
+    dates are fetched one ScoreboardV2 call each; more than that are filled
+    from one schedule call per season. Today is always re-polled by
+    scoreboard for live scores.
+    """
+    today = date.today()
+    complete = completed_game_dates(start_date, end_date)
+    pending = [day for day in date_range(start_date, end_date) if day not in complete]
+    if not pending:
+        print(f"All games from {start_date} to {end_date} are final, nothing to fetch")
+        return True
+
+    success = True
+    if len(pending) > max_scoreboard_calls:
+        for season in sorted({season_for_date(day) for day in pending}):
+            success = store_season_schedule(season, dates=pending) and success
+        if start_date <= today <= end_date:
+            success = fetch_and_store_games(today.strftime('%m/%d/%Y')) and success
+    else:
+        for day in pending:
+            success = fetch_and_store_games(day.strftime('%m/%d/%Y')) and success
+
+    print(f"Ingested {len(pending)} pending dates ({len(complete)} already final)")
+    # Fold games that just went final into the stored ratings; only their teams' rows change
+    from team_ratings import update_team_ratings
+    update_team_ratings()
+    return success
+
+def backfill_season(season=None):
+    """Fill a whole season's games; costs one schedule call plus today's scoreboard"""
+    season = season or current_season()
+    start_date, end_date = season_date_range(season)
+    return ingest_games(start_date, end_date, max_scoreboard_calls=0)
+
+def ingest_recent_games(days_back=2, days_ahead=0):
+    """Daily incremental: re-poll today and any recent date that is not final yet"""
+    today = date.today()
+    return ingest_games(today - timedelta(days=days_back), today + timedelta(days=days_ahead))
+
+if __name__ == "__main__":
+    import sys
+    from db import create_app
+    app = create_app(role='fetcher')
+    with app.app_context():
+        db.create_all()
+        backfill_season(sys.argv[1] if len(sys.argv) > 1 else None)
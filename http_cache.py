@@ -0,0 +1,221 @@
+# http_cache.py - In-memory LRU/TTL cache for JSON API responses, invalidated by table commits
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+import gzip
+import hashlib
+import os
+import threading
+import time
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.http import http_date
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+CACHE_ENABLED = os.getenv('HTTP_CACHE', '1') != '0'
+CACHE_TTL_SECONDS = int(os.getenv('HTTP_CACHE_TTL', '300'))
+CACHE_MAX_ENTRIES = int(os.getenv('HTTP_CACHE_MAX_ENTRIES', '1024'))
+# Browsers/CDNs revalidate after this long; 304s keep that cheap
+CLIENT_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', '15'))
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+CachedResponse = namedtuple('CachedResponse', [
+    'body', 'mimetype', 'etag', 'last_modified', 'tables', 'expires_at', 'encoded'
+])
+
+
+class HTTPResponseCache:
+    """LRU of serialized 200 responses keyed by path + query string.
+
+    Entries are tagged with the tables their view reads and dropped as soon
+    as a session commit in this process writes to one of those tables.
+    Other processes' writes are picked up when the TTL runs out.
+    """
+
+    def __init__(self, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries = OrderedDict()
+        self._changed_at = {}  # table -> last commit time seen in this process
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, mimetype, tables):
+        # Last-Modified: last write to any table the view reads, else now
+        changed = [self._changed_at[t] for t in tables if t in self._changed_at]
+        last_modified = max(changed) if changed else datetime.now(timezone.utc).replace(microsecond=0)
+        entry = CachedResponse(
+            body=body,
+            mimetype=mimetype,
+            etag=hashlib.sha1(body).hexdigest(),
+            last_modified=last_modified,
+            tables=frozenset(tables),
+            expires_at=time.monotonic() + self.ttl,
+            encoded={}
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, tables):
+        """Drop every entry that depends on any of `tables`"""
+        tables = set(tables)
+        if not tables:
+            return 0
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        with self._lock:
+            for table in tables:
+                self._changed_at[table] = now
+            stale = [key for key, entry in self._entries.items() if entry.tables & tables]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+http_cache = HTTPResponseCache()
+
+def encode_body(entry, encoding):
+    """Compressed body for `encoding`, computed once per entry"""
+    body = entry.encoded.get(encoding)
+    if body is None:
+        if encoding == 'br':
+            body = brotli.compress(entry.body, quality=5)
+        else:
+            body = gzip.compress(entry.body, compresslevel=6)
+        entry.encoded[encoding] = body
+    return body
+
+def choose_encoding(entry, accepted):
+    if len(entry.body) < MIN_COMPRESS_BYTES:
+        return None
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def response_parts(entry, accepted, if_none_match, if_modified_since):
+    """(status, headers, body) for a cached entry given the request's parsed validators.
+
+    Shared by the Flask decorator below and the ASGI routes in asgi.py.
+    """
+    encoding = choose_encoding(entry, accepted)
+    # Strong ETags must differ between encodings of the same body
+    etag = f"{entry.etag}-{encoding}" if encoding else entry.etag
+    headers = {
+        'ETag': f'"{etag}"',
+        'Last-Modified': http_date(entry.last_modified),
+        'Cache-Control': f'public, max-age={CLIENT_MAX_AGE}',
+        'Vary': 'Accept-Encoding'
+    }
+    if if_none_match:
+        not_modified = if_none_match.contains(etag)
+    else:
+        not_modified = if_modified_since is not None and entry.last_modified <= if_modified_since
+    if not_modified:
+        http_cache.not_modified += 1
+        return 304, headers, b''
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        return 200, headers, encode_body(entry, encoding)
+    return 200, headers, entry.body
+
+def build_response(entry):
+    """304 if the client's validators match, else the (compressed) cached body"""
+    status, headers, body = response_parts(
+        entry, request.accept_encodings, request.if_none_match, request.if_modified_since
+    )
+    if status == 304:
+        return current_app.response_class(status=304, headers=headers)
+    response = current_app.response_class(body, mimetype=entry.mimetype)
+    response.headers.update(headers)
+    return response
+
+def cache_key(path, args):
+    """Entries are shared between the Flask and ASGI routes for the same URL"""
+    return (path, tuple(sorted(args)))
+
+def cached_json(*tables):
+    """Cache a JSON view's 200 responses until one of `tables` is written"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED:
+                return view(*args, **kwargs)
+            key = cache_key(request.path, request.args.items(multi=True))
+            entry = http_cache.get(key)
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                entry = http_cache.put(key, response.get_data(), response.mimetype, tables)
+            return build_response(entry)
+        return wrapper
+    return decorator
+
+
+# Record which tables a session writes, and invalidate them once it commits
+def _written_tables(session):
+    return session.info.setdefault('http_cache_tables', set())
+
+@event.listens_for(Session, 'after_flush')
+def _track_flushed_tables(session, flush_context):
+    tables = _written_tables(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            tables.add(table.name)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_executed_tables(orm_execute_state):
+    # Bulk upserts and query.update()/delete() bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and hasattr(table, 'name'):
+            _written_tables(orm_execute_state.session).add(table.name)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_tables(session):
+    tables = session.info.pop('http_cache_tables', None)
+    if tables:
+        http_cache.invalidate(tables)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_tables(session):
+    session.info.pop('http_cache_tables', None)
@@ -0,0 +1,154 @@
+# leaders.py - Season league leaders fetched in one batch, stored by (season, category, rank), served from memory
+from datetime import datetime
+import os
+import re
+import time
+import traceback
+from db import db, LeagueLeader, RefreshTracker, bulk_upsert, current_season, update_refresh_time
+from recheck_cache import RecheckCache
+
+LEADERS_URL = "https://stats.nba.com/stats/leagueleaders"
+# One response carries every column for every player, so these are all ranked from a single call
+COUNTING_CATEGORIES = ('PTS', 'REB', 'AST', 'STL', 'BLK', 'FG3M', 'TOV', 'MIN', 'EFF')
+# stats.nba.com only applies its attempt minimums when ranking by a percentage, so each needs its own call
+PERCENTAGE_CATEGORIES = ('FG_PCT', 'FG3_PCT', 'FT_PCT')
+CATEGORIES = COUNTING_CATEGORIES + PERCENTAGE_CATEGORIES
+# Ranks stored per category, and the most /api/leaders returns
+MAX_RANK = 100
+PER_MODE = os.getenv('LEADERS_PER_MODE', 'Totals')  # or PerGame, Per48
+# How often a process compares a season's RefreshTracker time with the leaderboards it holds
+RECHECK_SECONDS = int(os.getenv('LEADERS_RECHECK_SECONDS', '60'))
+# Seasons whose leaderboards are held in memory at once (least recently read dropped first)
+MAX_CACHED_SEASONS = int(os.getenv('LEADERS_MAX_CACHED_SEASONS', '8'))
+SEASON_PATTERN = re.compile(r'^(\d{4})-(\d{2})$')
+
+def validate_season(season):
+    """`season` if it looks like '2024-25'; ValueError otherwise"""
+    match = SEASON_PATTERN.match(season)
+    if not match or (int(match[1]) + 1) % 100 != int(match[2]):
+        raise ValueError(f"Invalid season: {season} (expected e.g. 2024-25)")
+    return season
+
+def fetch_leaderboard(season, category):
+    """(headers, rows) of one leagueleaders response, ranked upstream by `category`"""
+    # Imported here so serving leaders never loads the HTTP client or nba_api
+    from nba_client import nba_client, STATS_HEADERS
+    params = {
+        "LeagueID": "00",
+        "PerMode": PER_MODE,
+        "Scope": "S",                # 'S' = Season
+        "Season": season,
+        "SeasonType": "Regular Season",
+        "StatCategory": category,
+        "ActiveFlag": ""             # Nullable; leave blank
+    }
+    result = nba_client.get_json(LEADERS_URL, params=params, headers=STATS_HEADERS)['resultSet']
+    return result['headers'], result['rowSet']
+
+def leader_rows(season, category, leaderboard, now=None):
+    """league_leaders rows for the top MAX_RANK of `category`; ties keep upstream order"""
+    headers, rows = leaderboard
+    column = {name: i for i, name in enumerate(headers)}
+    value_idx = column[category]
+    ranked = sorted((row for row in rows if row[value_idx] is not None), key=lambda row: -row[value_idx])
+    now = now or datetime.utcnow()
+    return [
+        {
+            'season': season,
+            'category': category,
+            'rank': rank,
+            'player_id': row[column['PLAYER_ID']],
+            'player_name': row[column['PLAYER']],
+            'team_id': row[column['TEAM_ID']],
+            'team_abbreviation': row[column['TEAM']],
+            'gp': row[column['GP']],
+            'value': float(row[value_idx]),
+            'last_updated': now
+        }
+        for rank, row in enumerate(ranked[:MAX_RANK], 1)
+    ]
+
+def fetch_and_store_leaders(season=None):
+    """Replace a season's leaderboards: one call for every counting stat plus one per percentage"""
+    season = season or current_season()
+    try:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        base = fetch_leaderboard(season, COUNTING_CATEGORIES[0])
+        rows = []
+        for category in COUNTING_CATEGORIES:
+            rows += leader_rows(season, category, base, now)
+        for category in PERCENTAGE_CATEGORIES:
+            rows += leader_rows(season, category, fetch_leaderboard(season, category), now)
+
+        # Ranks past a shorter new list must not linger
+        LeagueLeader.query.filter_by(season=season).delete()
+        bulk_upsert(LeagueLeader, rows)
+        db.session.commit()
+        update_refresh_time(tracker_entity(season))
+        rebuild_leaders_index(season)
+        print(f"✓ Stored {len(rows)} {season} leader rows from {1 + len(PERCENTAGE_CATEGORIES)} calls "
+              f"in {time.perf_counter() - started:.1f}s")
+        return True
+
+    except Exception as e:
+        print(f"Error fetching league leaders: {str(e)}")
+        traceback.print_exc()
+        db.session.rollback()
+        return False
+
+
+def tracker_entity(season):
+    """RefreshTracker row stamped by each fetch of `season`, e.g. 'leaders_2024-25'"""
+    return f"leaders_{season}"
+
+def _leaders_last_refresh(season):
+    tracker = RefreshTracker.query.filter_by(entity=tracker_entity(season)).first()
+    return tracker.last_refresh if tracker else None
+
+def build_leaders_index(season):
+    """Every stored leaderboard of `season`, read in one ordered query"""
+    rows = db.session.query(
+        LeagueLeader.category, LeagueLeader.rank, LeagueLeader.player_id, LeagueLeader.player_name,
+        LeagueLeader.team_id, LeagueLeader.team_abbreviation, LeagueLeader.gp, LeagueLeader.value
+    ).filter(LeagueLeader.season == season).order_by(LeagueLeader.category, LeagueLeader.rank).all()
+    by_category = {category: [] for category in CATEGORIES}
+    for row in rows:
+        by_category.setdefault(row.category, []).append({
+            'rank': row.rank,
+            'player_id': row.player_id,
+            'player': row.player_name,
+            'team_id': row.team_id,
+            'team': row.team_abbreviation,
+            'gp': row.gp,
+            'value': row.value
+        })
+    return by_category
+
+# season -> {category: [leader dicts by rank]}; seasons with nothing stored are not held,
+# so unknown seasons cost a query but never memory
+_indexes = RecheckCache('leaders', build_leaders_index, _leaders_last_refresh, RECHECK_SECONDS,
+                        max_entries=MAX_CACHED_SEASONS, keep=lambda by_category: any(by_category.values()))
+
+def rebuild_leaders_index(season=None):
+    """Reload a season's index after leaders are written (needs an app context)"""
+    return _indexes.rebuild(season or current_season())
+
+def get_leaders_index(season=None):
+    """{category: leaders by rank} for a season, loaded on first use (see RecheckCache)"""
+    return _indexes.get(validate_season(season or current_season()))
+
+def get_leaders(category='PTS', n=10, season=None):
+    """Top `n` stored leaders of a category; ValueError for an unknown category or malformed season"""
+    category = category.upper()
+    if category not in CATEGORIES:
+        raise ValueError(f"Unknown category: {category} (expected one of {', '.join(CATEGORIES)})")
+    return get_leaders_index(season)[category][:max(0, min(n, MAX_RANK))]
+
+if __name__ == "__main__":
+    import sys
+    from db import create_app
+    app = create_app(role='fetcher')
+    with app.app_context():
+        db.create_all()
+        fetch_and_store_leaders(sys.argv[1] if len(sys.argv) > 1 else None)
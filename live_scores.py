@@ -0,0 +1,276 @@
+# live_scores.py - Scoreboard poller for game nights, and the relay pushing score changes to SSE subscribers
+import asyncio
+from datetime import date
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+from sqlalchemy import select
+from db import db, Game, bulk_upsert, update_game_watermarks
+
+# Scoreboard polling on game nights; runs in the refresh process only (see scheduler.py)
+LIVE_SCORES_ENABLED = os.getenv('LIVE_SCORES', '1') != '0'
+
+# Seconds between scoreboard polls while a game is live
+LIVE_POLL_SECONDS = int(os.getenv('LIVE_POLL_SECONDS', '20'))
+# Seconds between checks while today's games have not tipped off (or are all final)
+IDLE_POLL_SECONDS = int(os.getenv('IDLE_POLL_SECONDS', '300'))
+# Fields whose change is worth a write and a push
+TRACKED_FIELDS = ('status_id', 'status_text', 'home_team_score', 'visitor_team_score')
+SUBSCRIBER_QUEUE_SIZE = 100
+# Open streams per process; under a threaded WSGI server each one holds a worker thread
+MAX_SUBSCRIBERS = int(os.getenv('LIVE_MAX_SUBSCRIBERS', '64'))
+# Seconds between reads of today's games for changes the poller wrote, while anyone is subscribed
+RELAY_SECONDS = int(os.getenv('LIVE_RELAY_SECONDS', '5'))
+HEARTBEAT_SECONDS = 15
+
+def game_state(row):
+    return tuple(row[field] for field in TRACKED_FIELDS)
+
+def game_delta(row):
+    """Compact /api/games-shaped update for one game"""
+    return {
+        'game_id': row['id'],
+        'game_date': row['game_date'].strftime('%Y-%m-%d'),
+        'status': {'id': row['status_id'], 'text': row['status_text']},
+        'home_team': {'id': row['home_team_id'], 'score': row['home_team_score']},
+        'visitor_team': {'id': row['visitor_team_id'], 'score': row['visitor_team_score']}
+    }
+
+
+class GameEventBroker:
+    """Fan-out of score deltas to connected SSE clients (one queue per client).
+
+    `queue_class` is queue.Queue for thread-served streams and asyncio.Queue
+    for asgi.py, whose relay publishes from the event loop.
+    """
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE, max_subscribers=MAX_SUBSCRIBERS, queue_class=queue.Queue):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.queue_class = queue_class
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """A new client queue, or None when max_subscribers streams are already open"""
+        subscriber = self.queue_class(maxsize=self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except (queue.Full, asyncio.QueueFull):
+                # A client that stopped reading is dropped; EventSource reconnects
+                self.unsubscribe(subscriber)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+
+class LiveScorePoller:
+    """Polls today's scoreboard only while games are in progress.
+
+    Each poll is diffed against the last seen state of every game and only
+    changed rows are written; every process's ScoreRelay picks them up from
+    the games table. With no live game the poller checks every
+    IDLE_POLL_SECONDS for tip-off. One poller runs per deployment, in the
+    refresh process, so stats.nba.com sees one client however many web
+    workers there are.
+    """
+
+    def __init__(self, app, live_seconds=LIVE_POLL_SECONDS, idle_seconds=IDLE_POLL_SECONDS):
+        self.app = app
+        self.live_seconds = live_seconds
+        self.idle_seconds = idle_seconds
+        self._snapshot = {}
+        self._snapshot_date = None
+        self._started = False
+        self._lock = threading.Lock()
+        self.polls = 0
+        self.writes = 0
+
+    def start(self):
+        """Start the polling thread (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name="live-score-poller", daemon=True).start()
+
+    def _load_snapshot(self, today):
+        """Reset the last seen state to what the database holds for `today`"""
+        games = Game.query.filter(Game.game_date == today).all()
+        self._snapshot = {
+            game.id: (game.status_id, game.status_text, game.home_team_score, game.visitor_team_score)
+            for game in games
+        }
+        self._snapshot_date = today
+
+    def _has_unfinished_games(self):
+        return any(state[0] != 3 for state in self._snapshot.values())
+
+    def _is_live(self):
+        return any(state[0] == 2 for state in self._snapshot.values())
+
+    def poll(self):
+        """Fetch today's scoreboard once and write what changed; returns the deltas"""
+        # Imported here so the web process only loads nba_api/pandas once polling starts
+        from data_fetcher import fetch_scoreboard_rows, GAME_SCORE_COLUMNS
+        today = date.today()
+        if self._snapshot_date != today:
+            self._load_snapshot(today)
+
+        rows = fetch_scoreboard_rows(today, use_cache=False)
+        self.polls += 1
+        changed = [row for row in rows if self._snapshot.get(row['id']) != game_state(row)]
+        if not changed:
+            return []
+
+        try:
+            bulk_upsert(Game, changed, update_columns=GAME_SCORE_COLUMNS)
+            update_game_watermarks([today])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self.writes += len(changed)
+        for row in changed:
+            self._snapshot[row['id']] = game_state(row)
+
+        return [game_delta(row) for row in changed]
+
+    def _run(self):
+        while True:
+            delay = self.idle_seconds
+            try:
+                with self.app.app_context():
+                    # Between live polls, pick up games added by other fetchers
+                    if not self._is_live() or self._snapshot_date != date.today():
+                        self._load_snapshot(date.today())
+                    if self._has_unfinished_games():
+                        deltas = self.poll()
+                        if deltas:
+                            print(f"Live scores: {len(deltas)} game(s) updated")
+                    if self._is_live():
+                        delay = self.live_seconds
+            except Exception as e:
+                print(f"Live score poll failed: {str(e)}")
+                traceback.print_exc()
+            time.sleep(delay)
+
+
+def todays_games_select(today):
+    """Today's games with just the columns a delta carries"""
+    return select(
+        Game.id, Game.game_date, Game.home_team_id, Game.visitor_team_id,
+        *[getattr(Game, field) for field in TRACKED_FIELDS]
+    ).where(Game.game_date == today)
+
+
+class ScoreRelay:
+    """Publishes score changes found in the games table to this process's SSE clients.
+
+    The games table is the channel between the one LiveScorePoller and every
+    serving process: while anyone is subscribed, today's games are read every
+    RELAY_SECONDS (one indexed query) and diffed against what was last seen.
+    start() runs that loop on a thread; asgi.py drives publish_changes() from
+    an asyncio task instead.
+    """
+
+    def __init__(self, app, broker, seconds=RELAY_SECONDS):
+        self.app = app
+        self.broker = broker
+        self.seconds = seconds
+        self._state = {}
+        self._state_date = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the relay thread (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name="live-score-relay", daemon=True).start()
+
+    def reset(self):
+        """Forget the last seen state (nobody subscribed); the next read only records it"""
+        self._state_date = None
+
+    def publish_changes(self, rows, today):
+        """Publish rows of todays_games_select() that changed since the last call; returns the deltas"""
+        if self._state_date != today:
+            # Clients load the page's scores themselves; only later changes are pushed
+            self._state = {row['id']: game_state(row) for row in rows}
+            self._state_date = today
+            return []
+        changed = [row for row in rows if self._state.get(row['id']) != game_state(row)]
+        for row in changed:
+            self._state[row['id']] = game_state(row)
+        deltas = [game_delta(row) for row in changed]
+        if deltas:
+            self.broker.publish({'event': 'scores', 'games': deltas})
+        return deltas
+
+    def _run(self):
+        while True:
+            try:
+                if len(self.broker):
+                    today = date.today()
+                    with self.app.app_context():
+                        rows = db.session.execute(todays_games_select(today)).mappings().all()
+                    self.publish_changes(rows, today)
+                else:
+                    self.reset()
+            except Exception as e:
+                print(f"Live score relay failed: {str(e)}")
+                traceback.print_exc()
+            time.sleep(self.seconds)
+
+
+def sse_message(event):
+    """Format a broker event as a Server-Sent Events message"""
+    return f"event: {event['event']}\ndata: {json.dumps(event['games'])}\n\n"
+
+def stream_events(broker, subscriber, heartbeat_seconds=HEARTBEAT_SECONDS):
+    """Generator of SSE messages for one subscribed client; comments keep idle proxies from closing it"""
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = subscriber.get(timeout=heartbeat_seconds)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield sse_message(event)
+    finally:
+        broker.unsubscribe(subscriber)
+
+async def stream_events_async(broker, subscriber, heartbeat_seconds=HEARTBEAT_SECONDS):
+    """stream_events for an asyncio.Queue subscriber; holds no thread while waiting"""
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield sse_message(event)
+    finally:
+        broker.unsubscribe(subscriber)
@@ -0,0 +1,122 @@
+# load_test.py - Concurrent request throughput of the WSGI app vs. the ASGI app (asgi.py)
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+DEFAULT_PATHS = [
+    '/api/games',
+    '/api/standings',
+    '/api/team/1610612747/player-stats',
+    '/api/team/1610612747/games',
+]
+
+# Servers started by --compare; {port} is filled in. Both get the same number of workers.
+SERVER_COMMANDS = {
+    'wsgi': 'gunicorn --workers 2 --threads 4 --bind 127.0.0.1:{port} app:app',
+    'asgi': 'uvicorn --workers 2 --port {port} --log-level warning asgi:app',
+}
+
+def fetch(url, timeout):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            ok = response.status == 200
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return ok, time.perf_counter() - started
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+def run_load(base_url, paths, total, concurrency, timeout=30):
+    """Fire `total` GETs round-robin over `paths` with `concurrency` in flight; returns a summary dict"""
+    urls = [base_url.rstrip('/') + paths[i % len(paths)] for i in range(total)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda url: fetch(url, timeout), urls))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(seconds for ok, seconds in results if ok)
+    return {
+        'requests': total,
+        'errors': sum(1 for ok, _ in results if not ok),
+        'seconds': elapsed,
+        'rps': total / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+    }
+
+def print_summary(label, summary):
+    print(f"{label:<6} {summary['rps']:8.1f} req/s  p50 {summary['p50'] * 1000:7.1f} ms  "
+          f"p95 {summary['p95'] * 1000:7.1f} ms  p99 {summary['p99'] * 1000:7.1f} ms  "
+          f"errors {summary['errors']}/{summary['requests']}")
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(base_url, path, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if fetch(base_url + path, timeout=2)[0]:
+            return True
+        time.sleep(0.25)
+    return False
+
+def compare(paths, total, concurrency, commands=SERVER_COMMANDS):
+    """Start each server in turn, warm it up, load it and print the results"""
+    # Background fetchers would compete with the requests being measured
+    env = dict(os.environ, REFRESH_SCHEDULER='0', LIVE_SCORES='0')
+    results = {}
+    for label, command in commands.items():
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(shlex.split(command.format(port=port)), env=env,
+                                  cwd=os.path.dirname(os.path.abspath(__file__)))
+        try:
+            if not wait_for_server(base_url, paths[0]):
+                print(f"❌ {label} server did not come up: {command}")
+                continue
+            run_load(base_url, paths, min(total, concurrency * 2), concurrency)  # warm-up
+            results[label] = run_load(base_url, paths, total, concurrency)
+            print_summary(label, results[label])
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+    if 'wsgi' in results and 'asgi' in results and results['wsgi']['rps']:
+        print(f"ASGI/WSGI throughput: {results['asgi']['rps'] / results['wsgi']['rps']:.2f}x")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the JSON API")
+    parser.add_argument('--url', help="load an already running server instead of starting both")
+    parser.add_argument('--path', action='append', dest='paths', help="path to request (repeatable)")
+    parser.add_argument('-n', '--requests', type=int, default=2000, help="total requests per server")
+    parser.add_argument('-c', '--concurrency', type=int, default=64, help="requests in flight")
+    parser.add_argument('--wsgi-cmd', default=SERVER_COMMANDS['wsgi'], help="WSGI server command ({port})")
+    parser.add_argument('--asgi-cmd', default=SERVER_COMMANDS['asgi'], help="ASGI server command ({port})")
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    print(f"{args.requests} requests, {args.concurrency} concurrent, over {len(paths)} paths")
+    if args.url:
+        print_summary('server', run_load(args.url, paths, args.requests, args.concurrency))
+        return
+    results = compare(paths, args.requests, args.concurrency,
+                      {'wsgi': args.wsgi_cmd, 'asgi': args.asgi_cmd})
+    if len(results) < 2:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# metrics.py - Request, SQL, upstream API and cache instrumentation in Prometheus text format
+from contextvars import ContextVar
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Upper bounds of the request/SQL duration histograms (seconds) and queries-per-request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Send `X-Profile: 1` (stats printed) or `X-Profile: text` (stats returned as the body)
+PROFILE_HEADER = 'X-Profile'
+PROFILING_ENABLED = os.getenv('PROFILING', '0') == '1'
+PROFILE_DIR = os.getenv('PROFILE_DIR')
+PROFILE_TOP = 30
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.description}")
+        lines.append(f"# TYPE {self.name} counter")
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, label_values)} {value}")
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name, description, buckets, labels=()):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.labels = labels
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.description}")
+        lines.append(f"# TYPE {self.name} histogram")
+        with self._lock:
+            series_items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in series_items:
+            render_histogram(lines, self.name, self.labels, label_values, self.buckets,
+                             series[:-2], series[-2], series[-1])
+
+def render_histogram(lines, name, label_names, label_values, buckets, counts, total, count):
+    """Append one histogram series; `counts` are already cumulative per bucket"""
+    for bound, bucket_count in zip(buckets, counts):
+        labels = _label_text(label_names + ('le',), label_values + (bound,))
+        lines.append(f"{name}_bucket{labels} {bucket_count}")
+    lines.append(f"{name}_bucket{_label_text(label_names + ('le',), label_values + ('+Inf',))} {count}")
+    lines.append(f"{name}_sum{_label_text(label_names, label_values)} {total}")
+    lines.append(f"{name}_count{_label_text(label_names, label_values)} {count}")
+
+def render_gauge(lines, name, description, samples):
+    """`samples` is a list of (label names, label values, value)"""
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} gauge")
+    for label_names, label_values, value in samples:
+        lines.append(f"{name}{_label_text(label_names, label_values)} {value}")
+
+
+request_duration = Histogram('http_request_duration_seconds', "Request latency by route",
+                             LATENCY_BUCKETS, ('route', 'method'))
+requests_total = Counter('http_requests_total', "Requests by route and status", ('route', 'method', 'status'))
+request_queries = Histogram('http_request_sql_queries', "SQL statements per request",
+                            QUERY_COUNT_BUCKETS, ('route',))
+request_sql_duration = Histogram('http_request_sql_duration_seconds', "Time spent in SQL per request",
+                                 LATENCY_BUCKETS, ('route',))
+sql_queries_total = Counter('sql_queries_total', "SQL statements executed by this process")
+sql_duration_total = Counter('sql_duration_seconds_total', "Time spent executing SQL in this process")
+
+
+# Per-request SQL totals; None outside a request (scheduler threads, scripts)
+_request_sql = ContextVar('request_sql', default=None)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    sql_queries_total.inc()
+    sql_duration_total.inc(elapsed)
+    totals = _request_sql.get()
+    if totals is not None:
+        totals[0] += 1
+        totals[1] += elapsed
+
+
+def observe_request(route, method, status, elapsed, queries, sql_seconds):
+    """Record one finished request (Flask hooks and asgi.MetricsMiddleware); returns its Server-Timing header"""
+    request_duration.observe(elapsed, route, method)
+    requests_total.inc(1, route, method, str(status))
+    request_queries.observe(queries, route)
+    request_sql_duration.observe(sql_seconds, route)
+    return f'db;dur={sql_seconds * 1000:.1f};desc="{queries} queries", total;dur={elapsed * 1000:.1f}'
+
+def start_request_sql():
+    """Start counting this context's SQL; returns ([queries, seconds], token for _request_sql.reset)"""
+    totals = [0, 0.0]
+    return totals, _request_sql.set(totals)
+
+def stop_request_sql(token):
+    _request_sql.reset(token)
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_sql, g.metrics_sql_token = start_request_sql()
+    g.metrics_profiler = None
+    if PROFILING_ENABLED and request.headers.get(PROFILE_HEADER):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another request on this interpreter is already being profiled
+            return
+        g.metrics_profiler = profiler
+
+def _finish_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    queries, sql_seconds = g.metrics_sql
+    stop_request_sql(g.metrics_sql_token)
+    method = request.method
+    response.headers['Server-Timing'] = observe_request(_route_label(), method, response.status_code,
+                                                        elapsed, queries, sql_seconds)
+
+    profiler = g.pop('metrics_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        report = profile_report(profiler, f"{method} {request.full_path.rstrip('?')}")
+        if request.headers.get(PROFILE_HEADER) == 'text':
+            response.set_data(report)
+            response.mimetype = 'text/plain'
+            response.headers.pop('Content-Encoding', None)
+            response.headers.pop('ETag', None)
+        else:
+            print(report)
+    return response
+
+def profile_report(profiler, label):
+    """Top functions by cumulative time; also saved to PROFILE_DIR when it is set"""
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+    if PROFILE_DIR:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe_label = ''.join(c if c.isalnum() else '_' for c in label)[:80]
+        stats.dump_stats(os.path.join(PROFILE_DIR, f"{int(time.time() * 1000)}-{safe_label}.prof"))
+    return f"Profile of {label}\n{out.getvalue()}"
+
+def init_app(app):
+    """Time every request of `app` and count its SQL"""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def _render_upstream(lines):
+    # Only report the client if this process loaded it; never import nba_api just for metrics
+    nba_client_module = sys.modules.get('nba_client')
+    if nba_client_module is None:
+        return
+    stats = nba_client_module.nba_client.get_stats()
+    name = 'nba_api_request_duration_seconds'
+    lines.append(f"# HELP {name} stats.nba.com call latency by endpoint")
+    lines.append(f"# TYPE {name} histogram")
+    for endpoint, endpoint_stats in sorted(stats.items()):
+        render_histogram(lines, name, ('endpoint',), (endpoint,), nba_client_module.LATENCY_BUCKETS,
+                         endpoint_stats['latency_buckets'], endpoint_stats['total_latency'], endpoint_stats['calls'])
+    for field in ('errors', 'retries', 'throttled'):
+        name = f'nba_api_{field}_total'
+        lines.append(f"# HELP {name} stats.nba.com calls by endpoint: {field}")
+        lines.append(f"# TYPE {name} counter")
+        for endpoint, endpoint_stats in sorted(stats.items()):
+            lines.append(f"{name}{_label_text(('endpoint',), (endpoint,))} {endpoint_stats[field]}")
+
+def _render_caches(lines):
+    from http_cache import http_cache
+    caches = {'http_response': http_cache.get_stats()}
+    api_cache_module = sys.modules.get('api_cache')
+    if api_cache_module is not None:
+        caches['nba_api_response'] = api_cache_module.response_cache.get_stats()
+    for field, kind in (('hits', 'counter'), ('misses', 'counter')):
+        name = f'cache_{field}_total'
+        lines.append(f"# HELP {name} Cache {field} by cache")
+        lines.append(f"# TYPE {name} {kind}")
+        for cache, stats in sorted(caches.items()):
+            lines.append(f"{name}{_label_text(('cache',), (cache,))} {stats[field]}")
+    render_gauge(lines, 'cache_hit_ratio', "Hits / lookups since start",
+                 [(('cache',), (cache,), stats['hit_ratio']) for cache, stats in sorted(caches.items())])
+    render_gauge(lines, 'http_cache_entries', "Cached API responses held in memory",
+                 [((), (), caches['http_response']['entries'])])
+
+def _render_pools(lines, engines):
+    from db_pool import pool_stats, pool_status, WAIT_BUCKETS
+    statuses = [(engine.url.render_as_string(), pool_status(engine.pool)) for engine in engines]
+    for field in ('size', 'checked_out', 'overflow'):
+        render_gauge(lines, f'db_pool_{field}', f"Connection pool {field.replace('_', ' ')}",
+                     [(('url',), (url,), status[field]) for url, status in statuses if field in status])
+    stats = pool_stats.get_stats()
+    name = 'db_pool_checkout_wait_seconds'
+    lines.append(f"# HELP {name} Time waiting for a pooled connection")
+    lines.append(f"# TYPE {name} histogram")
+    render_histogram(lines, name, (), (), WAIT_BUCKETS, list(stats['wait_buckets'].values()),
+                     stats['wait_total'], stats['checkouts'])
+    for field in ('timeouts', 'slow_checkouts', 'invalidations'):
+        lines.append(f"# TYPE db_pool_{field}_total counter")
+        lines.append(f"db_pool_{field}_total {stats[field]}")
+    render_gauge(lines, 'db_pool_max_connection_age_seconds', "Oldest connection handed out so far",
+                 [((), (), stats['max_connection_age'])])
+
+def render_metrics(engines=()):
+    """Everything above as one Prometheus text exposition"""
+    lines = []
+    for metric in (request_duration, requests_total, request_queries, request_sql_duration,
+                   sql_queries_total, sql_duration_total):
+        metric.render(lines)
+    _render_upstream(lines)
+    _render_caches(lines)
+    _render_pools(lines, engines)
+    return '\n'.join(lines) + '\n'
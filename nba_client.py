@@ -0,0 +1,223 @@
+# nba_client.py - Shared HTTP client for every stats.nba.com call (nba_api and raw requests)
+import json
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limiter import api_rate_limiter
+from api_cache import response_cache, ttl_for
+
+try:
+    from nba_api.library.http import NBAHTTP
+except ImportError:  # Older nba_api releases have no pluggable session
+    NBAHTTP = None
+
+try:
+    from nba_api.stats.library.http import NBAStatsHTTP, NBAStatsResponse
+except ImportError:
+    NBAStatsHTTP = NBAStatsResponse = None
+
+STATS_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.nba.com/",
+    "Origin": "https://www.nba.com"
+}
+
+THROTTLE_STATUS_CODES = {429, 502, 503, 504}
+# Upper bounds (seconds) of the per-endpoint latency histogram reported by metrics.py
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class ThrottledError(Exception):
+    """Raised when stats.nba.com answers with a throttling/unavailable status"""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"stats.nba.com returned HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class NotModified(Exception):
+    """Raised when a conditional request comes back 304"""
+
+
+class NBAClient:
+    """Pooled, rate-limited, retrying client with per-endpoint counters"""
+
+    def __init__(self, rate_limiter=api_rate_limiter, max_retries=4, base_delay=1.0,
+                 max_delay=30.0, pool_size=16, cache=response_cache):
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self._local = threading.local()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+        # One keep-alive session for everything; nba_api endpoints share it too
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.hooks['response'].append(self._check_status)
+        if NBAHTTP is not None and hasattr(NBAHTTP, 'set_session'):
+            NBAHTTP.set_session(self.session)
+
+    def _check_status(self, response, *args, **kwargs):
+        """Turn throttling/304 responses into exceptions (nba_api never checks status codes)"""
+        # Remember cache validators for this thread's most recent response
+        self._local.validators = {
+            header: response.headers[source]
+            for header, source in (('If-None-Match', 'ETag'), ('If-Modified-Since', 'Last-Modified'))
+            if response.headers.get(source)
+        }
+        if response.status_code == 304:
+            raise NotModified()
+        if response.status_code in THROTTLE_STATUS_CODES:
+            retry_after = response.headers.get('Retry-After')
+            try:
+                retry_after = float(retry_after) if retry_after else None
+            except ValueError:
+                retry_after = None
+            raise ThrottledError(response.status_code, retry_after)
+        return response
+
+    def _record(self, endpoint, latency=None, error=False, retry=False, throttled=False):
+        with self._stats_lock:
+            stats = self._stats.setdefault(endpoint, {
+                'calls': 0, 'errors': 0, 'retries': 0, 'throttled': 0,
+                'total_latency': 0.0, 'max_latency': 0.0,
+                'latency_buckets': [0] * len(LATENCY_BUCKETS)
+            })
+            if latency is not None:
+                stats['calls'] += 1
+                stats['total_latency'] += latency
+                stats['max_latency'] = max(stats['max_latency'], latency)
+                for i, bound in enumerate(LATENCY_BUCKETS):
+                    if latency <= bound:
+                        stats['latency_buckets'][i] += 1
+            if error:
+                stats['errors'] += 1
+            if retry:
+                stats['retries'] += 1
+            if throttled:
+                stats['throttled'] += 1
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring Retry-After when given"""
+        if retry_after:
+            return min(self.max_delay, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _request(self, endpoint, func):
+        for attempt in range(self.max_retries):
+            self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                result = func()
+            except NotModified:
+                self._record(endpoint, time.perf_counter() - started)
+                raise
+            except Exception as e:
+                latency = time.perf_counter() - started
+                throttled = isinstance(e, (ThrottledError, requests.exceptions.Timeout))
+                self._record(endpoint, latency, error=True, throttled=throttled)
+                if throttled:
+                    self.rate_limiter.penalize()
+                elif isinstance(e, requests.exceptions.HTTPError):
+                    raise  # Other 4xx/5xx will not get better by retrying
+                print(f"API call to {endpoint} attempt {attempt + 1} failed: {str(e)}")
+                if attempt == self.max_retries - 1:
+                    raise
+                self._record(endpoint, retry=True)
+                time.sleep(self._backoff(attempt, getattr(e, 'retry_after', None)))
+            else:
+                self._record(endpoint, time.perf_counter() - started)
+                self.rate_limiter.reward()
+                return result
+
+    def _cached(self, endpoint, parameters, fetch_body, use_cache):
+        """Serve `fetch_body()` through the response cache.
+
+        Fresh entries are returned without touching the network. Stale entries
+        are revalidated with If-None-Match/If-Modified-Since when upstream gave
+        us validators, and served as a fallback if the refetch fails.
+        """
+        if not use_cache or self.cache is None:
+            return fetch_body({})
+        key = self.cache.make_key(endpoint, parameters)
+        entry = self.cache.get(key)
+        if entry and self.cache.is_fresh(entry):
+            return entry['body']
+
+        validators = entry.get('validators', {}) if entry else {}
+        self._local.validators = {}
+        try:
+            body = fetch_body(validators)
+        except NotModified:
+            self.cache.revalidated(key, entry, ttl_for(endpoint, parameters, entry['body']))
+            return entry['body']
+        except Exception as e:
+            if entry is None:
+                raise
+            print(f"Serving stale cached {endpoint} response after error: {str(e)}")
+            return entry['body']
+        self.cache.put(key, endpoint, parameters, body, ttl_for(endpoint, parameters, body),
+                       getattr(self._local, 'validators', {}))
+        return body
+
+    def call(self, endpoint_cls, *args, use_cache=True, **kwargs):
+        """Instantiate an nba_api endpoint class and load its response (cached when possible)"""
+        endpoint = getattr(endpoint_cls, 'endpoint', None) or getattr(endpoint_cls, '__name__', 'unknown')
+        if NBAStatsResponse is None or 'get_request' in kwargs:
+            return self._request(endpoint, lambda: endpoint_cls(*args, **kwargs))
+
+        # Build the endpoint without requesting so its parameters can key the cache
+        instance = endpoint_cls(*args, get_request=False, **kwargs)
+        base_headers = instance.headers or NBAStatsHTTP.headers
+
+        def fetch_body(validators):
+            instance.headers = dict(base_headers, **validators) if validators else instance.headers
+            self._request(endpoint, instance.get_request)
+            return instance.nba_response.get_response()
+
+        body = self._cached(endpoint, instance.parameters, fetch_body, use_cache)
+        if instance.nba_response is None or instance.nba_response.get_response() is not body:
+            instance.nba_response = NBAStatsResponse(response=body, status_code=200, url=None)
+            instance.load_response()
+        return instance
+
+    def get_json(self, url, params=None, headers=None, timeout=30, endpoint=None, use_cache=True):
+        """GET a stats.nba.com URL directly and return the decoded JSON body"""
+        endpoint = endpoint or url.rstrip('/').rsplit('/', 1)[-1]
+
+        def fetch_body(validators):
+            request_headers = dict(headers or STATS_HEADERS, **validators)
+
+            def fetch():
+                response = self.session.get(url, params=params, headers=request_headers,
+                                            timeout=timeout)
+                response.raise_for_status()
+                response.json()  # Never cache a body we cannot decode
+                return response.text
+
+            return self._request(endpoint, fetch)
+
+        return json.loads(self._cached(endpoint, params or {}, fetch_body, use_cache))
+
+    def get_stats(self):
+        """Snapshot of per-endpoint counters, with average latency filled in"""
+        with self._stats_lock:
+            snapshot = {name: dict(stats, latency_buckets=list(stats['latency_buckets']))
+                        for name, stats in self._stats.items()}
+        for stats in snapshot.values():
+            stats['avg_latency'] = stats['total_latency'] / stats['calls'] if stats['calls'] else 0.0
+        return snapshot
+
+
+nba_client = NBAClient(cache=response_cache if os.getenv('NBA_API_CACHE', '1') != '0' else None)
@@ -0,0 +1,166 @@
+# player_aggregation.py - Vectorized per-player, per-team season averages from game logs
+import time
+import numpy as np
+import pandas as pd
+
+STAT_KEYS = ['GP', 'MIN', 'PTS', 'OREB', 'DREB', 'REB', 'AST', 'STL', 'BLK', 'TO', 'PF', 'AST_TO']
+EMPTY_PLAYER_STATS = {k: 0 for k in STAT_KEYS}
+
+# Output column -> game log column to average
+AVERAGED_COLUMNS = {
+    'MIN': 'MIN',
+    'PTS': 'PTS',
+    'OREB': 'OREB',
+    'DREB': 'DREB',
+    'REB': 'REB',
+    'AST': 'AST',
+    'STL': 'STL',
+    'BLK': 'BLK',
+    'TO': 'TOV',  # Note: TOV in API response
+    'PF': 'PF',
+}
+
+def convert_min_to_float(min_str):
+    """Convert MM:SS format to float minutes"""
+    if isinstance(min_str, str) and ':' in min_str:
+        try:
+            minutes, seconds = min_str.split(':')
+            return int(minutes) + int(seconds) / 60
+        except ValueError:
+            return 0.0
+    try:
+        return float(min_str)
+    except (ValueError, TypeError):
+        return 0.0
+
+def parse_minutes(minutes):
+    """Vectorized convert_min_to_float for a Series of numbers and/or 'MM:SS' strings"""
+    numeric = pd.to_numeric(minutes, errors='coerce')
+    unparsed = numeric.isna() & minutes.notna()
+    if unparsed.any():
+        parts = minutes[unparsed].astype(str).str.split(':', n=1, expand=True)
+        if parts.shape[1] == 2:
+            clock = pd.to_numeric(parts[0], errors='coerce') + pd.to_numeric(parts[1], errors='coerce') / 60
+            numeric[unparsed] = clock
+    return numeric.fillna(0.0)
+
+def team_ids_from_matchup(matchup, id_by_abbr):
+    """'LAL vs. BOS' / 'LAL @ BOS' -> id of the team the row belongs to (first abbreviation)"""
+    return matchup.str.split(' ', n=1).str[0].map(id_by_abbr)
+
+def aggregate_player_game_logs(logs_df, id_by_abbr=None):
+    """Average a multi-player game log frame into one row per (PLAYER_ID, TEAM_ID).
+
+    Works on league game logs (PLAYER_ID/TEAM_ID columns) and on PlayerGameLog
+    output (Player_ID and MATCHUP only; pass `id_by_abbr` to derive TEAM_ID).
+    A player traded mid-season gets one row per team. Returns a frame indexed
+    by (PLAYER_ID, TEAM_ID) with the STAT_KEYS columns.
+    """
+    index = pd.MultiIndex.from_arrays([[], []], names=['PLAYER_ID', 'TEAM_ID'])
+    if logs_df.empty:
+        return pd.DataFrame(columns=STAT_KEYS, index=index)
+
+    logs = logs_df
+    if 'PLAYER_ID' not in logs.columns:
+        logs = logs.rename(columns={'Player_ID': 'PLAYER_ID'})
+    if 'TEAM_ID' not in logs.columns:
+        logs = logs.assign(TEAM_ID=team_ids_from_matchup(logs['MATCHUP'], id_by_abbr or {}))
+        logs = logs[logs['TEAM_ID'].notna()]
+        if logs.empty:
+            return pd.DataFrame(columns=STAT_KEYS, index=index)
+    logs = logs.assign(MIN=parse_minutes(logs['MIN']))
+
+    aggregations = {'GP': ('PTS', 'size')}
+    aggregations.update({key: (column, 'mean') for key, column in AVERAGED_COLUMNS.items()})
+    averages = logs.groupby(['PLAYER_ID', 'TEAM_ID']).agg(**aggregations)
+
+    # Ratio of the unrounded means, as the per-player path always computed it
+    turnovers = averages['TO'].where(averages['TO'] > 0)
+    averages['AST_TO'] = (averages['AST'] / turnovers).fillna(0).round(2)
+    averages[list(AVERAGED_COLUMNS)] = averages[list(AVERAGED_COLUMNS)].round(1)
+    averages.index = averages.index.set_levels(
+        [level.astype('int64') for level in averages.index.levels]
+    )
+    return averages[STAT_KEYS]
+
+def averages_to_lookup(averages):
+    """Aggregated frame -> {(player_id, team_id): stats dict} with plain Python values"""
+    return {
+        (int(player_id), int(team_id)): {
+            key: (int(value) if key == 'GP' else float(value)) for key, value in row.items()
+        }
+        for (player_id, team_id), row in averages.to_dict('index').items()
+    }
+
+def _per_player_averages(logs_df, abbr_by_id):
+    """The old get_player_season_stats math, one player/team at a time (benchmark baseline)"""
+    results = {}
+    for player_id, player_logs in logs_df.groupby('PLAYER_ID'):
+        for team_id, team_abbr in abbr_by_id.items():
+            team_logs = player_logs[player_logs['MATCHUP'].str.startswith(team_abbr)].copy()
+            if team_logs.empty:
+                continue
+            team_logs.loc[:, 'MIN_float'] = team_logs['MIN'].apply(convert_min_to_float)
+            avg_ast = team_logs['AST'].mean()
+            avg_to = team_logs['TOV'].mean()
+            results[(player_id, team_id)] = {
+                'GP': team_logs.shape[0],
+                'MIN': round(team_logs['MIN_float'].mean(), 1),
+                'PTS': round(team_logs['PTS'].mean(), 1),
+                'OREB': round(team_logs['OREB'].mean(), 1),
+                'DREB': round(team_logs['DREB'].mean(), 1),
+                'REB': round(team_logs['REB'].mean(), 1),
+                'AST': round(avg_ast, 1),
+                'STL': round(team_logs['STL'].mean(), 1),
+                'BLK': round(team_logs['BLK'].mean(), 1),
+                'TO': round(avg_to, 1),
+                'PF': round(team_logs['PF'].mean(), 1),
+                'AST_TO': round(avg_ast / avg_to if avg_to > 0 else 0, 2)
+            }
+    return results
+
+def synthetic_game_logs(n_rows=30000, n_players=450, n_teams=30, trade_rate=0.1, seed=0):
+    """Random PlayerGameLog-shaped frame ('MM:SS' minutes, MATCHUP strings, some trades)"""
+    rng = np.random.default_rng(seed)
+    abbr_by_id = {1610612700 + i: f"T{i:02d}" for i in range(n_teams)}
+    team_ids = np.array(list(abbr_by_id))
+    player_ids = rng.integers(200000, 210000, n_players)
+    home_team = team_ids[np.arange(n_players) % n_teams]
+    traded_to = np.where(rng.random(n_players) < trade_rate, rng.choice(team_ids, n_players), home_team)
+
+    rows = rng.integers(0, n_players, n_rows)
+    late_season = rng.random(n_rows) < 0.5
+    row_team = np.where(late_season, traded_to[rows], home_team[rows])
+    opponents = rng.choice(team_ids, n_rows)
+    seconds = rng.integers(0, 48 * 60, n_rows)
+    stats = {col: rng.integers(0, 15, n_rows) for col in ['PTS', 'OREB', 'DREB', 'AST', 'STL', 'BLK', 'TOV', 'PF']}
+    stats['REB'] = stats['OREB'] + stats['DREB']
+    return pd.DataFrame({
+        'PLAYER_ID': player_ids[rows],
+        'MATCHUP': [f"{abbr_by_id[t]} vs. {abbr_by_id[o]}" for t, o in zip(row_team, opponents)],
+        'MIN': [f"{s // 60}:{s % 60:02d}" for s in seconds],
+        **stats
+    }), abbr_by_id
+
+def benchmark(n_rows=30000):
+    """Time the per-player path against the vectorized engine on a synthetic log"""
+    logs_df, abbr_by_id = synthetic_game_logs(n_rows)
+    id_by_abbr = {abbr: team_id for team_id, abbr in abbr_by_id.items()}
+
+    started = time.perf_counter()
+    legacy = _per_player_averages(logs_df, abbr_by_id)
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorized = averages_to_lookup(aggregate_player_game_logs(logs_df, id_by_abbr))
+    vectorized_seconds = time.perf_counter() - started
+
+    mismatches = [key for key in legacy if legacy[key] != vectorized.get(key)]
+    print(f"{n_rows} rows, {len(vectorized)} player/team splits")
+    print(f"Per-player path: {legacy_seconds:.2f}s")
+    print(f"Vectorized:      {vectorized_seconds:.3f}s ({legacy_seconds / vectorized_seconds:.0f}x faster)")
+    print(f"Mismatched splits: {len(mismatches)}")
+    return legacy_seconds, vectorized_seconds
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,294 @@
+# predictions.py - Elo team ratings from stored games and logistic win probabilities for slates
+from collections import namedtuple
+from datetime import date, timedelta
+import os
+import threading
+import time
+import numpy as np
+from sqlalchemy import and_, case, func, or_
+from db import db, Game, Team, TeamStats, season_for_date
+from recheck_cache import RecheckCache
+
+EloParams = namedtuple('EloParams', [
+    'k',                  # rating points moved by a fully unexpected result
+    'home_advantage',     # rating points added to the home side before comparing
+    'season_regression',  # share of each rating pulled back to the mean between seasons
+    'initial',            # rating of a team with no history
+    'margin',             # scale updates by margin of victory
+])
+DEFAULT_PARAMS = EloParams(k=20.0, home_advantage=100.0, season_regression=0.25, initial=1500.0, margin=True)
+
+FINAL_STATUS = 3
+# A past date counts as settled once every game on it is final, or once it is this old
+# (postponed games never go final on their original date)
+SETTLE_DAYS = 2
+# How often a process compares the stored ratings watermark with the ratings it holds
+RECHECK_SECONDS = int(os.getenv('RATINGS_RECHECK_SECONDS', '300'))
+
+GameArrays = namedtuple('GameArrays', [
+    'ids', 'dates', 'home_ids', 'away_ids', 'home_scores', 'away_scores'
+])
+
+def win_probability(rating_diff):
+    """Logistic probability (400-point Elo scale) that the side `rating_diff` favours wins"""
+    return 1.0 / (1.0 + np.power(10.0, -np.asarray(rating_diff, dtype=float) / 400.0))
+
+def rating_from_win_pct(win_pct, initial=DEFAULT_PARAMS.initial):
+    """Rating whose expected win rate against an average team is `win_pct`"""
+    win_pct = np.clip(np.asarray(win_pct, dtype=float), 0.05, 0.95)
+    return initial + 400.0 * np.log10(win_pct / (1.0 - win_pct))
+
+
+class RatingState:
+    """Team ratings as one float array, addressed through a team_id -> slot map.
+
+    Games are applied a whole date at a time: no team plays twice on one date,
+    so every game of a date updates from the same pre-date ratings and the
+    whole date is a handful of array operations.
+    """
+
+    def __init__(self, params=DEFAULT_PARAMS):
+        self.params = params
+        self.slot_by_team = {}
+        self.team_ids = np.zeros(0, dtype=np.int64)
+        self.ratings = np.zeros(0)
+        self.games_played = np.zeros(0, dtype=np.int64)
+        self.season = None
+        self.last_date = None  # every game up to this settled date is applied
+        self.last_game_date = None  # watermark: (game_date, id) of the last game applied
+        self.last_game_id = None
+        self.games_applied = 0
+
+    def slots(self, team_ids):
+        """Slots for `team_ids`, adding unseen teams at the initial rating"""
+        new_ids = [t for t in dict.fromkeys(int(t) for t in team_ids) if t not in self.slot_by_team]
+        if new_ids:
+            for team_id in new_ids:
+                self.slot_by_team[team_id] = len(self.slot_by_team)
+            self.team_ids = np.concatenate([self.team_ids, np.array(new_ids, dtype=np.int64)])
+            self.ratings = np.concatenate([self.ratings, np.full(len(new_ids), self.params.initial)])
+            self.games_played = np.concatenate([self.games_played, np.zeros(len(new_ids), dtype=np.int64)])
+        slot_by_team = self.slot_by_team
+        return np.fromiter((slot_by_team[int(t)] for t in team_ids), dtype=np.int64, count=len(team_ids))
+
+    def seed(self, team_ratings):
+        """Start teams from prior ratings, e.g. last season's record"""
+        team_ids = list(team_ratings)
+        slots = self.slots(team_ids)  # may grow the arrays, so index after
+        self.ratings[slots] = [team_ratings[t] for t in team_ids]
+
+    def start_season(self, season):
+        """Regress every rating toward the league mean when a new season begins"""
+        if self.season is not None and season != self.season and len(self.ratings):
+            mean = self.ratings.mean()
+            self.ratings = mean + (1.0 - self.params.season_regression) * (self.ratings - mean)
+        self.season = season
+
+    def apply_date(self, home_slots, away_slots, home_scores, away_scores):
+        """Update ratings with every game of one date; returns the pre-game home win probabilities"""
+        params = self.params
+        diff = self.ratings[home_slots] + params.home_advantage - self.ratings[away_slots]
+        expected = win_probability(diff)
+        home_won = (home_scores > away_scores).astype(float)
+        multiplier = 1.0
+        if params.margin:
+            # log margin, damped when the favourite wins so ratings do not run away
+            winner_diff = np.where(home_won == 1.0, diff, -diff)
+            multiplier = np.log(np.abs(home_scores - away_scores) + 1.0) * 2.2 / (winner_diff * 0.001 + 2.2)
+        delta = params.k * multiplier * (home_won - expected)
+        np.add.at(self.ratings, home_slots, delta)
+        np.add.at(self.ratings, away_slots, -delta)
+        np.add.at(self.games_played, home_slots, 1)
+        np.add.at(self.games_played, away_slots, 1)
+        return expected
+
+    def apply_games(self, games):
+        """Apply GameArrays sorted by (date, id), all later than anything applied before.
+
+        Returns each game's home win probability as it stood before tip-off.
+        """
+        expected = np.empty(len(games.ids))
+        if not len(games.ids):
+            return expected
+        home_slots = self.slots(games.home_ids)
+        away_slots = self.slots(games.away_ids)
+        # Boundaries of each date's run of games
+        starts = np.flatnonzero(np.r_[True, games.dates[1:] != games.dates[:-1]])
+        ends = np.r_[starts[1:], len(games.ids)]
+        for start, end in zip(starts, ends):
+            game_date = games.dates[start].astype(object)
+            self.start_season(season_for_date(game_date))
+            expected[start:end] = self.apply_date(home_slots[start:end], away_slots[start:end],
+                                                  games.home_scores[start:end], games.away_scores[start:end])
+        self.last_game_date = games.dates[-1].astype(object)
+        self.last_game_id = games.ids[-1]
+        self.games_applied += len(games.ids)
+        return expected
+
+    def probabilities(self, home_ids, away_ids):
+        """Home win probability for each (home, away) pair, as one vectorized lookup"""
+        home_slots, away_slots = self.slots(home_ids), self.slots(away_ids)
+        return win_probability(self.ratings[home_slots] + self.params.home_advantage - self.ratings[away_slots])
+
+    def rating(self, team_id):
+        slot = self.slot_by_team.get(team_id)
+        return float(self.ratings[slot]) if slot is not None else self.params.initial
+
+    def table(self):
+        """[(team_id, rating, games_played)] best first"""
+        order = np.argsort(-self.ratings, kind='stable')
+        return [(int(self.team_ids[i]), float(self.ratings[i]), int(self.games_played[i])) for i in order]
+
+
+def settled_through(after=None, today=None):
+    """Latest date D such that every date in (after, D] is settled; None if there is none"""
+    today = today or date.today()
+    query = db.session.query(
+        Game.game_date,
+        func.count(Game.id).label('games'),
+        func.sum(case((Game.status_id == FINAL_STATUS, 1), else_=0)).label('final_games')
+    ).filter(Game.game_date < today)
+    if after is not None:
+        query = query.filter(Game.game_date > after)
+    settled = None
+    for row in query.group_by(Game.game_date).order_by(Game.game_date):
+        if int(row.final_games or 0) < row.games and row.game_date > today - timedelta(days=SETTLE_DAYS):
+            break
+        settled = row.game_date
+    return settled
+
+def load_final_games(after=None, through=None, after_game=None):
+    """Final games with both scores in (after, through], ordered by (game_date, id).
+
+    `after_game` is a (game_date, id) watermark: only games sorting after it are loaded.
+    """
+    query = db.session.query(
+        Game.id, Game.game_date, Game.home_team_id, Game.visitor_team_id,
+        Game.home_team_score, Game.visitor_team_score
+    ).filter(
+        Game.status_id == FINAL_STATUS,
+        Game.home_team_score.isnot(None),
+        Game.visitor_team_score.isnot(None)
+    )
+    if after is not None:
+        query = query.filter(Game.game_date > after)
+    if after_game is not None:
+        last_date, last_id = after_game
+        query = query.filter(or_(Game.game_date > last_date,
+                                 and_(Game.game_date == last_date, Game.id > last_id)))
+    if through is not None:
+        query = query.filter(Game.game_date <= through)
+    rows = query.order_by(Game.game_date, Game.id).all()
+    return GameArrays(
+        ids=[row.id for row in rows],
+        dates=np.array([row.game_date for row in rows], dtype='datetime64[D]'),
+        home_ids=np.array([row.home_team_id for row in rows], dtype=np.int64),
+        away_ids=np.array([row.visitor_team_id for row in rows], dtype=np.int64),
+        home_scores=np.array([row.home_team_score for row in rows], dtype=float),
+        away_scores=np.array([row.visitor_team_score for row in rows], dtype=float)
+    )
+
+def season_win_pcts(season):
+    """{team_id: win_pct} of a stored season, for teams that played"""
+    rows = db.session.query(TeamStats.team_id, TeamStats.win_pct, TeamStats.wins, TeamStats.losses).filter(
+        TeamStats.season == season
+    ).all()
+    return {row.team_id: row.win_pct for row in rows if (row.wins or 0) + (row.losses or 0) > 0}
+
+def season_priors(season, params=DEFAULT_PARAMS):
+    """{team_id: rating} from a stored season's win percentages, regressed like a new season"""
+    win_pcts = season_win_pcts(season)
+    if not win_pcts:
+        return {}
+    ratings = rating_from_win_pct(list(win_pcts.values()), params.initial)
+    ratings = params.initial + (1.0 - params.season_regression) * (ratings - params.initial)
+    return {team_id: float(rating) for team_id, rating in zip(win_pcts, ratings)}
+
+def previous_season(season):
+    start_year = int(season[:4]) - 1
+    return f"{start_year}-{str(start_year + 1)[2:]}"
+
+def build_rating_state(params=DEFAULT_PARAMS, through=None):
+    """Replay every settled final game from scratch (needs an app context)"""
+    state = RatingState(params)
+    through = through or settled_through()
+    if through is None:
+        return state
+    games = load_final_games(through=through)
+    if len(games.ids):
+        # Start the first replayed season from the previous season's standings when we have them
+        first_season = season_for_date(games.dates[0].astype(object))
+        state.seed(season_priors(previous_season(first_season), params))
+        state.season = first_season
+    state.apply_games(games)
+    state.last_date = through
+    return state
+
+def _stored_version(_):
+    # team_ratings imports this module, so it is imported on first use
+    from team_ratings import stored_version
+    return stored_version(DEFAULT_PARAMS)
+
+def _load_ratings(_):
+    # Read-only: ratings are written by team_ratings.update_team_ratings after ingest, never here
+    from team_ratings import load_rating_state
+    started = time.perf_counter()
+    state = load_rating_state(DEFAULT_PARAMS)
+    if state is None:
+        # Nothing stored yet (run `python team_ratings.py rebuild`); every team rates as average
+        return RatingState(DEFAULT_PARAMS)
+    print(f"✓ Loaded ratings ({state.games_applied} games) in {time.perf_counter() - started:.3f}s")
+    return state
+
+_states = RecheckCache('ratings', _load_ratings, _stored_version, RECHECK_SECONDS)
+_lock = threading.Lock()  # slots() grows a state's arrays for unseen teams
+
+def get_rating_state():
+    """This process's copy of the stored ratings (see RecheckCache)"""
+    return _states.get()
+
+def refresh_ratings():
+    """Reread the stored ratings right away, e.g. after this process ingested games (needs an app context)"""
+    state = _states.peek()
+    if state is None:
+        return 0
+    return _states.recheck().games_applied - state.games_applied
+
+def home_win_percentages(matchups):
+    """[(home_pct, visitor_pct)] as whole percentages for [(home_team_id, visitor_team_id)]"""
+    if not matchups:
+        return []
+    state = get_rating_state()
+    home_ids, away_ids = zip(*matchups)
+    with _lock:
+        probabilities = state.probabilities(home_ids, away_ids)
+    home_pcts = np.rint(probabilities * 100).astype(int)
+    return [(int(home), 100 - int(home)) for home in home_pcts]
+
+
+def benchmark(n_games=15, repeats=10000):
+    """Time scoring one slate against a synthetic 30-team rating table"""
+    rng = np.random.default_rng(0)
+    state = RatingState()
+    team_ids = list(range(1610612737, 1610612767))
+    state.seed({team_id: 1500 + rng.normal(0, 100) for team_id in team_ids})
+    pairs = [tuple(rng.choice(team_ids, 2, replace=False)) for _ in range(n_games)]
+    home_ids, away_ids = zip(*pairs)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        state.probabilities(home_ids, away_ids)
+    per_slate = (time.perf_counter() - started) / repeats
+    print(f"{n_games}-game slate: {per_slate * 1e6:.1f}µs ({per_slate * 1e6 / n_games:.2f}µs per game)")
+
+if __name__ == "__main__":
+    from db import create_app
+    app = create_app(role='fetcher')
+    with app.app_context():
+        started = time.perf_counter()
+        state = build_rating_state()
+        print(f"Replayed {state.games_applied} games through {state.last_date} "
+              f"in {time.perf_counter() - started:.2f}s")
+        names = dict(db.session.query(Team.id, Team.full_name).all())
+        for rank, (team_id, rating, games_played) in enumerate(state.table()[:10], 1):
+            print(f"{rank:>2}. {names.get(team_id, team_id):<28} {rating:7.1f}  ({games_played} games)")
+    benchmark()
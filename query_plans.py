@@ -0,0 +1,77 @@
+# query_plans.py - EXPLAIN the hot route queries and fail if one degrades to a table scan
+from datetime import date
+import re
+import sys
+from db import db, Game, games_with_teams_query
+import api_queries
+from standings_view import standings_select
+
+# Tables that grow with seasons; a full scan of these is a regression
+WATCHED_TABLES = ('games', 'players', 'team_stats', 'player_stats')
+
+def hot_queries(team_id, game_date):
+    """Route name -> the query that route runs, with representative parameters"""
+    team_filter = (Game.home_team_id == team_id) | (Game.visitor_team_id == team_id)
+    return {
+        'index / api_games (slate by date)': api_queries.games_select(game_date),
+        'team_page (upcoming games)':
+            games_with_teams_query(outer=True).filter(
+                team_filter & (Game.game_date > game_date)
+            ).order_by(Game.game_date).limit(5),
+        'team_games_api (recent games)': api_queries.team_games_select(team_id),
+        'team_roster_api (roster)': api_queries.roster_select(team_id),
+        'team_page / player_stats_api (roster with stats)': api_queries.player_stats_select(team_id),
+        'standings snapshot (current season)': standings_select(),
+    }
+
+def explain(query):
+    """Run the dialect's EXPLAIN for an ORM query or select(); returns the plan rows as dicts"""
+    connection = db.session.connection()
+    dialect = connection.dialect
+    compiled = getattr(query, 'statement', query).compile(dialect=dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+    result = connection.exec_driver_sql(prefix + str(compiled), params)
+    return [dict(row._mapping) for row in result]
+
+def plan_scans(plan, dialect_name):
+    """Plan lines that read a watched table without an index"""
+    scans = []
+    for row in plan:
+        if dialect_name == 'sqlite':
+            # e.g. 'SCAN games' (bad) vs 'SEARCH games USING INDEX ...'
+            match = re.match(r'SCAN (\w+)(?: AS \w+)?$', row['detail'])
+            if match and match.group(1) in WATCHED_TABLES:
+                scans.append(row['detail'])
+        elif row.get('table') in WATCHED_TABLES and row.get('type') == 'ALL':
+            # MySQL: type ALL is a full table scan
+            scans.append(f"{row['table']}: type=ALL, possible_keys={row.get('possible_keys')}")
+    return scans
+
+def check_query_plans(team_id=1610612747, game_date=None, verbose=True):
+    """EXPLAIN every hot query (needs an app context); returns {route: [scans]} for failures"""
+    game_date = game_date or date.today()
+    dialect_name = db.session.connection().dialect.name
+    failures = {}
+    for route, query in hot_queries(team_id, game_date).items():
+        plan = explain(query)
+        scans = plan_scans(plan, dialect_name)
+        if verbose:
+            print(f"{'✗' if scans else '✓'} {route}")
+            for row in plan:
+                print(f"    {row.get('detail') or row}")
+        if scans:
+            failures[route] = scans
+    return failures
+
+if __name__ == "__main__":
+    from db import create_app
+    app = create_app(role='fetcher')
+    with app.app_context():
+        failures = check_query_plans()
+    if failures:
+        print(f"\n❌ {len(failures)} hot quer{'y' if len(failures) == 1 else 'ies'} fell back to a table scan")
+        sys.exit(1)
+    print("\n✓ All hot queries use indexes")
@@ -0,0 +1,67 @@
+# rate_limiter.py - Process-wide token bucket shared by every stats.nba.com call
+import os
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available; returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """Token bucket whose rate backs off on throttling and recovers on success (AIMD)"""
+
+    def __init__(self, rate, capacity, min_rate=0.2, recovery_step=0.05):
+        super().__init__(rate, capacity)
+        self.max_rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.recovery_step = float(recovery_step)
+
+    def penalize(self):
+        """Halve the rate after a 429 or timeout and drop any banked burst"""
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            return self.rate
+
+    def reward(self):
+        """Creep back toward the configured rate after a clean response"""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self.recovery_step)
+            return self.rate
+
+
+# Defaults keep us at roughly the old "one call every 0.6s" pace, but callers on
+# other threads no longer serialize behind each other's network latency.
+api_rate_limiter = AdaptiveTokenBucket(
+    rate=float(os.getenv('NBA_API_RATE', '1.5')),
+    capacity=float(os.getenv('NBA_API_BURST', '3'))
+)
@@ -0,0 +1,71 @@
+# recheck_cache.py - In-memory values derived from the database, rebuilt when their stored version moves
+from collections import OrderedDict
+import threading
+import time
+
+class RecheckCache:
+    """One built value per key, kept until the database says it is out of date.
+
+    `build(key)` makes the value and `version(key)` returns something cheap
+    that changes with every write behind it (a RefreshTracker time, a
+    watermark row). Values are built on first use. A process that writes
+    calls rebuild() itself; writes from other processes are noticed at most
+    `recheck_seconds` later, when get() compares versions again. Only the
+    `max_entries` most recently read keys are held, and values failing
+    `keep` (e.g. empty results for unknown keys) are returned but not held.
+    If a recheck fails the value held so far keeps being served.
+    """
+
+    def __init__(self, name, build, version, recheck_seconds, max_entries=1, keep=None):
+        self.name = name
+        self.build = build
+        self.version = version
+        self.recheck_seconds = recheck_seconds
+        self.max_entries = max_entries
+        self.keep = keep
+        self._entries = OrderedDict()  # key -> [value, version, monotonic time of last check]
+        self._lock = threading.Lock()
+
+    def peek(self, key=None):
+        """The held value, or None; never touches the database"""
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def get(self, key=None):
+        """The value for `key`, built or rechecked as needed (needs an app context)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                due = time.monotonic() - entry[2] > self.recheck_seconds
+                if due:
+                    entry[2] = time.monotonic()  # one recheck at a time per key
+        if entry is None:
+            return self.rebuild(key)
+        return self.recheck(key) if due else entry[0]
+
+    def recheck(self, key=None):
+        """Compare versions now and rebuild if the stored data moved"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return self.rebuild(key)
+        try:
+            if self.version(key) != entry[1]:
+                return self.rebuild(key)
+        except Exception as e:
+            print(f"✗ Could not recheck {self.name}: {str(e)}")
+        return entry[0]
+
+    def rebuild(self, key=None):
+        """Build `key` from the database now, e.g. right after this process wrote to it"""
+        version = self.version(key)
+        value = self.build(key)
+        with self._lock:
+            if self.keep is not None and not self.keep(value):
+                self._entries.pop(key, None)
+                return value
+            self._entries[key] = [value, version, time.monotonic()]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
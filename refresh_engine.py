@@ -0,0 +1,80 @@
+# refresh_engine.py - Concurrent league-wide refresh of team stats and rosters
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import current_app
+from db import current_season
+from team_registry import get_team_registry
+from data_fetcher import fetch_and_store_team_stats, fetch_and_store_team_roster, fetch_season_player_stats, rebuild_analytics
+
+DEFAULT_WORKERS = int(os.getenv('REFRESH_WORKERS', '4'))
+
+def refresh_team(app, team_id, season=None, season_stats=None):
+    """Refresh stats and roster for one team inside its own app context"""
+    started = time.perf_counter()
+    # Each worker thread gets its own app context and therefore its own DB session
+    with app.app_context():
+        stats_ok = fetch_and_store_team_stats(team_id, season)
+        roster_ok = fetch_and_store_team_roster(team_id, season, season_stats=season_stats)
+    return {
+        'team_id': team_id,
+        'stats_ok': stats_ok,
+        'roster_ok': roster_ok,
+        'elapsed': time.perf_counter() - started
+    }
+
+def refresh_league(team_ids=None, season=None, max_workers=DEFAULT_WORKERS):
+    """Refresh every team through a bounded worker pool.
+
+    All API calls still go through the shared token bucket in rate_limiter, so
+    adding workers overlaps network waits without raising our request rate.
+    Must be called inside an app context. Returns per-team timing results.
+    """
+    app = current_app._get_current_object()
+    season = season or current_season()
+    teams_by_id = {team.id: team.full_name for team in get_team_registry().all()}
+    if team_ids is None:
+        team_ids = list(teams_by_id)
+
+    print(f"Refreshing data for {len(team_ids)} teams with {max_workers} workers...")
+    started = time.perf_counter()
+    results = []
+
+    # One league-wide game log call replaces a PlayerGameLog call per rostered player
+    try:
+        season_stats = fetch_season_player_stats(season)
+        print(f"Loaded season averages for {len(season_stats)} player/team splits "
+              f"in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"Bulk player stats fetch failed, falling back to per-player logs: {str(e)}")
+        season_stats = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(refresh_team, app, team_id, season, season_stats): team_id
+            for team_id in team_ids
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            team_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error refreshing team {team_id}: {str(e)}")
+                traceback.print_exc()
+                result = {'team_id': team_id, 'stats_ok': False, 'roster_ok': False, 'elapsed': 0.0}
+            results.append(result)
+            status = "✓" if result['stats_ok'] and result['roster_ok'] else "✗"
+            print(f"{status} [{i}/{len(team_ids)}] {teams_by_id.get(team_id, team_id)} in {result['elapsed']:.1f}s")
+
+    # Once for the whole league rather than after every team's roster
+    rebuild_analytics()
+    total = time.perf_counter() - started
+    failed = [r for r in results if not (r['stats_ok'] and r['roster_ok'])]
+    print(f"League refresh finished in {total:.1f}s "
+          f"({len(results) - len(failed)}/{len(results)} teams succeeded)")
+    if results:
+        slowest = max(results, key=lambda r: r['elapsed'])
+        print(f"Slowest team: {teams_by_id.get(slowest['team_id'], slowest['team_id'])} "
+              f"({slowest['elapsed']:.1f}s)")
+    return results
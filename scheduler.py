@@ -0,0 +1,216 @@
+# scheduler.py - Background refresh jobs, kept off the request threads
+from collections import OrderedDict
+from datetime import datetime
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from db import should_refresh, update_refresh_time, request_refresh, requested_refreshes
+
+# Hours between automatic refreshes, checked against RefreshTracker.last_refresh
+REFRESH_INTERVALS = {
+    'teams': 24,
+    'standings': 6,
+    'games': 0.25,
+    'schedule': 24,
+    'leaders': 6,
+    'player_stats': 12,
+}
+# Fetchers that already stamp RefreshTracker themselves (and skip when fresh); leaders
+# stamps one row per season (leaders.tracker_entity), so the job's own row is stamped here
+SELF_TRACKED = {'teams', 'standings', 'initialize'}
+TICK_SECONDS = int(os.getenv('REFRESH_TICK_SECONDS', '60'))
+MAX_FINISHED_JOBS = 200
+
+def is_valid_entity(entity):
+    if entity in REFRESH_INTERVALS or entity == 'initialize':
+        return True
+    if entity.startswith('team_'):
+        return entity.split('_', 1)[1].isdigit()
+    return False
+
+def run_refresh(entity):
+    """Run the fetcher(s) behind an entity name; returns the fetchers' success flag"""
+    # Imported here so web processes only load nba_api/pandas inside worker threads
+    import data_fetcher
+    if entity == 'initialize':
+        return data_fetcher.initialize_database()
+    if entity == 'teams':
+        return data_fetcher.fetch_and_store_teams()
+    if entity == 'standings':
+        return data_fetcher.fetch_and_store_standings()
+    if entity == 'player_stats':
+        # Every rostered player's averages from one league-wide game log call
+        return data_fetcher.fetch_and_store_all_player_stats()
+    if entity == 'games':
+        # Re-polls today plus any recent date that is not all final yet
+        from game_ingest import ingest_recent_games
+        from predictions import refresh_ratings
+        ok = ingest_recent_games()
+        refresh_ratings()  # pick up the ratings ingest_games just stored
+        return ok
+    if entity == 'leaders':
+        from leaders import fetch_and_store_leaders
+        return fetch_and_store_leaders()
+    if entity == 'schedule':
+        from game_ingest import backfill_season
+        return backfill_season()
+    if entity.startswith('team_'):
+        team_id = int(entity.split('_', 1)[1])
+        stats_ok = data_fetcher.fetch_and_store_team_stats(team_id)
+        # One league game log call covers every player on the roster
+        season_stats = data_fetcher.fetch_season_player_stats()
+        roster_ok = data_fetcher.fetch_and_store_team_roster(team_id, season_stats=season_stats)
+        data_fetcher.rebuild_analytics()
+        return stats_ok and roster_ok
+    raise ValueError(f"Unknown entity: {entity}")
+
+
+def handed_off(entity):
+    """Response body for a refresh left to the refresh process (no job to poll)"""
+    return {
+        'success': True,
+        'message': f'Refresh of {entity} requested; the refresh process runs it within {TICK_SECONDS}s',
+        'status': 'requested'
+    }
+
+
+class RefreshJob:
+    def __init__(self, entity):
+        self.id = uuid.uuid4().hex
+        self.entity = entity
+        self.status = 'queued'
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'entity': self.entity,
+            'status': self.status,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'error': self.error
+        }
+
+
+class RefreshScheduler:
+    """Job queue + worker threads + periodic ticker for data refreshes.
+
+    Submitting an entity that already has a queued/running job returns that
+    job instead of starting another fetch. With `run_jobs` off (web workers,
+    unless REFRESH_SCHEDULER=1) submissions are handed to the refresh process
+    through RefreshTracker instead, and submit() returns None.
+    """
+
+    def __init__(self, app, workers=1, tick_seconds=TICK_SECONDS, run_jobs=True):
+        self.app = app
+        self.run_jobs = run_jobs
+        self.workers = workers
+        self.tick_seconds = tick_seconds
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """Start worker and ticker threads (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"refresh-worker-{i}", daemon=True).start()
+        if self.tick_seconds > 0:
+            threading.Thread(target=self._tick, name="refresh-ticker", daemon=True).start()
+
+    def submit(self, entity):
+        if not is_valid_entity(entity):
+            raise ValueError(f"Unknown entity: {entity}")
+        if not self.run_jobs:
+            # Nothing in this process would ever run the job; the refresh process's ticker will
+            with self.app.app_context():
+                request_refresh(entity)
+            return None
+        with self._lock:
+            job = self._active.get(entity)
+            if job is not None:
+                return job
+            job = RefreshJob(entity)
+            self._active[entity] = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_FINISHED_JOBS:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest.active:
+                    break
+                del self._jobs[oldest_id]
+        self._queue.put(job)
+        return job
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            try:
+                with self.app.app_context():
+                    ok = run_refresh(job.entity)
+                    # One-off requests (initialize, team_<id>) are cleared even on failure, not retried every tick
+                    if (ok and job.entity not in SELF_TRACKED) or job.entity not in REFRESH_INTERVALS:
+                        update_refresh_time(job.entity)
+                job.status = 'succeeded' if ok else 'failed'
+            except Exception as e:
+                print(f"Refresh job {job.entity} failed: {str(e)}")
+                traceback.print_exc()
+                job.status = 'failed'
+                job.error = str(e)
+            finally:
+                job.finished_at = datetime.utcnow()
+                with self._lock:
+                    if self._active.get(job.entity) is job:
+                        del self._active[job.entity]
+                self._queue.task_done()
+
+    def _tick(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    due = [entity for entity, hours in REFRESH_INTERVALS.items()
+                           if should_refresh(entity, hours=hours)]
+                    # Handed off by web workers (run_jobs off)
+                    due += [entity for entity in requested_refreshes()
+                            if entity not in due and is_valid_entity(entity)]
+                for entity in due:
+                    self.submit(entity)
+            except Exception as e:
+                print(f"Refresh scheduler tick failed: {str(e)}")
+            time.sleep(self.tick_seconds)
+
+
+if __name__ == "__main__":
+    # The refresh process: the one executor of fetches for every web worker
+    from db import create_app
+    app = create_app(role='fetcher')
+    scheduler = RefreshScheduler(app)
+    scheduler.start()
+    # The one scoreboard poller; web processes relay its writes to their SSE clients
+    from live_scores import LiveScorePoller, LIVE_SCORES_ENABLED
+    if LIVE_SCORES_ENABLED:
+        LiveScorePoller(app).start()
+    print(f"Refresh scheduler running (tick every {scheduler.tick_seconds}s)...")
+    while True:
+        time.sleep(3600)
@@ -0,0 +1,117 @@
+# schema_migrations.py - Ordered schema changes for databases created before the models changed
+from datetime import datetime
+import sys
+from sqlalchemy import inspect, text
+from db import db, Game, Player, PlayerStats, SchemaMigration, TeamStats
+
+# Season label for stats stored before team_stats/player_stats were keyed by season
+LEGACY_SEASON = '2024-25'
+
+# (version, description, upgrade(connection)) in the order they must run
+MIGRATIONS = []
+
+def migration(version, description):
+    """Register an upgrade step; versions must be unique and increasing"""
+    def register(upgrade):
+        if MIGRATIONS and version <= MIGRATIONS[-1][0]:
+            raise ValueError(f"Migration {version} registered out of order")
+        MIGRATIONS.append((version, description, upgrade))
+        return upgrade
+    return register
+
+def model_index(model, name):
+    return next(index for index in model.__table__.indexes if index.name == name)
+
+
+@migration(1, "Indexes for game slates, team schedules and rosters")
+def add_hot_query_indexes(connection):
+    for model, name in [
+        (Game, 'ix_games_game_date'),
+        (Game, 'ix_games_home_team_date'),
+        (Game, 'ix_games_visitor_team_date'),
+        (Player, 'ix_players_team_id'),
+    ]:
+        model_index(model, name).create(connection, checkfirst=True)
+
+
+def rebuild_with_season(connection, model, copy_sql):
+    """Move `model`'s table aside, create it with the current definition and copy rows back"""
+    table = model.__tablename__
+    if 'season' in {column['name'] for column in inspect(connection).get_columns(table)}:
+        return  # created by db.create_all() with the new keys
+    legacy = f"{table}_pre_season"
+    connection.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    model.__table__.create(connection)
+    connection.execute(text(copy_sql.format(legacy=legacy)), {'season': LEGACY_SEASON})
+    connection.execute(text(f"DROP TABLE {legacy}"))
+
+@migration(2, "Key team_stats and player_stats by season")
+def add_season_keys(connection):
+    rebuild_with_season(connection, TeamStats, """
+        INSERT INTO team_stats (team_id, season, wins, losses, win_pct, conference_rank,
+                                points_per_game, rebounds_per_game, assists_per_game, last_updated)
+        SELECT team_id, :season, wins, losses, win_pct, conference_rank,
+               points_per_game, rebounds_per_game, assists_per_game, last_updated
+        FROM {legacy}
+    """)
+    # Old rows held each player's averages with their roster team at the time
+    rebuild_with_season(connection, PlayerStats, """
+        INSERT INTO player_stats (player_id, season, team_id, gp, min_pg, pts_pg, oreb_pg, dreb_pg,
+                                  reb_pg, ast_pg, stl_pg, blk_pg, to_pg, pf_pg, ast_to, last_updated)
+        SELECT s.player_id, :season, p.team_id, s.gp, s.min_pg, s.pts_pg, s.oreb_pg, s.dreb_pg,
+               s.reb_pg, s.ast_pg, s.stl_pg, s.blk_pg, s.to_pg, s.pf_pg, s.ast_to, s.last_updated
+        FROM {legacy} s JOIN players p ON p.id = s.player_id
+        WHERE p.team_id IS NOT NULL
+    """)
+
+@migration(3, "Index games by last write for the incremental ratings update")
+def add_games_last_updated_index(connection):
+    model_index(Game, 'ix_games_last_updated').create(connection, checkfirst=True)
+
+
+def applied_versions():
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    return {row.version for row in db.session.query(SchemaMigration.version)}
+
+def pending_migrations():
+    applied = applied_versions()
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+def run_migrations():
+    """Apply pending migrations in order (needs an app context); returns how many ran.
+
+    Every step is idempotent, so a database freshly built by db.create_all()
+    just records them as applied.
+    """
+    pending = pending_migrations()
+    db.session.commit()  # don't hold the version read open across DDL
+    for version, description, upgrade in pending:
+        print(f"Applying migration {version}: {description}")
+        started = datetime.utcnow()
+        with db.engine.begin() as connection:
+            upgrade(connection)
+            connection.execute(SchemaMigration.__table__.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        print(f"✓ Migration {version} applied in {(datetime.utcnow() - started).total_seconds():.1f}s")
+    return len(pending)
+
+def print_status():
+    applied = applied_versions()
+    for version, description, _ in MIGRATIONS:
+        print(f"  [{'x' if version in applied else ' '}] {version}: {description}")
+
+
+if __name__ == "__main__":
+    from db import create_app
+    app = create_app(role='fetcher')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'upgrade'
+    with app.app_context():
+        if command == 'status':
+            print_status()
+        elif command == 'upgrade':
+            count = run_migrations()
+            print(f"{count} migration(s) applied" if count else "Schema is up to date")
+        else:
+            print("Usage: python schema_migrations.py [upgrade|status]")
+            sys.exit(2)
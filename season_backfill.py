@@ -0,0 +1,111 @@
+# season_backfill.py - Load standings, team and player averages (and games) for past seasons
+import argparse
+from datetime import datetime
+import time
+import traceback
+from nba_api.stats.endpoints import leaguestandings, leaguegamelog
+from nba_api.stats.library.parameters import SeasonType
+from db import db, Player, PlayerStats, TeamStats, bulk_upsert, current_season
+from data_fetcher import (
+    safe_api_call,
+    standings_rows,
+    player_stats_row,
+    fetch_season_player_game_logs,
+    compute_player_season_averages
+)
+from player_aggregation import averages_to_lookup
+from team_registry import get_team_registry
+
+def previous_seasons(count, before=None):
+    """The `count` seasons before `before` (default: the current season), oldest first"""
+    start_year = int((before or current_season())[:4])
+    return [f"{year}-{str(year + 1)[2:]}" for year in range(start_year - count, start_year)]
+
+def fetch_team_season_averages(season):
+    """{team_id: (pts, reb, ast) per game} from one team-level league game log call"""
+    logs_api = safe_api_call(
+        leaguegamelog.LeagueGameLog,
+        player_or_team_abbreviation='T',
+        season=season,
+        season_type_all_star=SeasonType.regular
+    )
+    logs_df = logs_api.get_data_frames()[0]
+    if logs_df.empty:
+        return {}
+    averages = logs_df.groupby('TEAM_ID')[['PTS', 'REB', 'AST']].mean().round(1)
+    return {int(team_id): tuple(float(v) for v in row) for team_id, row in averages.iterrows()}
+
+def backfill_season_stats(season):
+    """Store one season's team_stats and player_stats rows; three API calls in total"""
+    started = time.perf_counter()
+    registry = get_team_registry()
+    now = datetime.utcnow()
+
+    standings_df = safe_api_call(leaguestandings.LeagueStandings, season=season).get_data_frames()[0]
+    standings_df = standings_df[standings_df['TeamID'].isin(list(registry.by_id))]
+    team_rows = standings_rows(standings_df, season, now)
+    team_averages = fetch_team_season_averages(season)
+    for row in team_rows:
+        pts, reb, ast = team_averages.get(row['team_id'], (0.0, 0.0, 0.0))
+        row.update(points_per_game=pts, rebounds_per_game=reb, assists_per_game=ast)
+
+    logs_df = fetch_season_player_game_logs(season)
+    logs_df = logs_df[logs_df['TEAM_ID'].isin(list(registry.by_id))]
+    season_stats = averages_to_lookup(compute_player_season_averages(logs_df))
+
+    # Retired players need a players row for the foreign key; they get no current team
+    names = dict(zip(logs_df['PLAYER_ID'], logs_df['PLAYER_NAME']))
+    player_rows = [
+        {'id': player_id, 'full_name': names.get(player_id, str(player_id)), 'team_id': None, 'last_updated': now}
+        for player_id in {player_id for player_id, _ in season_stats}
+    ]
+    stats_rows = [
+        player_stats_row(player_id, team_id, season, stats, now)
+        for (player_id, team_id), stats in season_stats.items()
+    ]
+
+    bulk_upsert(TeamStats, team_rows)
+    bulk_upsert(Player, player_rows, update_columns=[])  # existing players are left untouched
+    bulk_upsert(PlayerStats, stats_rows)
+    db.session.commit()
+    print(f"✓ {season}: {len(team_rows)} teams, {len(stats_rows)} player/team splits "
+          f"in {time.perf_counter() - started:.1f}s")
+    return True
+
+def backfill_seasons(seasons, include_games=True):
+    """Backfill several seasons; returns the seasons that failed"""
+    failed = []
+    for season in seasons:
+        try:
+            backfill_season_stats(season)
+            if include_games:
+                from game_ingest import backfill_season
+                if not backfill_season(season):
+                    failed.append(season)
+        except Exception as e:
+            print(f"❌ Error backfilling {season}: {str(e)}")
+            traceback.print_exc()
+            db.session.rollback()
+            failed.append(season)
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load past seasons into the season-keyed stats tables")
+    parser.add_argument('seasons', nargs='*', help="seasons like 2022-23 (default: --last)")
+    parser.add_argument('--last', type=int, default=3, help="number of seasons before the current one")
+    parser.add_argument('--no-games', action='store_true', help="skip the games table")
+    args = parser.parse_args()
+
+    from db import create_app
+    from schema_migrations import run_migrations
+    app = create_app(role='fetcher')
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+        seasons = args.seasons or previous_seasons(args.last)
+        print(f"Backfilling {', '.join(seasons)}...")
+        failed = backfill_seasons(seasons, include_games=not args.no_games)
+    if failed:
+        print(f"❌ Failed seasons: {', '.join(failed)}")
+    else:
+        print("✓ Backfill complete")
@@ -0,0 +1,241 @@
+# serializers.py - Shared dict builders and the fast row -> JSON path for API/template payloads
+import json
+import time
+from flask import current_app
+from db import Player, PlayerStats
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json fallback
+    orjson = None
+
+def dumps(payload):
+    """Encode to compact JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+def json_response(payload, status=200):
+    """Like jsonify, but through dumps()"""
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
+
+
+# Marks a field without a default (None is a valid default)
+_NO_DEFAULT = object()
+
+
+class RowSerializer:
+    """Maps selected columns straight onto output keys.
+
+    `fields` is a list of (key, column) or (key, column, default) tuples;
+    the default replaces falsy values like the `row.x or 0` code it
+    replaces, and a None column emits the default as a constant. The
+    column -> key table is resolved once into (key, index, default) tuples
+    that build each dict from a plain result tuple by position.
+    """
+
+    def __init__(self, fields):
+        self.columns = []
+        self.fields = []
+        for field in fields:
+            key, column = field[0], field[1]
+            if column is None:
+                self.fields.append((key, None, field[2]))
+                continue
+            # The same column may feed several keys; select it once
+            index = next((i for i, c in enumerate(self.columns) if c is column), None)
+            if index is None:
+                index = len(self.columns)
+                self.columns.append(column)
+            # No default: `row[i] or None` would turn 0 and '' into None
+            self.fields.append((key, index, field[2]) if len(field) > 2 else (key, index, _NO_DEFAULT))
+        self.fields = tuple(self.fields)
+        self.keys = tuple(key for key, _, _ in self.fields)
+        self.to_dict = self._compile()
+
+    def _compile(self):
+        fields = self.fields
+        no_default = _NO_DEFAULT
+
+        def to_dict(row):
+            return {
+                key: (default if index is None
+                      else row[index] if default is no_default
+                      else row[index] or default)
+                for key, index, default in fields
+            }
+        return to_dict
+
+    def serialize(self, rows):
+        to_dict = self.to_dict
+        return [to_dict(row) for row in rows]
+
+PLAYER_STATS_FIELDS = RowSerializer([
+    ('PLAYER', Player.full_name),
+    ('PLAYER_ID', Player.id),
+    ('NUM', Player.jersey),
+    ('POSITION', Player.position),
+    ('HEIGHT', Player.height),
+    ('WEIGHT', Player.weight),
+    ('GP', PlayerStats.gp, 0),
+    ('MIN', PlayerStats.min_pg, 0.0),
+    ('PTS', PlayerStats.pts_pg, 0.0),
+    ('OREB', PlayerStats.oreb_pg, 0.0),
+    ('DREB', PlayerStats.dreb_pg, 0.0),
+    ('REB', PlayerStats.reb_pg, 0.0),
+    ('AST', PlayerStats.ast_pg, 0.0),
+    ('STL', PlayerStats.stl_pg, 0.0),
+    ('BLK', PlayerStats.blk_pg, 0.0),
+    ('TO', PlayerStats.to_pg, 0.0),
+    ('PF', PlayerStats.pf_pg, 0.0),
+    ('AST_TO', PlayerStats.ast_to, 0.0),
+])
+
+# team.html roster table
+ROSTER_FIELDS = RowSerializer([
+    ('name', Player.full_name),
+    ('position', Player.position, 'N/A'),
+    ('jersey', Player.jersey, 'N/A'),
+    ('height', Player.height, 'N/A'),
+    ('weight', Player.weight, 'N/A'),
+    ('age', None, 'N/A'),  # Age not stored in current schema
+    ('gp', PlayerStats.gp, 0),
+    ('min', PlayerStats.min_pg, 0.0),
+    ('ppg', PlayerStats.pts_pg, 0.0),
+    ('oreb', PlayerStats.oreb_pg, 0.0),
+    ('dreb', PlayerStats.dreb_pg, 0.0),
+    ('rpg', PlayerStats.reb_pg, 0.0),
+    ('apg', PlayerStats.ast_pg, 0.0),
+    ('spg', PlayerStats.stl_pg, 0.0),
+    ('bpg', PlayerStats.blk_pg, 0.0),
+    ('to', PlayerStats.to_pg, 0.0),
+    ('pf', PlayerStats.pf_pg, 0.0),
+    ('ast_to', PlayerStats.ast_to, 0.0),
+])
+
+ROSTER_API_FIELDS = RowSerializer([
+    ('PLAYER_ID', Player.id),
+    ('PLAYER', Player.full_name),
+    ('NUM', Player.jersey),
+    ('POSITION', Player.position),
+    ('HEIGHT', Player.height),
+    ('WEIGHT', Player.weight),
+])
+
+def serialize_game(game, home_team, visitor_team):
+    """Build the game dict used by the index page and /api/games"""
+    return {
+        'game_id': game.id,
+        'home_team': {
+            'id': home_team.id,
+            'name': home_team.full_name,
+            'abbreviation': home_team.abbreviation,
+            'score': game.home_team_score
+        },
+        'visitor_team': {
+            'id': visitor_team.id,
+            'name': visitor_team.full_name,
+            'abbreviation': visitor_team.abbreviation,
+            'score': game.visitor_team_score
+        },
+        'status': {
+            'id': game.status_id,
+            'text': game.status_text
+        },
+        'game_time': game.game_time
+    }
+
+def serialize_team_game(game, home_team, visitor_team, team_id):
+    """Build one /api/team/<id>/games row from `team_id`'s point of view"""
+    # Determine if team was home or away
+    is_home = game.home_team_id == team_id
+    opponent = visitor_team if is_home else home_team
+    team_score, opponent_score = ((game.home_team_score, game.visitor_team_score) if is_home
+                                  else (game.visitor_team_score, game.home_team_score))
+    
+    return {
+        'GAME_ID': game.id,
+        'GAME_DATE': game.game_date.strftime('%Y-%m-%d'),
+        'MATCHUP': f"{'vs' if is_home else '@'} {opponent.abbreviation if opponent else 'UNK'}",
+        # Unplayed games have no scores yet
+        'WL': '' if team_score is None or opponent_score is None else ('W' if team_score > opponent_score else 'L'),
+        'PTS': team_score
+    }
+
+def _legacy_player_stats(rows):
+    """The old player_stats_api loop over named rows (benchmark baseline)"""
+    return [{
+        'PLAYER': row.full_name,
+        'PLAYER_ID': row.id,
+        'NUM': row.jersey,
+        'POSITION': row.position,
+        'HEIGHT': row.height,
+        'WEIGHT': row.weight,
+        'GP': row.gp or 0,
+        'MIN': row.min_pg or 0.0,
+        'PTS': row.pts_pg or 0.0,
+        'OREB': row.oreb_pg or 0.0,
+        'DREB': row.dreb_pg or 0.0,
+        'REB': row.reb_pg or 0.0,
+        'AST': row.ast_pg or 0.0,
+        'STL': row.stl_pg or 0.0,
+        'BLK': row.blk_pg or 0.0,
+        'TO': row.to_pg or 0.0,
+        'PF': row.pf_pg or 0.0,
+        'AST_TO': row.ast_to or 0.0
+    } for row in rows]
+
+def benchmark(n_players=600, repeats=200):
+    """Time the old Row -> dict -> jsonify path against tuples -> RowSerializer dicts -> dumps"""
+    import os
+    os.environ['DATABASE_URL'] = 'sqlite://'  # never touch a real database
+    from db import create_app, db, Team, player_stats_join, current_season, bulk_upsert
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Team(id=1, abbreviation='TST', full_name='Test Team', city='Test', name='Team', conference='East'))
+        bulk_upsert(Player, [{'id': i, 'full_name': f'Player {i}', 'jersey': str(i % 99), 'position': 'G',
+                              'height': '6-6', 'weight': '210', 'team_id': 1} for i in range(n_players)])
+        bulk_upsert(PlayerStats, [{'player_id': i, 'season': current_season(), 'team_id': 1, 'gp': 60,
+                                   'min_pg': 30.5, 'pts_pg': i % 35 + 0.5, 'oreb_pg': 1.0, 'dreb_pg': 4.2,
+                                   'reb_pg': 5.2, 'ast_pg': 3.3, 'stl_pg': 1.1, 'blk_pg': 0.4, 'to_pg': 2.0,
+                                   'pf_pg': 2.5, 'ast_to': 1.65} for i in range(0, n_players, 2)])
+        db.session.commit()
+
+        legacy_query = db.session.query(
+            Player.id, Player.full_name, Player.jersey, Player.position, Player.height, Player.weight,
+            PlayerStats.gp, PlayerStats.min_pg, PlayerStats.pts_pg, PlayerStats.oreb_pg, PlayerStats.dreb_pg,
+            PlayerStats.reb_pg, PlayerStats.ast_pg, PlayerStats.stl_pg, PlayerStats.blk_pg, PlayerStats.to_pg,
+            PlayerStats.pf_pg, PlayerStats.ast_to
+        ).outerjoin(PlayerStats, player_stats_join()).filter(Player.team_id == 1)
+        fast_query = db.session.query(*PLAYER_STATS_FIELDS.columns).outerjoin(
+            PlayerStats, player_stats_join()
+        ).filter(Player.team_id == 1)
+        rows = legacy_query.all()
+        tuples = fast_query.all()
+
+        # Serialization only (rows already fetched), then end to end including the query
+        timings = {}
+        for label, run in [
+            ('legacy serialize', lambda: app.json.dumps(_legacy_player_stats(rows)).encode('utf-8')),
+            ('fast serialize', lambda: dumps(PLAYER_STATS_FIELDS.serialize(tuples))),
+            ('legacy end to end', lambda: app.json.dumps(_legacy_player_stats(legacy_query.all())).encode('utf-8')),
+            ('fast end to end', lambda: dumps(PLAYER_STATS_FIELDS.serialize(fast_query.all()))),
+        ]:
+            started = time.perf_counter()
+            for _ in range(repeats):
+                run()
+            timings[label] = (time.perf_counter() - started) / repeats
+
+        same = json.loads(app.json.dumps(_legacy_player_stats(rows))) == json.loads(dumps(PLAYER_STATS_FIELDS.serialize(tuples)))
+        print(f"{n_players} rows x {repeats} runs, encoder: {'orjson' if orjson else 'json'}")
+        for label, seconds in timings.items():
+            print(f"  {label:<18} {seconds * 1000:7.2f} ms")
+        print(f"Serialize speedup: {timings['legacy serialize'] / timings['fast serialize']:.1f}x, "
+              f"end to end: {timings['legacy end to end'] / timings['fast end to end']:.1f}x")
+        print(f"Identical payloads: {same}")
+        return timings
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,93 @@
+# standings_view.py - Materialized standings held in memory for /api/standings and /teams
+from collections import namedtuple
+import hashlib
+import os
+from sqlalchemy import select
+from db import db, Team, TeamStats, RefreshTracker, current_season
+from recheck_cache import RecheckCache
+from serializers import dumps
+
+# How often a process compares RefreshTracker's standings time with the snapshot it holds
+RECHECK_SECONDS = int(os.getenv('STANDINGS_RECHECK_SECONDS', '60'))
+
+StandingsSnapshot = namedtuple('StandingsSnapshot', [
+    'standings',       # list of dicts in /api/standings format
+    'eastern_teams',   # list of dicts in teams.html format
+    'western_teams',
+    'json_body',       # pre-serialized /api/standings response body
+    'etag',
+    'last_updated'     # RefreshTracker time of the standings fetch it reflects
+])
+
+def _standings_last_refresh():
+    tracker = RefreshTracker.query.filter_by(entity='standings').first()
+    return tracker.last_refresh if tracker else None
+
+def standings_select(season=None):
+    """Teams joined to their standings for `season` (default current), in conference order"""
+    return select(
+        Team.id,
+        Team.full_name,
+        Team.abbreviation,
+        Team.conference,
+        TeamStats.wins,
+        TeamStats.losses,
+        TeamStats.win_pct,
+        TeamStats.conference_rank
+    ).join(TeamStats, (Team.id == TeamStats.team_id) & (TeamStats.season == (season or current_season()))).order_by(
+        Team.conference,
+        TeamStats.conference_rank
+    )
+
+def build_standings_snapshot():
+    """Run the standings join once and derive every served representation from it"""
+    rows = db.session.execute(standings_select()).all()
+    return snapshot_from_rows(rows, _standings_last_refresh())
+
+def snapshot_from_rows(rows, last_updated):
+    """StandingsSnapshot from standings_select() rows"""
+    standings = []
+    conferences = {'East': [], 'West': []}
+    for row in rows:
+        standings.append({
+            'id': row.id,
+            'TeamName': row.full_name,
+            'abbreviation': row.abbreviation,
+            'Conference': row.conference,
+            'ConferenceRank': row.conference_rank,
+            'WINS': row.wins,
+            'LOSSES': row.losses,
+            'WinPercentage': row.win_pct,
+            'full_name': row.full_name
+        })
+        if row.conference in conferences:
+            conferences[row.conference].append({
+                'id': row.id,
+                'full_name': row.full_name,
+                'abbreviation': row.abbreviation,
+                'wins': row.wins,
+                'losses': row.losses,
+                'win_pct': row.win_pct,
+                'conference_rank': row.conference_rank
+            })
+
+    json_body = dumps(standings)
+    return StandingsSnapshot(
+        standings=standings,
+        eastern_teams=conferences['East'],
+        western_teams=conferences['West'],
+        json_body=json_body,
+        etag=hashlib.sha1(json_body).hexdigest(),
+        last_updated=last_updated
+    )
+
+_snapshots = RecheckCache('standings', lambda _: build_standings_snapshot(), lambda _: _standings_last_refresh(),
+                          RECHECK_SECONDS)
+
+def rebuild_standings_snapshot():
+    """Rebuild after standings/teams are written (needs an app context)"""
+    return _snapshots.rebuild()
+
+def get_standings_snapshot():
+    """Current snapshot, built on first use (see RecheckCache)"""
+    return _snapshots.get()
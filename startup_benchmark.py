@@ -0,0 +1,79 @@
+# startup_benchmark.py - Import time per module and time to first request for the web process
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Modules the web process should never import at startup
+HEAVY_MODULES = ['pandas', 'numpy', 'data_fetcher', 'nba_api.stats.endpoints', 'refresh_engine']
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+FIRST_REQUEST_SNIPPET = """
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+status = client.get('{path}').status_code
+finished = time.perf_counter()
+print(f"{{imported - started:.4f}} {{finished - started:.4f}} {{status}}")
+"""
+
+def run_python(args, env=None):
+    return subprocess.run([sys.executable] + args, capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+
+def measure_imports(module='app'):
+    """Run `python -X importtime -c 'import <module>'` and parse it.
+
+    Returns a list of (module, self_us, cumulative_us) in import order.
+    """
+    result = run_python(['-X', 'importtime', '-c', f'import {module}'])
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    timings = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            timings.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return timings
+
+def measure_first_request(path='/about'):
+    """Fresh interpreter: seconds to import app and to serve the first request"""
+    env = dict(os.environ, REFRESH_SCHEDULER='0')
+    result = run_python(['-c', FIRST_REQUEST_SNIPPET.format(path=path)], env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"First request failed:\n{result.stderr}")
+    import_seconds, total_seconds, status = result.stdout.strip().splitlines()[-1].split()
+    return float(import_seconds), float(total_seconds), int(status)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure web process startup time")
+    parser.add_argument('--top', type=int, default=15, help="slowest modules to list")
+    parser.add_argument('--budget', type=float, default=1.0, help="max seconds to first request")
+    parser.add_argument('--path', default='/about', help="route used for the first request")
+    args = parser.parse_args()
+
+    timings = measure_imports()
+    print(f"Slowest imports (cumulative, {len(timings)} modules):")
+    for name, self_us, cumulative_us in sorted(timings, key=lambda t: t[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name}")
+
+    imported = {name for name, _, _ in timings}
+    heavy = [name for name in HEAVY_MODULES if name in imported]
+    if heavy:
+        print(f"✗ Web process imports heavy modules: {', '.join(heavy)}")
+    else:
+        print("✓ No fetcher/pandas modules imported")
+
+    import_seconds, total_seconds, status = measure_first_request(args.path)
+    print(f"Import app: {import_seconds:.3f}s, first request ({args.path} -> {status}): {total_seconds:.3f}s")
+
+    ok = not heavy and total_seconds <= args.budget
+    print(("✓" if ok else "✗") + f" Startup budget {args.budget:.1f}s")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,8 +9,10 @@ class GameDataManager {
         this.games = [];
         this.callbacks = {
             onGamesLoaded: [],
-            onTeamsLoaded: []
+            onTeamsLoaded: [],
+            onScoresUpdated: []
         };
+        this.eventSource = null;
     }
 
     /**
@@ -52,6 +54,45 @@ class GameDataManager {
             });
     }
 
+    /**
+     * Subscribe to live score changes pushed over Server-Sent Events.
+     * Only changed games are sent; they are merged into this.games and
+     * passed to 'onScoresUpdated' callbacks.
+     * @param {string} date - Only deltas for this YYYY-MM-DD date are applied
+     * @returns {EventSource|null} The open stream, or null if unsupported
+     */
+    subscribeLiveScores(date) {
+        if (!window.EventSource) return null;
+        this.unsubscribeLiveScores();
+
+        this.eventSource = new EventSource('/api/games/stream');
+        this.eventSource.addEventListener('scores', event => {
+            const updates = JSON.parse(event.data).filter(game => game.game_date === date);
+            if (updates.length === 0) return;
+
+            updates.forEach(update => {
+                const game = this.games.find(g => g.game_id === update.game_id);
+                if (game) {
+                    game.status = update.status;
+                    game.home_team.score = update.home_team.score;
+                    game.visitor_team.score = update.visitor_team.score;
+                }
+            });
+            this._triggerCallback('onScoresUpdated', updates);
+        });
+        return this.eventSource;
+    }
+
+    /**
+     * Close the live score stream if one is open
+     */
+    unsubscribeLiveScores() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+
     /**
      * Create a game card DOM element from game data
      * @param {Object} game - Game data object
@@ -181,7 +222,7 @@ class GameDataManager {
 
     /**
      * Register a callback function
-     * @param {string} event - Event name ('onGamesLoaded' or 'onTeamsLoaded')
+     * @param {string} event - Event name ('onGamesLoaded', 'onTeamsLoaded' or 'onScoresUpdated')
      * @param {Function} callback - Callback function
      */
     on(event, callback) {
@@ -0,0 +1,181 @@
+# team_ratings.py - Persisted Elo ratings advanced incrementally from a (game_date, id) watermark
+from datetime import datetime
+import json
+import sys
+import time
+import numpy as np
+from sqlalchemy import or_
+from db import db, Game, Team, TeamRating, RatingWatermark, bulk_upsert
+from predictions import (DEFAULT_PARAMS, FINAL_STATUS, RatingState, build_rating_state,
+                         load_final_games, settled_through)
+
+MODEL_NAME = 'elo'
+
+def params_key(params):
+    """Stable string of the model parameters; stored ratings are only reused under the same key"""
+    return json.dumps(params._asdict(), sort_keys=True)
+
+def finals_written_behind(since, last_game_date, last_game_id):
+    """Whether a rateable game at or before the watermark was written after `since`.
+
+    Late finals and backfilled seasons land behind the watermark. Only games
+    written since the ratings were saved are read (ix_games_last_updated), so
+    the check costs what was written since, not a scan of every final game.
+    """
+    if since is None or last_game_date is None:
+        return False
+    return db.session.query(Game.id).filter(
+        Game.last_updated > since,
+        Game.game_date <= last_game_date,
+        or_(Game.game_date < last_game_date, Game.id <= last_game_id),
+        Game.status_id == FINAL_STATUS,
+        Game.home_team_score.isnot(None),
+        Game.visitor_team_score.isnot(None)
+    ).first() is not None
+
+def _matches(state, watermark):
+    return (state is not None and watermark is not None and state.games_applied == watermark.games_applied
+            and state.last_game_id == watermark.last_game_id and state.last_date == watermark.settled_through)
+
+def load_rating_state(params=DEFAULT_PARAMS, watermark=None):
+    """RatingState from team_ratings, or None when nothing is stored for `params`"""
+    watermark = watermark or db.session.get(RatingWatermark, MODEL_NAME)
+    if watermark is None or watermark.params != params_key(params):
+        return None
+    rows = db.session.query(TeamRating.team_id, TeamRating.rating, TeamRating.games_played).order_by(
+        TeamRating.team_id
+    ).all()
+    state = RatingState(params)
+    state.slot_by_team = {row.team_id: slot for slot, row in enumerate(rows)}
+    state.team_ids = np.array([row.team_id for row in rows], dtype=np.int64)
+    state.ratings = np.array([row.rating for row in rows], dtype=float)
+    state.games_played = np.array([row.games_played for row in rows], dtype=np.int64)
+    state.season = watermark.season
+    state.last_date = watermark.settled_through
+    state.last_game_date = watermark.last_game_date
+    state.last_game_id = watermark.last_game_id
+    state.games_applied = watermark.games_applied
+    return state
+
+def stored_version(params=DEFAULT_PARAMS):
+    """What identifies the stored ratings for `params`, or None when nothing is stored; never writes"""
+    watermark = db.session.get(RatingWatermark, MODEL_NAME)
+    if watermark is None or watermark.params != params_key(params):
+        return None
+    return (watermark.games_applied, watermark.last_game_id, watermark.settled_through)
+
+def save_rating_state(state, team_ids=None, as_of=None):
+    """Upsert the ratings of `team_ids` (default: every team) and the watermark; the caller commits.
+
+    `as_of` is when the games applied were read; games written after it are
+    checked for late finals on the next update.
+    """
+    now = datetime.utcnow()
+    if team_ids is None:
+        team_ids = state.team_ids
+    slots = state.slots(team_ids) if len(team_ids) else []
+    bulk_upsert(TeamRating, [
+        {
+            'team_id': int(state.team_ids[slot]),
+            'rating': float(state.ratings[slot]),
+            'games_played': int(state.games_played[slot]),
+            'updated_at': now
+        }
+        for slot in slots
+    ])
+    bulk_upsert(RatingWatermark, [{
+        'model': MODEL_NAME,
+        'params': params_key(state.params),
+        'season': state.season,
+        'last_game_date': state.last_game_date,
+        'last_game_id': state.last_game_id,
+        'settled_through': state.last_date,
+        'games_applied': state.games_applied,
+        'updated_at': as_of or now
+    }])
+    return len(slots)
+
+def replay_ratings(params=DEFAULT_PARAMS, through=None):
+    """Deterministic replay of every final game up to `through` (default: latest settled date)"""
+    return build_rating_state(params, through)
+
+def rebuild_team_ratings(params=DEFAULT_PARAMS):
+    """Replace the stored ratings with a full replay"""
+    try:
+        started = time.perf_counter()
+        as_of = datetime.utcnow()
+        state = replay_ratings(params)
+        db.session.query(TeamRating).delete()
+        save_rating_state(state, as_of=as_of)
+        db.session.commit()
+        print(f"✓ Rebuilt ratings from {state.games_applied} games in {time.perf_counter() - started:.2f}s")
+        return state
+    except Exception as e:
+        print(f"❌ Error rebuilding team ratings: {e}")
+        db.session.rollback()
+        return None
+
+def update_team_ratings(params=DEFAULT_PARAMS, state=None):
+    """Apply games settled since the stored watermark and save only the teams they touched.
+
+    `state` is a caller's copy of the ratings; it is reused instead of reloading
+    team_ratings when it is still at the stored watermark. Falls back to a full
+    replay when nothing is stored, the parameters changed, or final games appeared
+    behind the watermark (a backfilled season or a late final).
+    """
+    try:
+        as_of = datetime.utcnow()
+        watermark = db.session.get(RatingWatermark, MODEL_NAME)
+        if not _matches(state, watermark) or state.params != params:
+            state = load_rating_state(params, watermark)
+        if state is not None and finals_written_behind(watermark.updated_at, state.last_game_date, state.last_game_id):
+            print("✗ Final games appeared behind the ratings watermark, replaying")
+            state = None
+        if state is None:
+            return rebuild_team_ratings(params)
+
+        through = settled_through(after=state.last_date)
+        if through is None:
+            return state
+        games = load_final_games(
+            through=through,
+            after_game=(state.last_game_date, state.last_game_id) if state.last_game_date else None
+        )
+        season = state.season
+        state.apply_games(games)
+        state.last_date = through
+        # A new season regresses every team, otherwise only the teams that played moved
+        touched = None if state.season != season else np.unique(np.concatenate([games.home_ids, games.away_ids]))
+        saved = save_rating_state(state, touched, as_of)
+        db.session.commit()
+        print(f"✓ Applied {len(games.ids)} games through {through}, updated {saved} team ratings")
+        return state
+    except Exception as e:
+        print(f"❌ Error updating team ratings: {e}")
+        db.session.rollback()
+        return None
+
+def print_status():
+    watermark = db.session.get(RatingWatermark, MODEL_NAME)
+    if watermark is None:
+        print("No stored ratings")
+        return
+    print(f"{watermark.games_applied} games applied, last {watermark.last_game_id} on {watermark.last_game_date}, "
+          f"settled through {watermark.settled_through} ({watermark.season}), updated {watermark.updated_at}")
+    names = dict(db.session.query(Team.id, Team.full_name).all())
+    rows = db.session.query(TeamRating).order_by(TeamRating.rating.desc()).all()
+    for rank, row in enumerate(rows, 1):
+        print(f"{rank:>2}. {names.get(row.team_id, row.team_id):<28} {row.rating:7.1f}  ({row.games_played} games)")
+
+if __name__ == "__main__":
+    from db import create_app
+    app = create_app(role='fetcher')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'update'
+    with app.app_context():
+        db.create_all()
+        if command == 'rebuild':
+            rebuild_team_ratings()
+        elif command == 'status':
+            print_status()
+        else:
+            update_team_ratings()
@@ -0,0 +1,112 @@
+# team_registry.py - Immutable, precomputed team lookups shared by fetchers and routes
+from collections import namedtuple
+from types import MappingProxyType
+import threading
+from nba_api.stats.static import teams as static_teams
+
+TeamInfo = namedtuple('TeamInfo', ['id', 'abbreviation', 'full_name', 'city', 'name', 'conference'])
+
+TEAM_CONFERENCES = MappingProxyType({
+    1610612737: 'East',  # Atlanta Hawks
+    1610612738: 'East',  # Boston Celtics
+    1610612751: 'East',  # Brooklyn Nets
+    1610612766: 'East',  # Charlotte Hornets
+    1610612741: 'East',  # Chicago Bulls
+    1610612739: 'East',  # Cleveland Cavaliers
+    1610612743: 'West',  # Denver Nuggets
+    1610612765: 'East',  # Detroit Pistons
+    1610612744: 'West',  # Golden State Warriors
+    1610612745: 'West',  # Houston Rockets
+    1610612754: 'East',  # Indiana Pacers
+    1610612746: 'West',  # LA Clippers
+    1610612747: 'West',  # Los Angeles Lakers
+    1610612763: 'West',  # Memphis Grizzlies
+    1610612748: 'East',  # Miami Heat
+    1610612749: 'East',  # Milwaukee Bucks
+    1610612750: 'West',  # Minnesota Timberwolves
+    1610612740: 'West',  # New Orleans Pelicans
+    1610612752: 'East',  # New York Knicks
+    1610612760: 'West',  # Oklahoma City Thunder
+    1610612753: 'East',  # Orlando Magic
+    1610612755: 'East',  # Philadelphia 76ers
+    1610612756: 'West',  # Phoenix Suns
+    1610612757: 'West',  # Portland Trail Blazers
+    1610612758: 'West',  # Sacramento Kings
+    1610612759: 'West',  # San Antonio Spurs
+    1610612761: 'East',  # Toronto Raptors
+    1610612762: 'West',  # Utah Jazz
+    1610612764: 'East',  # Washington Wizards
+    1610612742: 'West',  # Dallas Mavericks
+})
+
+
+class TeamRegistry:
+    """Read-only id/abbreviation/conference maps built once from a list of TeamInfo"""
+
+    def __init__(self, team_infos):
+        team_infos = sorted(team_infos, key=lambda t: t.full_name)
+        self._sorted = tuple(team_infos)
+        self.by_id = MappingProxyType({t.id: t for t in team_infos})
+        self.id_by_abbr = MappingProxyType({t.abbreviation: t.id for t in team_infos})
+        self.abbr_by_id = MappingProxyType({t.id: t.abbreviation for t in team_infos})
+        self.conference_by_id = MappingProxyType({t.id: t.conference for t in team_infos})
+
+    def get(self, team_id):
+        return self.by_id.get(team_id)
+
+    def abbreviation(self, team_id):
+        return self.abbr_by_id.get(team_id)
+
+    def team_id(self, abbreviation):
+        return self.id_by_abbr.get(abbreviation)
+
+    def conference(self, team_id):
+        return self.conference_by_id.get(team_id)
+
+    def all(self):
+        """All teams ordered by full name"""
+        return self._sorted
+
+    def __len__(self):
+        return len(self._sorted)
+
+
+def team_info_from_static(team_data):
+    return TeamInfo(
+        id=team_data['id'],
+        abbreviation=team_data['abbreviation'],
+        full_name=team_data['full_name'],
+        city=team_data['city'],
+        name=team_data['nickname'],
+        conference=TEAM_CONFERENCES.get(team_data['id'], 'Unknown')
+    )
+
+def team_info_from_row(team):
+    return TeamInfo(team.id, team.abbreviation, team.full_name, team.city, team.name, team.conference)
+
+
+_registry = TeamRegistry(team_info_from_static(t) for t in static_teams.get_teams())
+_swap_lock = threading.Lock()
+
+def get_team_registry():
+    """Current registry; hold on to the returned object for a consistent view"""
+    return _registry
+
+def refresh_team_registry(team_infos=None):
+    """Swap in a new registry if the teams changed; returns True when it did.
+
+    With no argument the registry is rebuilt from the `teams` table, which
+    needs an app context.
+    """
+    global _registry
+    if team_infos is None:
+        from db import Team
+        team_infos = [team_info_from_row(team) for team in Team.query.all()]
+        if not team_infos:
+            return False
+    team_infos = list(team_infos)
+    with _swap_lock:
+        if set(team_infos) == set(_registry.all()):
+            return False
+        _registry = TeamRegistry(team_infos)
+        return True
@@ -1,37 +1,18 @@
-import requests
-import pandas as pd
+from db import db, create_app
+from leaders import fetch_and_store_leaders, get_leaders
 
 def get_season_leaders(stat_category='PTS', season='2024-25', topx=10):
-    url = "https://stats.nba.com/stats/leagueleaders"
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Referer": "https://www.nba.com/",
-        "Origin": "https://www.nba.com"
-    }
-
-    params = {
-        "LeagueID": "00",
-        "PerMode": "Totals",         # Other valid: PerGame, Per48
-        "Scope": "S",                # 'S' = Season
-        "Season": season,            # e.g., '2023-24'
-        "SeasonType": "Regular Season",
-        "StatCategory": stat_category,
-        "ActiveFlag": ""             # Nullable; leave blank
-    }
-
-    response = requests.get(url, headers=headers, params=params)
-    response.raise_for_status()
-
-    result = response.json()['resultSet']
-    headers = result['headers']
-    rows = result['rowSet']
-    
-    df = pd.DataFrame(rows, columns=headers)
-    return df.head(topx)
+    """Top `topx` of a category from the stored leaderboards (see leaders.py); needs an app context"""
+    return get_leaders(stat_category, topx, season)
 
 # Example usage
 if __name__ == "__main__":
-    leaders = get_season_leaders(stat_category='PTS', season='2023-24')
-    print(leaders[['PLAYER', 'TEAM', 'PTS', 'GP']])
+    app = create_app(role='fetcher')
+    with app.app_context():
+        db.create_all()
+        leaders = get_season_leaders(stat_category='PTS', season='2023-24')
+        if not leaders and fetch_and_store_leaders('2023-24'):
+            leaders = get_season_leaders(stat_category='PTS', season='2023-24')
+        for leader in leaders:
+            print(f"{leader['rank']:>3}. {leader['player']:<25} {leader['team'] or '':<4} "
+                  f"{leader['value']:>7.0f} PTS  {leader['gp']} GP")
@@ -0,0 +1,74 @@
+# test_query_counts.py - Game listings must cost a fixed number of queries however many games are on the slate
+import os
+from datetime import date
+
+# Module-level switches in app.py/http_cache.py are read at import time
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['REFRESH_SCHEDULER'] = '0'
+os.environ['LIVE_SCORES'] = '0'
+os.environ['HTTP_CACHE'] = '0'
+
+import pytest
+from sqlalchemy import event
+from app import create_app
+from db import db, Team, Game
+
+SMALL_SLATE = date(2025, 1, 2)
+FULL_SLATE = date(2025, 1, 3)  # 15 games: every team plays
+
+@pytest.fixture(scope='module')
+def app():
+    app = create_app(init_db=False)
+    with app.app_context():
+        db.create_all()
+        team_ids = list(range(1610612737, 1610612767))
+        db.session.add_all(
+            Team(id=team_id, abbreviation=f"T{i:02d}", full_name=f"Team {i:02d}", city=f"City {i:02d}",
+                 name=f"Name {i:02d}", conference='East' if i % 2 else 'West')
+            for i, team_id in enumerate(team_ids)
+        )
+        db.session.add(Game(id='0022400001', home_team_id=team_ids[0], visitor_team_id=team_ids[1],
+                            game_date=SMALL_SLATE, status_id=1, status_text='7:00 pm ET'))
+        db.session.add_all(
+            Game(id=f"00224001{i:02d}", home_team_id=team_ids[2 * i], visitor_team_id=team_ids[2 * i + 1],
+                 game_date=FULL_SLATE, status_id=1, status_text='7:00 pm ET')
+            for i in range(15)
+        )
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def count_queries(app, url):
+    """(response, SQL statements executed) for one GET"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client = app.test_client()
+    client.get(url)  # warm per-process state (team registry, ratings) before counting
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return response, statements
+
+def test_games_api_is_one_query(app):
+    for slate, n_games in ((SMALL_SLATE, 1), (FULL_SLATE, 15)):
+        response, statements = count_queries(app, f"/api/games?date={slate:%m/%d/%Y}")
+        assert response.status_code == 200
+        assert len(response.get_json()['games']) == n_games
+        assert len(statements) == 1, statements
+
+def test_index_query_count_does_not_grow_with_slate(app):
+    small, small_statements = count_queries(app, f"/?date={SMALL_SLATE:%Y-%m-%d}")
+    full, full_statements = count_queries(app, f"/?date={FULL_SLATE:%Y-%m-%d}")
+    assert small.status_code == full.status_code == 200
+    assert b'Team 28' in full.data
+    slate_queries = [statement for statement in full_statements if 'FROM games' in statement]
+    assert len(slate_queries) == 1, slate_queries
+    assert len(full_statements) == len(small_statements), full_statements
@@ -0,0 +1,50 @@
+# test_query_plans.py - The hot route queries must stay on indexes (see query_plans.py)
+import os
+from datetime import date, timedelta
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+import pytest
+from db import db, create_app, current_season, Team, TeamStats, Player, PlayerStats, Game
+from query_plans import check_query_plans, explain, plan_scans
+
+TEAM_ID = 1610612747
+
+@pytest.fixture(scope='module')
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        team_ids = list(range(1610612737, 1610612767))
+        season = current_season()
+        db.session.add_all(
+            Team(id=team_id, abbreviation=f"T{i:02d}", full_name=f"Team {i:02d}", city=f"City {i:02d}",
+                 name=f"Name {i:02d}", conference='East' if i % 2 else 'West')
+            for i, team_id in enumerate(team_ids)
+        )
+        db.session.add_all(TeamStats(team_id=team_id, season=season) for team_id in team_ids)
+        db.session.add_all(
+            Player(id=i, full_name=f"Player {i}", team_id=team_ids[i % len(team_ids)]) for i in range(300)
+        )
+        db.session.add_all(
+            PlayerStats(player_id=i, season=season, team_id=team_ids[i % len(team_ids)], gp=10) for i in range(300)
+        )
+        start = date.today() - timedelta(days=60)
+        db.session.add_all(
+            Game(id=f"g{day}_{i}", home_team_id=team_ids[2 * i], visitor_team_id=team_ids[2 * i + 1],
+                 game_date=start + timedelta(days=day), status_id=3)
+            for day in range(90) for i in range(15)
+        )
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+def test_hot_queries_use_indexes(app):
+    with app.app_context():
+        assert check_query_plans(TEAM_ID, date.today(), verbose=False) == {}
+
+def test_full_scan_is_reported(app):
+    with app.app_context():
+        scan = Game.query.filter(Game.status_text == 'Final')
+        assert plan_scans(explain(scan), 'sqlite') == ['SCAN games']
@@ -1,9 +1,12 @@
 # Quick script to refresh all team stats with the fix
-from db import app, Team
+from db import create_app
 from data_fetcher import fetch_and_store_team_stats
+from team_registry import get_team_registry
+
+app = create_app(role='fetcher')
 
 with app.app_context():
-    teams = Team.query.all()
+    teams = get_team_registry().all()
     for team in teams:
         print(f"Refreshing stats for {team.full_name}")
         fetch_and_store_team_stats(team.id)